@@ -4,45 +4,96 @@ Bootcamp F2025
 Main process to setup and manage all the other working processes
 """
 
-import multiprocessing as mp
+import argparse
+import asyncio
 import time
 
-from pymavlink import mavutil
-
 from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
+from modules.async_runtime import async_runtime
 from modules.command import command
-from modules.command import command_worker
 from modules.heartbeat import heartbeat_receiver_worker
 from modules.heartbeat import heartbeat_sender_worker
-from modules.telemetry import telemetry_worker
+from modules.mavlink_router import mavlink_router_worker
+from modules.mavlink_router import reconnecting_connection
+from modules.mavlink_router import routed_connection
+from modules.mavlink_router import stream_rates
+from modules.mavlink_router import transport
+from modules.telemetry import telemetry
+from modules.vehicle import vehicle_shard
+from modules.vehicle import vehicle_shard_worker
+from utilities.workers import queue_manager
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 from utilities.workers import worker_manager
 
-CONNECTION_STRING = "tcp:localhost:12345"
+# Set BOOTCAMP_CONNECTION_STRING to override, for example "udpout:localhost:12345"
+CONNECTION_STRING = transport.connection_string()
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
 # =================================================================================================
 
 QUEUE_SIZE = 10
-
+# Shared memory avoids a round trip through the manager process for every item
+QUEUE_BACKEND = queue_proxy_wrapper.QueueBackend.SHARED_MEMORY
+# Queue depth, rates and wait times are logged at this period
+QUEUE_STATISTICS_PERIOD = 5  # seconds
+
+# Larger receive buffers absorb telemetry bursts instead of the kernel dropping UDP datagrams
+# Capped by the kernel, net.core.rmem_max and net.core.wmem_max on Linux
+SOCKET_RECEIVE_BUFFER_SIZE = 1 << 20  # bytes
+SOCKET_SEND_BUFFER_SIZE = 0  # bytes, 0 keeps the system default
+
+# Rates requested from the autopilot, anything faster is wasted link bandwidth and decoding
+STREAM_RATES = {
+    "LOCAL_POSITION_NED": 5,  # Hz
+    "ATTITUDE": 5,  # Hz
+}
+# Time spent at startup collecting acknowledgements and measuring the rates achieved
+STREAM_RATE_NEGOTIATION_TIME = 2  # seconds
+STREAM_RATE_TOLERANCE = 0.2  # fraction of the target rate
+
+NUM_MAVLINK_ROUTERS = 1
 NUM_HEARTBEAT_SENDERS = 1
 NUM_HEARTBEAT_RECEIVERS = 1
-NUM_TELEMETRY_WORKERS = 1
-NUM_COMMAND_WORKERS = 1
-
-TARGET_POSITION = command.Position(10, 20, 30)
+# Position and attitude are interpolated to a fixed clock on the drone time at this period,
+# so commands get consistent samples at a steady rate, None pairs the newest of each instead
+TELEMETRY_FUSION_PERIOD = 200  # ms
+# Without fusion, when the newest position and attitude are output as a pair,
+# each pairing is only output once both halves are new so command does not see duplicates
+TELEMETRY_EMISSION_POLICY = telemetry.EmissionPolicy.ON_BOTH_UPDATED
+TELEMETRY_EMISSION_PERIOD = 200  # ms, with FIXED_RATE only
+# Newest telemetry of each vehicle kept for windowed queries, a minute at the fusion period
+TELEMETRY_HISTORY_CAPACITY = 300  # samples
+
+# Each shard process runs the telemetry and command pipelines of a share of the vehicles
+NUM_VEHICLE_SHARDS = 1
+
+# Target position of each vehicle by MAVLink system ID
+VEHICLE_TARGETS = {
+    1: command.Position(10, 20, 30),
+}
+# Identical commands are re-sent at most this often instead of on every telemetry sample
+COMMAND_HOLD_OFF = 1.0  # seconds
+COMMAND_PARAM_THRESHOLD = 1.0  # parameter units, degrees for yaw
+# Commands are retried until acknowledged, waiting twice as long after each retry
+COMMAND_ACK_TIMEOUT = 0.5  # seconds
+COMMAND_MAX_RETRIES = 3
 
 # =================================================================================================
 #                            ↑ BOOTCAMPERS MODIFY ABOVE THIS COMMENT ↑
 # =================================================================================================
 
 
-def main() -> int:
-    """Main entry point."""
+def main(runtime: str = "multiprocessing") -> int:
+    """
+    Main entry point.
+
+    runtime: "multiprocessing" runs each worker in its own process,
+    "asyncio" runs every worker as a coroutine in this process.
+    """
 
     result, config = read_yaml.open_config(logger.CONFIG_FILE_PATH)
     if not result:
@@ -58,111 +109,282 @@ def main() -> int:
 
     assert main_logger is not None
 
-    connection = mavutil.mavlink_connection(CONNECTION_STRING)
-    connection.wait_heartbeat(timeout=30)
+    # The router re-establishes it if the link drops, workers keep running
+    connection = reconnecting_connection.ReconnectingConnection(
+        CONNECTION_STRING,
+        receive_buffer_size=SOCKET_RECEIVE_BUFFER_SIZE,
+        send_buffer_size=SOCKET_SEND_BUFFER_SIZE,
+    )
+    if not connection.connect(timeout=30):
+        main_logger.error(f"No heartbeat from the drone at {CONNECTION_STRING}")
+        return -1
 
-    controller = worker_controller.WorkerController()
-    manager = mp.Manager()
+    main_logger.info(
+        f"Connected to {CONNECTION_STRING}, socket buffers {connection.socket_buffer_sizes}"
+    )
 
-    status_queue = queue_proxy_wrapper.QueueProxyWrapper(manager, QUEUE_SIZE)
-    telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(manager, QUEUE_SIZE)
-    command_queue = queue_proxy_wrapper.QueueProxyWrapper(manager, QUEUE_SIZE)
+    # Before any worker reads the connection
+    vehicle_rates = [
+        stream_rates.StreamRates(connection, STREAM_RATES, system_id)
+        for system_id in VEHICLE_TARGETS
+    ]
+    # Requested again after reconnecting
+    connection.rates = vehicle_rates
+    stream_rates.StreamRates.negotiate_all(vehicle_rates, STREAM_RATE_NEGOTIATION_TIME)
+    for rates in vehicle_rates:
+        main_logger.info(f"Vehicle {rates.target_system} stream rates: {rates.summary()}")
+        for message_type, (target, achieved) in rates.mismatches(STREAM_RATE_TOLERANCE).items():
+            main_logger.warning(
+                f"Vehicle {rates.target_system} {message_type} arrives at {achieved:.1f} Hz"
+                f" instead of {target} Hz"
+            )
 
-    workers = []
+    run_time = 100
 
-    # HEARTBEAT SENDER
-    workers.append(
-        worker_manager.WorkerManager(
-            heartbeat_sender_worker.heartbeat_sender_worker,
-            NUM_HEARTBEAT_SENDERS,
-            (connection, controller),
-            main_logger,
+    if runtime == "asyncio":
+        if len(VEHICLE_TARGETS) != 1:
+            main_logger.error("asyncio runtime supports a single vehicle")
+            return -1
+
+        return asyncio.run(
+            async_runtime.run(
+                connection,
+                next(iter(VEHICLE_TARGETS.values())),
+                run_time,
+                main_logger,
+                COMMAND_HOLD_OFF,
+                COMMAND_PARAM_THRESHOLD,
+                COMMAND_ACK_TIMEOUT,
+                COMMAND_MAX_RETRIES,
+                TELEMETRY_FUSION_PERIOD,
+                TELEMETRY_EMISSION_POLICY,
+                TELEMETRY_EMISSION_PERIOD,
+            )
         )
+
+    controller = worker_controller.WorkerController()
+    manager = queue_manager.create_queue_manager()
+
+    # Only the latest connection status matters, so a slow main never stalls the receiver,
+    # and a disconnect skips ahead of routine statuses
+    status_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        manager,
+        QUEUE_SIZE,
+        QUEUE_BACKEND,
+        queue_proxy_wrapper.QueueMode.PRIORITY,
+        instrument=True,
+        backpressure=queue_proxy_wrapper.BackpressurePolicy.DROP_OLDEST,
+    )
+    command_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        manager,
+        QUEUE_SIZE,
+        QUEUE_BACKEND,
+        instrument=True,
     )
 
-    # HEARTBEAT RECEIVER
+    # The router alone reads and writes the connection, workers get their messages from it
+    # The router never waits on a slow worker, a backlog of stale messages is dropped instead
+    outbound_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        manager,
+        QUEUE_SIZE,
+        QUEUE_BACKEND,
+        instrument=True,
+    )
+    heartbeat_inbound_queue = queue_proxy_wrapper.QueueProxyWrapper(
+        manager,
+        QUEUE_SIZE,
+        QUEUE_BACKEND,
+        instrument=True,
+        backpressure=queue_proxy_wrapper.BackpressurePolicy.DROP_OLDEST,
+    )
+    # Any vehicle's heartbeat shows the link is up
+    routes = {
+        "HEARTBEAT": [heartbeat_inbound_queue],
+    }
+
+    monitored_queues = {
+        "status_queue": status_queue,
+        "command_queue": command_queue,
+        "outbound_queue": outbound_queue,
+        "heartbeat_inbound_queue": heartbeat_inbound_queue,
+    }
+
+    # Messages of the vehicles in a shard are routed to it by system ID
+    shards = vehicle_shard.shard_vehicles(list(VEHICLE_TARGETS), NUM_VEHICLE_SHARDS)
+    shard_inbound_queues = []
+    for i, system_ids in enumerate(shards):
+        shard_inbound_queue = queue_proxy_wrapper.QueueProxyWrapper(
+            manager,
+            QUEUE_SIZE * len(system_ids),
+            QUEUE_BACKEND,
+            instrument=True,
+            backpressure=queue_proxy_wrapper.BackpressurePolicy.DROP_OLDEST,
+        )
+        for system_id in system_ids:
+            for message_type in ["LOCAL_POSITION_NED", "ATTITUDE", "COMMAND_ACK"]:
+                routes[(system_id, message_type)] = [shard_inbound_queue]
+
+        shard_inbound_queues.append(shard_inbound_queue)
+        monitored_queues[f"shard_{i}_inbound_queue"] = shard_inbound_queue
+
+    workers = []
+
+    # MAVLINK ROUTER
     workers.append(
         worker_manager.WorkerManager(
-            heartbeat_receiver_worker.heartbeat_receiver_worker,
-            NUM_HEARTBEAT_RECEIVERS,
-            (connection, controller, status_queue),
+            mavlink_router_worker.mavlink_router_worker,
+            NUM_MAVLINK_ROUTERS,
+            (connection, routes, controller, outbound_queue),
             main_logger,
         )
     )
 
-    # TELEMETRY
+    # HEARTBEAT SENDER
     workers.append(
         worker_manager.WorkerManager(
-            telemetry_worker.telemetry_worker,
-            NUM_TELEMETRY_WORKERS,
-            (connection, controller, telemetry_queue),
+            heartbeat_sender_worker.heartbeat_sender_worker,
+            NUM_HEARTBEAT_SENDERS,
+            (routed_connection.RoutedConnection(None, outbound_queue), controller),
             main_logger,
         )
     )
 
-    # COMMAND
+    # HEARTBEAT RECEIVER
     workers.append(
         worker_manager.WorkerManager(
-            command_worker.command_worker,
-            NUM_COMMAND_WORKERS,
+            heartbeat_receiver_worker.heartbeat_receiver_worker,
+            NUM_HEARTBEAT_RECEIVERS,
             (
-                connection,
-                TARGET_POSITION,
+                routed_connection.RoutedConnection(heartbeat_inbound_queue, outbound_queue),
                 controller,
-                telemetry_queue,
-                command_queue,
+                status_queue,
             ),
             main_logger,
         )
     )
 
+    # VEHICLE SHARDS
+    for system_ids, shard_inbound_queue in zip(shards, shard_inbound_queues):
+        workers.append(
+            worker_manager.WorkerManager(
+                vehicle_shard_worker.vehicle_shard_worker,
+                1,
+                (
+                    routed_connection.RoutedConnection(shard_inbound_queue, outbound_queue),
+                    {system_id: VEHICLE_TARGETS[system_id] for system_id in system_ids},
+                    controller,
+                    command_queue,
+                    COMMAND_HOLD_OFF,
+                    COMMAND_PARAM_THRESHOLD,
+                    COMMAND_ACK_TIMEOUT,
+                    COMMAND_MAX_RETRIES,
+                    TELEMETRY_FUSION_PERIOD,
+                    TELEMETRY_EMISSION_POLICY,
+                    TELEMETRY_EMISSION_PERIOD,
+                    TELEMETRY_HISTORY_CAPACITY,
+                    STREAM_RATES,
+                ),
+                main_logger,
+            )
+        )
+
     for w in workers:
         w.start()
 
     main_logger.info("Started")
 
     start_time = time.time()
-    run_time = 100
+
+    last_statistics = {name: q.statistics() for name, q in monitored_queues.items()}
+    last_statistics_time = start_time
+
+    # Time from the receiver detecting a status to main handling it
+    max_status_latency = 0.0
 
     try:
         while time.time() - start_time < run_time:
 
-            while not status_queue.queue.empty():
-                status = status_queue.queue.get()
+            for cmd in command_queue.get_many(0):
+                main_logger.info(cmd)
+
+            # Waiting on the status queue instead of sleeping reacts to a disconnect immediately
+            for status, detection_time in status_queue.get_many(0, timeout=0.1):
+                status_latency = time.time() - detection_time
+                max_status_latency = max(max_status_latency, status_latency)
                 main_logger.info(f"Heartbeat status: {status}")
 
                 if status == "Disconnected":
-                    main_logger.error("Drone disconnected — stopping system")
+                    main_logger.error(
+                        f"Drone disconnected — stopping system, "
+                        f"reacted {status_latency * 1000:.1f} ms after detection"
+                    )
                     raise KeyboardInterrupt
 
-            while not command_queue.queue.empty():
-                cmd = command_queue.queue.get()
-                main_logger.info(cmd)
+            if time.time() - last_statistics_time >= QUEUE_STATISTICS_PERIOD:
+                last_statistics_time = time.time()
+                for name, monitored_queue in monitored_queues.items():
+                    statistics = monitored_queue.statistics()
+                    main_logger.info(
+                        f"{name}: {statistics.summary(last_statistics[name])}"
+                        f", dropped {monitored_queue.dropped_count()}"
+                    )
+                    last_statistics[name] = statistics
 
-            time.sleep(0.1)
+                main_logger.info(f"Max status latency: {max_status_latency * 1000:.1f} ms")
+
+                # Same socket as the router, until it reconnects
+                kernel_drops = transport.kernel_drop_count(connection)
+                if kernel_drops is not None:
+                    main_logger.info(f"Datagrams dropped by the kernel: {kernel_drops}")
+                max_status_latency = 0.0
 
     except KeyboardInterrupt:
         main_logger.info("Shutdown requested")
 
+    shutdown_start = time.perf_counter()
+
     controller.request_exit()
     main_logger.info("Requested exit")
 
-    command_queue.fill_and_drain_queue()
-    telemetry_queue.fill_and_drain_queue()
-    status_queue.fill_and_drain_queue()
+    # Closing wakes every worker blocked on a queue at once
+    command_queue.close()
+    status_queue.close()
+    outbound_queue.close()
+    heartbeat_inbound_queue.close()
+    for shard_inbound_queue in shard_inbound_queues:
+        shard_inbound_queue.close()
 
-    main_logger.info("Queues cleared")
+    main_logger.info("Queues closed")
 
     for w in workers:
         w.join()
 
+    shutdown_time = time.perf_counter() - shutdown_start
+    main_logger.info(f"Shutdown took {shutdown_time * 1000:.1f} ms")
+
+    command_queue.release()
+    status_queue.release()
+    outbound_queue.release()
+    heartbeat_inbound_queue.release()
+    for shard_inbound_queue in shard_inbound_queues:
+        shard_inbound_queue.release()
+
     main_logger.info("Stopped")
 
     return 0
 
 
 if __name__ == "__main__":
-    result_main = main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--runtime",
+        choices=["multiprocessing", "asyncio"],
+        default="multiprocessing",
+        help="process per worker, or every worker as a coroutine in one process",
+    )
+    parsed_args = parser.parse_args()
+
+    result_main = main(parsed_args.runtime)
     if result_main < 0:
         print(f"Failed with return code {result_main}")
     else:
@@ -5,7 +5,6 @@ python -m documentation.main_multiprocess_example
 ```
 """
 
-import multiprocessing as mp
 import time
 
 from documentation.multiprocess_example.add_random import add_random_worker
@@ -14,6 +13,7 @@ from documentation.multiprocess_example.countup import countup_worker
 from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
+from utilities.workers import queue_manager
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 from utilities.workers import worker_manager
@@ -59,7 +59,8 @@ def main() -> int:
     # caused by its implementation (background thread work)
     # so a queue from a SyncManager is used instead
     # See 2nd note: https://docs.python.org/3/library/multiprocessing.html#pipes-and-queues
-    mp_manager = mp.Manager()
+    # QueueManager is a SyncManager with queues that also support batched operations
+    mp_manager = queue_manager.create_queue_manager()
 
     # Queue maxsize should always be >= the larger of producers/consumers count
     # Example: Producers 3, consumers 2, so queue maxsize minimum is 3
@@ -0,0 +1,428 @@
+"""
+Runs the workers as coroutines on one event loop instead of one process each.
+"""
+
+# pylint: disable=broad-exception-caught,too-many-instance-attributes
+
+import asyncio
+import time
+
+from pymavlink import mavutil
+
+from utilities.workers import worker_controller
+from ..command import command
+from ..command import command_manager
+from ..common.modules.logger import logger
+from ..heartbeat import heartbeat_receiver
+from ..heartbeat import heartbeat_sender
+from ..mavlink_router import bulk_reader
+from ..mavlink_router import reconnecting_connection
+from ..mavlink_router import stream_rates
+from ..telemetry import telemetry
+
+HEARTBEAT_PERIOD = 1  # seconds
+# Commands are retried at most this late after their acknowledgement timeout
+ACK_CHECK_PERIOD = 0.1  # seconds
+QUEUE_SIZE = 10
+
+
+def put_dropping_oldest(output_queue: asyncio.Queue, item: object) -> bool:
+    """
+    Puts without waiting, discarding the oldest item if the queue is full.
+
+    Returns whether an item was discarded.
+    """
+    is_full = output_queue.full()
+    if is_full:
+        output_queue.get_nowait()
+
+    output_queue.put_nowait(item)
+    return is_full
+
+
+class AsyncMavlinkReader:
+    """
+    Reads the connection from the event loop whenever its file descriptor is readable,
+    and hands every available message to the queues subscribed to its type.
+    TCP connections are read in bulk.
+
+    A reconnecting connection is re-established off the event loop when the peer closes it,
+    and reading resumes on the new link.
+    """
+
+    def __init__(self, connection: mavutil.mavfile) -> None:
+        """
+        connection: Must have a file descriptor.
+        """
+        self.connection = connection
+        self.dropped_count = 0
+        # Set once the peer has closed a connection which cannot reconnect,
+        # nothing is read afterwards
+        self.is_closed = False
+        self.__subscribers: "dict[str, list[asyncio.Queue]]" = {}
+
+        # File descriptor being watched, None while not reading
+        self.__fd = None
+        self.__reconnect_task: "asyncio.Task | None" = None
+        # Stops reconnection attempts running in the executor
+        self.__controller = worker_controller.WorkerController()
+
+        self.__bulk_reader = None
+        self.__attach()
+
+    def subscribe(self, message_types: "list[str]") -> asyncio.Queue:
+        """
+        Returns a queue receiving the messages of the given types,
+        the oldest are dropped if it is not read fast enough.
+        """
+        subscriber = asyncio.Queue(QUEUE_SIZE)
+        for message_type in message_types:
+            self.__subscribers.setdefault(message_type, []).append(subscriber)
+
+        return subscriber
+
+    def start(self) -> None:
+        """
+        Starts reading, call from the event loop.
+        """
+        self.__fd = self.connection.fd
+        asyncio.get_running_loop().add_reader(self.__fd, self.__on_readable)
+
+    def stop(self) -> None:
+        """
+        Stops reading and reconnecting, call from the event loop.
+
+        An attempt already in progress finishes in the executor before it sees the exit request.
+        """
+        self.__remove_reader()
+
+        self.__controller.request_exit()
+        if self.__reconnect_task is not None:
+            self.__reconnect_task.cancel()
+
+    def __attach(self) -> None:
+        """
+        Sets up reading the current connection.
+        """
+        self.__bulk_reader = None
+        try:
+            self.__bulk_reader = bulk_reader.BulkMavlinkReader(self.connection)
+        except ValueError:
+            # Not TCP, read through mavutil
+            pass
+
+    def __remove_reader(self) -> None:
+        """
+        Stops watching the file descriptor, which is invalid once its connection is closed.
+        """
+        if self.__fd is None:
+            return
+
+        asyncio.get_running_loop().remove_reader(self.__fd)
+        self.__fd = None
+
+    async def __reconnect(self) -> None:
+        """
+        Re-establishes the link in the executor, since attempts block, then reads the new one.
+        """
+        is_reconnected = await asyncio.get_running_loop().run_in_executor(
+            None, self.connection.reconnect, self.__controller
+        )
+        self.__reconnect_task = None
+        if not is_reconnected:
+            # Exit requested
+            return
+
+        self.__attach()
+        self.start()
+
+    def __on_readable(self) -> None:
+        """
+        Parses every message that has arrived.
+        """
+        if self.__bulk_reader is not None:
+            try:
+                messages = self.__bulk_reader.read_messages()
+            except ConnectionError:
+                # The socket stays readable at end of file, so keep the callback from spinning
+                self.__remove_reader()
+                if isinstance(self.connection, reconnecting_connection.ReconnectingConnection):
+                    self.__reconnect_task = asyncio.get_running_loop().create_task(
+                        self.__reconnect()
+                    )
+                else:
+                    # The missing heartbeats report the disconnection
+                    self.is_closed = True
+
+                return
+
+            for msg in messages:
+                self.__dispatch(msg)
+
+            return
+
+        while True:
+            msg = self.connection.recv_match(blocking=False)
+            if msg is None:
+                return
+
+            self.__dispatch(msg)
+
+    def __dispatch(self, msg: "mavutil.mavlink.MAVLink_message") -> None:
+        """
+        Hands the message to its subscribers.
+        """
+        for subscriber in self.__subscribers.get(msg.get_type(), []):
+            if put_dropping_oldest(subscriber, msg):
+                self.dropped_count += 1
+
+
+async def heartbeat_sender_task(
+    sender: heartbeat_sender.HeartbeatSender, main_logger: logger.Logger
+) -> None:
+    """
+    Sends a heartbeat every period.
+    """
+    while True:
+        try:
+            sender.run(None)
+        except Exception as exc:
+            main_logger.error(f"Heartbeat send failed: {exc}", True)
+
+        await asyncio.sleep(HEARTBEAT_PERIOD)
+
+
+async def heartbeat_receiver_task(
+    receiver: heartbeat_receiver.HeartbeatReceiver,
+    heartbeats: asyncio.Queue,
+    status_queue: asyncio.Queue,
+) -> None:
+    """
+    Reports the connection status whenever a heartbeat is received or missed.
+    """
+    while True:
+        timeout = max(receiver.deadline - time.monotonic(), 0.0)
+        try:
+            await asyncio.wait_for(heartbeats.get(), timeout)
+            status = receiver.process_heartbeat()
+        except asyncio.TimeoutError:
+            status = receiver.process_missed()
+
+        put_dropping_oldest(status_queue, (status, time.time()))
+
+
+async def telemetry_task(
+    telemetry_logic: telemetry.Telemetry,
+    messages: asyncio.Queue,
+    telemetry_mailbox: asyncio.Queue,
+) -> None:
+    """
+    Combines position and attitude, only the newest combination is kept for command.
+    """
+    while True:
+        msg = await messages.get()
+        telemetry_data = telemetry_logic.process_message(msg)
+        if telemetry_data is not None:
+            # The record is only updated in place by a newer output,
+            # so a record still in the mailbox is replaced by its newer values without a copy
+            put_dropping_oldest(telemetry_mailbox, telemetry_data)
+
+
+async def command_task(
+    command_logic: command.Command,
+    telemetry_mailbox: asyncio.Queue,
+    main_logger: logger.Logger,
+) -> None:
+    """
+    Acts on the newest telemetry.
+    """
+    while True:
+        telemetry_data = await telemetry_mailbox.get()
+        try:
+            result = command_logic.run(telemetry_data)
+        except Exception as exc:
+            main_logger.error(f"Command error: {exc}", True)
+            continue
+
+        if result is not None:
+            main_logger.info(result)
+
+
+async def command_ack_task(
+    manager: command_manager.CommandManager,
+    acks: asyncio.Queue,
+) -> None:
+    """
+    Matches acknowledgements and retries commands that timed out.
+    """
+    while True:
+        try:
+            msg = await asyncio.wait_for(acks.get(), ACK_CHECK_PERIOD)
+            manager.process_ack(msg)
+        except asyncio.TimeoutError:
+            pass
+
+        try:
+            manager.retry_expired()
+        except Exception:
+            # Link down while reconnecting, retried on a later check
+            pass
+
+
+async def stream_rates_task(
+    vehicle_rates: "list[stream_rates.StreamRates]",
+    acks: asyncio.Queue,
+) -> None:
+    """
+    Matches acknowledgements of rate changes made at runtime,
+    and falls back to data streams for those that timed out.
+    """
+    while True:
+        try:
+            msg = await asyncio.wait_for(acks.get(), ACK_CHECK_PERIOD)
+            if msg.command == mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL:
+                for rates in vehicle_rates:
+                    rates.process_ack(msg)
+        except asyncio.TimeoutError:
+            pass
+
+        try:
+            for rates in vehicle_rates:
+                rates.fall_back_expired()
+        except Exception:
+            # Link down while reconnecting, falls back on a later check
+            pass
+
+
+async def run(
+    connection: mavutil.mavfile,
+    target: command.Position,
+    run_time: float,
+    main_logger: logger.Logger,
+    command_hold_off: float = 0.0,
+    command_param_threshold: float = 0.0,
+    command_ack_timeout: float = 0.0,
+    command_max_retries: int = 0,
+    fusion_period: int | None = None,
+    emission_policy: telemetry.EmissionPolicy = telemetry.EmissionPolicy.ON_ANY,
+    emission_period: int = 0,
+) -> int:
+    """
+    Runs every worker on the current event loop until the run time passes
+    or the drone disconnects.
+
+    connection: Must have a file descriptor, for example TCP, UDP or serial.
+    target: Command target position.
+    run_time: Seconds to run for.
+    command_hold_off: Seconds during which an identical command is not sent again.
+    command_param_threshold: Largest change of any parameter that still counts as identical.
+    command_ack_timeout: Seconds to wait for an acknowledgement before retrying,
+    0 does not track acknowledgements.
+    command_max_retries: Number of retries before a command is considered failed.
+    fusion_period: Milliseconds of drone time between time aligned telemetry outputs,
+    None pairs the newest position and attitude instead.
+    emission_policy: When to output a telemetry pairing, without fusion.
+    emission_period: Milliseconds of drone time between telemetry outputs with `FIXED_RATE`.
+
+    Returns 0 on success, negative on failure.
+    """
+    if getattr(connection, "fd", None) is None:
+        main_logger.error("asyncio runtime requires a connection with a file descriptor")
+        return -1
+
+    result, sender = heartbeat_sender.HeartbeatSender.create(connection, None)
+    if not result or sender is None:
+        main_logger.error("Failed to create HeartbeatSender")
+        return -1
+
+    result, receiver = heartbeat_receiver.HeartbeatReceiver.create(connection, None, main_logger)
+    if not result or receiver is None:
+        main_logger.error("Failed to create HeartbeatReceiver")
+        return -1
+
+    result, telemetry_logic = telemetry.Telemetry.create(
+        connection, None, main_logger, fusion_period, emission_policy, emission_period
+    )
+    if not result or telemetry_logic is None:
+        main_logger.error("Failed to create Telemetry")
+        return -1
+
+    result, command_logic = command.Command.create(
+        connection,
+        target,
+        None,
+        main_logger,
+        command_hold_off,
+        command_param_threshold,
+        command_ack_timeout,
+        command_max_retries,
+    )
+    if not result or command_logic is None:
+        main_logger.error("Failed to create Command")
+        return -1
+
+    reader = AsyncMavlinkReader(connection)
+    heartbeats = reader.subscribe(["HEARTBEAT"])
+    telemetry_messages = reader.subscribe(["LOCAL_POSITION_NED", "ATTITUDE"])
+    telemetry_mailbox = asyncio.Queue(1)
+    status_queue = asyncio.Queue(QUEUE_SIZE)
+
+    reader.start()
+    tasks = [
+        asyncio.create_task(heartbeat_sender_task(sender, main_logger)),
+        asyncio.create_task(heartbeat_receiver_task(receiver, heartbeats, status_queue)),
+        asyncio.create_task(telemetry_task(telemetry_logic, telemetry_messages, telemetry_mailbox)),
+        asyncio.create_task(command_task(command_logic, telemetry_mailbox, main_logger)),
+    ]
+    if command_logic.command_manager.is_tracking_acks:
+        acks = reader.subscribe(["COMMAND_ACK"])
+        tasks.append(asyncio.create_task(command_ack_task(command_logic.command_manager, acks)))
+
+    # Stream rates of a reconnecting connection can be changed at runtime
+    vehicle_rates = getattr(connection, "rates", [])
+    if len(vehicle_rates) > 0:
+        rate_acks = reader.subscribe(["COMMAND_ACK"])
+        tasks.append(asyncio.create_task(stream_rates_task(vehicle_rates, rate_acks)))
+
+    main_logger.info("Started")
+
+    deadline = time.monotonic() + run_time
+    try:
+        while time.monotonic() < deadline:
+            try:
+                status, detection_time = await asyncio.wait_for(
+                    status_queue.get(), deadline - time.monotonic()
+                )
+            except asyncio.TimeoutError:
+                break
+
+            main_logger.info(f"Heartbeat status: {status}")
+
+            if status == "Disconnected":
+                main_logger.error(
+                    f"Drone disconnected — stopping system, "
+                    f"reacted {(time.time() - detection_time) * 1000:.1f} ms after detection"
+                )
+                break
+
+    finally:
+        shutdown_start = time.perf_counter()
+
+        reader.stop()
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        shutdown_time = time.perf_counter() - shutdown_start
+        main_logger.info(f"Shutdown took {shutdown_time * 1000:.1f} ms")
+        main_logger.info(f"MAVLink messages dropped: {reader.dropped_count}")
+        if reader.is_closed:
+            main_logger.warning("Connection was closed by the drone")
+        if isinstance(connection, reconnecting_connection.ReconnectingConnection):
+            main_logger.info(f"Link: {connection.summary()}")
+        main_logger.info(f"Commands: {command_logic.command_manager.summary()}")
+
+    main_logger.info("Stopped")
+
+    return 0
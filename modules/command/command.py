@@ -9,6 +9,7 @@ from typing import Tuple
 
 from pymavlink import mavutil
 
+from . import command_manager
 from ..common.modules.logger import logger
 from ..telemetry.telemetry import TelemetryData
 
@@ -28,6 +29,10 @@ class Command:
     """
     Command class to make a decision based on received telemetry,
     and send out commands based upon the data.
+
+    A decision repeated on every telemetry sample is only sent again once the hold-off passes
+    or a parameter changes by more than the threshold.
+    With an acknowledgement timeout, commands are retried until acknowledged instead.
     """
 
     __private_key = object()
@@ -39,12 +44,37 @@ class Command:
         target: Position,
         _args: object,
         local_logger: logger.Logger,
+        hold_off: float = 0.0,
+        param_threshold: float = 0.0,
+        ack_timeout: float = 0.0,
+        max_retries: int = 0,
+        target_system: int = 1,
+        target_component: int = 0,
     ) -> Tuple[bool, "Command | None"]:
         """
         Factory method to create a Command instance.
+
+        hold_off: Seconds during which an identical command is not sent again,
+        0 sends every command.
+        param_threshold: Largest change of any parameter that still counts as identical.
+        ack_timeout: Seconds to wait for an acknowledgement before retrying,
+        0 does not track acknowledgements.
+        max_retries: Number of retries before a command is considered failed.
+        target_system: MAVLink system ID of the vehicle to command.
+        target_component: MAVLink component ID of the autopilot.
         """
         try:
-            obj = cls(cls.__private_key, connection, target, local_logger)
+            obj = cls(
+                cls.__private_key,
+                connection,
+                target,
+                local_logger,
+                command_manager.CommandManager(
+                    connection, hold_off, param_threshold, ack_timeout, max_retries
+                ),
+                target_system,
+                target_component,
+            )
             return True, obj
         except Exception as exc:
             local_logger.error(f"Failed to create Command: {exc}", True)
@@ -56,12 +86,35 @@ class Command:
         connection: mavutil.mavfile,
         target: Position,
         local_logger: logger.Logger,
+        manager: command_manager.CommandManager,
+        target_system: int = 1,
+        target_component: int = 0,
     ) -> None:
         assert key is Command.__private_key, "Use create() method"
 
         self.connection: mavutil.mavfile = connection
         self.target: Position = target
         self.logger: logger.Logger = local_logger
+        self.command_manager: command_manager.CommandManager = manager
+        self.target_system: int = target_system
+        self.target_component: int = target_component
+
+    def process_acks(self) -> None:
+        """
+        Matches every received acknowledgement and retries commands that timed out.
+        Does not read the connection unless acknowledgements are tracked.
+        """
+        if not self.command_manager.is_tracking_acks:
+            return
+
+        while True:
+            msg = self.connection.recv_match(type="COMMAND_ACK", blocking=False)
+            if msg is None:
+                break
+
+            self.command_manager.process_ack(msg)
+
+        self.command_manager.retry_expired()
 
     # =========================================================
     # MAIN DECISION LOOP
@@ -79,9 +132,9 @@ class Command:
         if abs(dz) > 0.5:
             climb_rate: float = 1.0  # required by test harness
 
-            self.connection.mav.command_long_send(
-                1,
-                0,
+            self.command_manager.send(
+                self.target_system,
+                self.target_component,
                 mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT,
                 0,
                 climb_rate,  # param1: climb rate
@@ -110,9 +163,9 @@ class Command:
         if abs(yaw_error_deg) > 5:
             direction: int = 1 if yaw_error_deg > 0 else -1
 
-            self.connection.mav.command_long_send(
-                1,
-                0,
+            self.command_manager.send(
+                self.target_system,
+                self.target_component,
                 mavutil.mavlink.MAV_CMD_CONDITION_YAW,
                 0,
                 abs(yaw_error_deg),  # param1: angle
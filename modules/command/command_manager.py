@@ -0,0 +1,275 @@
+"""
+Suppresses repeated outbound commands and tracks their acknowledgements.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import time
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_statistics
+
+
+class InFlightCommand:
+    """
+    Command sent and not acknowledged yet.
+    """
+
+    def __init__(self, args: "tuple[float, ...]", send_time: float, deadline: float) -> None:
+        """
+        args: Arguments of `command_long_send()`.
+        send_time: Time of the latest transmission in seconds, monotonic.
+        deadline: Time to retry at if not acknowledged by then.
+        """
+        self.args = args
+        self.send_time = send_time
+        self.deadline = deadline
+        self.retries = 0
+
+
+class CommandManager:
+    """
+    Sends `COMMAND_LONG` messages, skipping a command identical to the last one sent
+    to the same target within the hold-off.
+
+    Each command ID is tracked per target system and component,
+    a command with any parameter changed by more than the threshold is always sent.
+
+    With an acknowledgement timeout, every command sent stays in flight until the matching
+    `COMMAND_ACK`, and is sent again with an incremented confirmation if none arrives,
+    doubling the timeout on each retry.
+    An identical command is never sent while one is in flight.
+    Acknowledgements only count when sent by the target of the command,
+    and addressed to this system if the autopilot fills in their target.
+    """
+
+    __CONFIRMATION = 3  # index of confirmation in the arguments
+
+    def __init__(
+        self,
+        connection: mavutil.mavfile,
+        hold_off: float = 0.0,
+        param_threshold: float = 0.0,
+        ack_timeout: float = 0.0,
+        max_retries: int = 0,
+    ) -> None:
+        """
+        connection: Connection to send on.
+        hold_off: Seconds during which an identical command is not sent again,
+        0 sends every command.
+        param_threshold: Largest change of any parameter that still counts as identical.
+        ack_timeout: Seconds to wait for an acknowledgement before the first retry,
+        0 does not track acknowledgements.
+        max_retries: Number of retries before the command is considered failed.
+        """
+        if hold_off < 0:
+            raise ValueError(f"Hold-off must not be negative, got {hold_off}")
+
+        if param_threshold < 0:
+            raise ValueError(f"Parameter threshold must not be negative, got {param_threshold}")
+
+        if ack_timeout < 0:
+            raise ValueError(f"Acknowledgement timeout must not be negative, got {ack_timeout}")
+
+        if max_retries < 0:
+            raise ValueError(f"Maximum retries must not be negative, got {max_retries}")
+
+        self.connection = connection
+        self.hold_off = hold_off
+        self.param_threshold = param_threshold
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+
+        # (target system, target component, command) to (send time, parameters)
+        self.__last_sent = {}
+        # Command ID to InFlightCommand, only 1 of each command can be in flight
+        self.__in_flight = {}
+
+        self.sent_count = 0
+        self.suppressed_count = 0
+        self.acknowledged_count = 0
+        self.rejected_count = 0
+        # Acknowledgements from other vehicles or meant for another ground station
+        self.ignored_ack_count = 0
+        self.retry_count = 0
+        self.failed_count = 0
+
+        # Time from the latest transmission to the acknowledgement, in `queue_statistics` buckets
+        self.ack_latency_histogram = [0] * queue_statistics.NUM_BUCKETS
+
+    @property
+    def is_tracking_acks(self) -> bool:
+        """
+        Whether acknowledgements are expected.
+        """
+        return self.ack_timeout > 0
+
+    def send(
+        self,
+        target_system: int,
+        target_component: int,
+        command: int,
+        confirmation: int,
+        *params: float,
+    ) -> bool:
+        """
+        Same arguments as `command_long_send()`, with the 7 parameters.
+
+        Returns whether the command was sent.
+        """
+        key = (target_system, target_component, command)
+        now = time.monotonic()
+
+        last = self.__last_sent.get(key)
+        if last is not None and self.__is_repeat(key, now, last, params):
+            self.suppressed_count += 1
+            return False
+
+        args = (target_system, target_component, command, confirmation, *params)
+        self.connection.mav.command_long_send(*args)
+        self.__last_sent[key] = (now, params)
+        self.sent_count += 1
+
+        if self.is_tracking_acks:
+            # A newer command replaces the one in flight
+            self.__in_flight[command] = InFlightCommand(args, now, now + self.ack_timeout)
+
+        return True
+
+    def process_ack(self, msg: "mavutil.mavlink.MAVLink_command_ack_message") -> bool:
+        """
+        Completes the in flight command matching the acknowledgement.
+        A command still in progress gets another timeout instead of being retried.
+
+        Returns whether a command in flight matched.
+        """
+        in_flight = self.__in_flight.get(msg.command)
+        if in_flight is None:
+            return False
+
+        if not self.__is_ack_for(in_flight, msg):
+            self.ignored_ack_count += 1
+            return False
+
+        now = time.monotonic()
+        if msg.result == mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+            in_flight.deadline = now + self.ack_timeout
+            return True
+
+        del self.__in_flight[msg.command]
+
+        latency_ns = int((now - in_flight.send_time) * 1e9)
+        self.ack_latency_histogram[queue_statistics.bucket_index(latency_ns)] += 1
+        self.acknowledged_count += 1
+
+        if msg.result != mavutil.mavlink.MAV_RESULT_ACCEPTED:
+            self.rejected_count += 1
+
+        return True
+
+    def retry_expired(self) -> int:
+        """
+        Sends again every command in flight past its deadline,
+        and drops those out of retries.
+
+        Returns the number of commands sent.
+        """
+        now = time.monotonic()
+        expired = [
+            command for command, in_flight in self.__in_flight.items() if in_flight.deadline <= now
+        ]
+
+        count = 0
+        for command in expired:
+            in_flight = self.__in_flight[command]
+            if in_flight.retries >= self.max_retries:
+                del self.__in_flight[command]
+                self.failed_count += 1
+                continue
+
+            # Receivers tell retransmissions apart by the confirmation
+            in_flight.retries += 1
+            args = list(in_flight.args)
+            args[self.__CONFIRMATION] = min(args[self.__CONFIRMATION] + in_flight.retries, 255)
+
+            self.connection.mav.command_long_send(*args)
+            in_flight.send_time = now
+            in_flight.deadline = now + self.ack_timeout * 2**in_flight.retries
+            self.retry_count += 1
+            count += 1
+
+        return count
+
+    def in_flight_count(self) -> int:
+        """
+        Returns the number of commands waiting for an acknowledgement.
+        """
+        return len(self.__in_flight)
+
+    def summary(self) -> str:
+        """
+        Formats the counters and acknowledgement latency percentiles for logging.
+        """
+        text = f"sent {self.sent_count}, suppressed {self.suppressed_count}"
+        if not self.is_tracking_acks:
+            return text
+
+        latency_p50 = queue_statistics.histogram_percentile(self.ack_latency_histogram, 0.5)
+        latency_p99 = queue_statistics.histogram_percentile(self.ack_latency_histogram, 0.99)
+
+        return (
+            f"{text}, acknowledged {self.acknowledged_count} (rejected {self.rejected_count})"
+            f", ignored {self.ignored_ack_count}"
+            f", retried {self.retry_count}, failed {self.failed_count}"
+            f", in flight {self.in_flight_count()}"
+            f", ack latency p50 < {latency_p50 * 1000:.1f} ms p99 < {latency_p99 * 1000:.1f} ms"
+        )
+
+    def __is_ack_for(
+        self, in_flight: InFlightCommand, msg: "mavutil.mavlink.MAVLink_command_ack_message"
+    ) -> bool:
+        """
+        Whether the acknowledgement was sent by the target of the command to this system.
+        """
+        target_system, target_component = in_flight.args[:2]
+        if msg.get_srcSystem() != target_system:
+            return False
+
+        # Component 0 addresses every component of the vehicle
+        if target_component != 0 and msg.get_srcComponent() != target_component:
+            return False
+
+        # MAVLink 1 has no target in acknowledgements, autopilots may also leave it 0
+        ack_target_system = getattr(msg, "target_system", 0)
+        if ack_target_system not in (0, self.connection.mav.srcSystem):
+            return False
+
+        ack_target_component = getattr(msg, "target_component", 0)
+        return ack_target_component in (0, self.connection.mav.srcComponent)
+
+    def __is_repeat(
+        self,
+        key: "tuple[int, int, int]",
+        now: float,
+        last: "tuple[float, tuple[float, ...]]",
+        params: "tuple[float, ...]",
+    ) -> bool:
+        """
+        Whether the command matches the last one sent
+        and is still in flight or within its hold-off.
+        """
+        last_time, last_params = last
+        is_same = all(
+            abs(param - last_param) <= self.param_threshold
+            for param, last_param in zip(params, last_params)
+        )
+        if not is_same:
+            return False
+
+        # Retries take care of delivery
+        in_flight = self.__in_flight.get(key[2])
+        if in_flight is not None and in_flight.args[:2] == key[:2]:
+            return True
+
+        return now - last_time < self.hold_off
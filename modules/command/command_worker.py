@@ -10,9 +10,11 @@ import pathlib
 from pymavlink import mavutil
 
 from utilities.workers import worker_controller
+from utilities.workers import queue_closed
 from utilities.workers import queue_proxy_wrapper
 from . import command
 from ..common.modules.logger import logger
+from ..telemetry import telemetry
 
 
 def command_worker(
@@ -21,9 +23,20 @@ def command_worker(
     args: worker_controller.WorkerController,
     telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
     command_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    hold_off: float = 0.0,
+    param_threshold: float = 0.0,
+    ack_timeout: float = 0.0,
+    max_retries: int = 0,
 ) -> None:
     """
     Worker process that consumes telemetry data and produces commands.
+
+    hold_off: Seconds during which an identical command is not sent again,
+    0 sends every command.
+    param_threshold: Largest change of any parameter that still counts as identical.
+    ack_timeout: Seconds to wait for an acknowledgement before retrying,
+    0 does not track acknowledgements.
+    max_retries: Number of retries before a command is considered failed.
     """
 
     # Instantiate logger
@@ -43,6 +56,10 @@ def command_worker(
         target,
         args,
         local_logger,
+        hold_off,
+        param_threshold,
+        ack_timeout,
+        max_retries,
     )
 
     if not result or command_logic is None:
@@ -54,15 +71,25 @@ def command_worker(
         try:
             args.check_pause()
 
-            try:
-                telemetry_data = telemetry_queue.queue.get(timeout=0.1)
-            except Exception:
-                continue
+            # Catch up on every pending sample with a single round trip
+            telemetry_batch = telemetry_queue.get_many(telemetry_queue.maxsize, timeout=0.1)
+
+            results = []
+            for telemetry_bytes in telemetry_batch:
+                telemetry_data = telemetry.TelemetryData.from_bytes(telemetry_bytes)
+                result_str = command_logic.run(telemetry_data)
+
+                if result_str is not None:
+                    results.append(result_str)
 
-            result_str = command_logic.run(telemetry_data)
+            command_queue.put_many(results)
 
-            if result_str is not None:
-                command_queue.queue.put(result_str)
+            command_logic.process_acks()
+
+        except queue_closed.QueueClosed:
+            break
 
         except Exception as exc:
             local_logger.error(f"Command worker error: {exc}", True)
+
+    local_logger.info(f"Commands: {command_logic.command_manager.summary()}", True)
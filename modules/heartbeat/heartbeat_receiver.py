@@ -4,8 +4,11 @@ Heartbeat receiving logic.
 
 # pylint: disable=broad-exception-caught
 
+import time
+
 from pymavlink import mavutil
 
+from utilities.workers import worker_controller
 from ..common.modules.logger import logger
 
 
@@ -15,10 +18,14 @@ from ..common.modules.logger import logger
 class HeartbeatReceiver:
     """
     HeartbeatReceiver class to receive heartbeats.
+
+    If the connection has a file descriptor, waits on it together with the worker controller
+    and parses every available message per wakeup, otherwise blocks in `recv_match()`.
     """
 
     __private_key = object()
     __MAX_MISSED = 5
+    __PERIOD = 1  # seconds
 
     @classmethod
     def create(
@@ -50,30 +57,58 @@ class HeartbeatReceiver:
         self.missed_heartbeats = 0
         self.connected = False
 
-    def run(self, _args: object) -> str | None:
+        # Sockets and serial ports have one, routed connections do not
+        self.fd = getattr(connection, "fd", None)
+        # A heartbeat counts as missed if none is received by then
+        self.deadline = time.monotonic() + self.__PERIOD
+
+    def run(self, args: worker_controller.WorkerController) -> str | None:
         """
         Attempt to receive a heartbeat message.
         If disconnected for over a threshold number of periods,
         the connection is considered disconnected.
+
+        Returns the status when a heartbeat is received or missed, otherwise None.
         """
+        timeout = max(self.deadline - time.monotonic(), 0.0)
+        received = False
 
-        msg = self.connection.recv_match(
-            type="HEARTBEAT",
-            blocking=True,
-            timeout=1,
-        )
+        if self.fd is None:
+            msg = self.connection.recv_match(type="HEARTBEAT", blocking=True, timeout=timeout)
+            received = msg is not None
+        elif args.wait_for_readable(self.fd, timeout):
+            # Parse everything that arrived, other message types are discarded
+            while self.connection.recv_match(type="HEARTBEAT", blocking=False) is not None:
+                received = True
 
-        if msg is not None:
-            self.missed_heartbeats = 0
+        if received:
+            return self.process_heartbeat()
 
-            if not self.connected:
-                self.connected = True
-                self.logger.info("Connected", True)
+        if time.monotonic() < self.deadline:
+            # Woken by other messages or by the worker controller
+            return None
 
-            return "Connected"
+        return self.process_missed()
 
-        # Missed heartbeat
+    def process_heartbeat(self) -> str:
+        """
+        Records a received heartbeat.
+        """
+        self.missed_heartbeats = 0
+        self.deadline = time.monotonic() + self.__PERIOD
+
+        if not self.connected:
+            self.connected = True
+            self.logger.info("Connected", True)
+
+        return "Connected"
+
+    def process_missed(self) -> str:
+        """
+        Records a period without heartbeat.
+        """
         self.missed_heartbeats += 1
+        self.deadline += self.__PERIOD
 
         if self.missed_heartbeats >= self.__MAX_MISSED:
             if self.connected:
@@ -6,9 +6,11 @@ Heartbeat worker that receives heartbeats periodically.
 
 import os
 import pathlib
+import time
 
 from pymavlink import mavutil
 
+from utilities.workers import queue_closed
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers.worker_controller import WorkerController
 from . import heartbeat_receiver
@@ -65,9 +67,15 @@ def heartbeat_receiver_worker(
             args.check_pause()
 
             status = receiver.run(args)
+            if status is None:
+                continue
 
-            # Send status to main process
-            status_queue.queue.put(status)
+            # Send status to main process, timestamped to measure how long main takes to react
+            # Disconnects skip ahead of any backlog of routine statuses
+            status_queue.put((status, time.time()), status == "Disconnected")
+
+        except queue_closed.QueueClosed:
+            break
 
         except Exception as exc:
             local_logger.error(f"Heartbeat receiver error: {exc}", True)
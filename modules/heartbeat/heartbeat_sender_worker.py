@@ -14,6 +14,11 @@ from utilities.workers.worker_controller import WorkerController
 from . import heartbeat_sender
 from ..common.modules.logger import logger
 
+HEARTBEAT_PERIOD = 1  # seconds
+# A heartbeat due this soon after exit is requested is still sent on time before exiting,
+# so the last period is not cut short
+EXIT_GRACE_PERIOD = 0.1  # seconds
+
 
 # =================================================================================================
 #                            ↓ BOOTCAMPERS MODIFY BELOW THIS COMMENT ↓
@@ -58,9 +63,14 @@ def heartbeat_sender_worker(
             args.check_pause()
 
             sender.run(args)
-
-            # Send heartbeat once per second
-            time.sleep(1)
+            next_time = time.monotonic() + HEARTBEAT_PERIOD
+
+            # Send heartbeat once per second, waking early on exit
+            if args.wait_for_exit(HEARTBEAT_PERIOD):
+                remaining = next_time - time.monotonic()
+                if remaining <= EXIT_GRACE_PERIOD:
+                    time.sleep(max(remaining, 0))
+                    sender.run(args)
 
         except Exception as exc:
             local_logger.error(f"Heartbeat send failed: {exc}", True)
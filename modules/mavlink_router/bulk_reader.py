@@ -0,0 +1,118 @@
+"""
+Reads MAVLink from a socket in large chunks.
+"""
+
+import socket
+
+from pymavlink import mavutil
+
+
+class BulkMavlinkReader:
+    """
+    Receives everything available on the connection socket into a preallocated buffer
+    with 1 system call, and decodes every complete frame in it in a single pass.
+
+    Replaces `recv_match()` for that connection, which reads a few bytes per call.
+    Messages are not passed to `mavfile.post_message()`, so the statistics `mavutil` keeps
+    per connection (for example `mavfile.messages`) are not updated.
+    """
+
+    __STX_V1 = 0xFE
+    __STX_V2 = 0xFD
+    __HEADER_SIZE_V1 = 6
+    __HEADER_SIZE_V2 = 10
+    __CHECKSUM_SIZE = 2
+    __SIGNATURE_SIZE = 13
+    __SIGNED_FLAG = 0x01
+    __MAX_FRAME_SIZE = 280
+
+    DEFAULT_BUFFER_SIZE = 65536  # bytes
+
+    def __init__(self, connection: mavutil.mavfile, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        connection: TCP connection, its socket must be non-blocking like `mavutil` creates it.
+        buffer_size: Bytes received at most per read, must hold at least 2 frames.
+        """
+        port = getattr(connection, "port", None)
+        if not isinstance(port, socket.socket) or port.type != socket.SOCK_STREAM:
+            raise ValueError("Bulk reading requires a TCP connection")
+
+        if buffer_size < 2 * self.__MAX_FRAME_SIZE:
+            raise ValueError(f"Buffer must hold at least 2 frames, got {buffer_size} bytes")
+
+        self.connection = connection
+        self.fd = connection.port.fileno()
+
+        self.__buffer = bytearray(buffer_size)
+        self.__view = memoryview(self.__buffer)
+        # Bytes of an incomplete frame kept at the start of the buffer
+        self.__size = 0
+
+        self.bad_data_count = 0
+
+    def read_messages(self) -> "list[mavutil.mavlink.MAVLink_message]":
+        """
+        Receives whatever is available without waiting and decodes it.
+
+        Returns the complete messages in order, empty if nothing was available.
+        Raises `ConnectionError` if the peer closed the connection.
+        """
+        try:
+            received = self.connection.port.recv_into(self.__view[self.__size :])
+        except BlockingIOError:
+            return []
+
+        if received == 0:
+            raise ConnectionError("Connection closed by peer")
+
+        self.__size += received
+        return self.__decode_frames()
+
+    def __decode_frames(self) -> "list[mavutil.mavlink.MAVLink_message]":
+        """
+        Decodes every complete frame in the buffer and moves the remainder to the start.
+        Bytes that are not part of a valid frame are skipped.
+        """
+        buffer = self.__buffer
+        decoder = self.connection.mav
+        messages = []
+
+        start = 0
+        while start < self.__size:
+            stx = buffer[start]
+            if stx == self.__STX_V2:
+                header_size = self.__HEADER_SIZE_V2
+            elif stx == self.__STX_V1:
+                header_size = self.__HEADER_SIZE_V1
+            else:
+                # Resynchronize on the next start byte
+                start += 1
+                self.bad_data_count += 1
+                continue
+
+            if start + header_size > self.__size:
+                break
+
+            frame_size = header_size + buffer[start + 1] + self.__CHECKSUM_SIZE
+            if stx == self.__STX_V2 and buffer[start + 2] & self.__SIGNED_FLAG:
+                frame_size += self.__SIGNATURE_SIZE
+
+            if start + frame_size > self.__size:
+                break
+
+            try:
+                messages.append(decoder.decode(buffer[start : start + frame_size]))
+            except mavutil.mavlink.MAVError:
+                # Start byte inside other data, try the next one
+                start += 1
+                self.bad_data_count += 1
+                continue
+
+            start += frame_size
+
+        # Keep the incomplete frame for the next read
+        remainder = self.__size - start
+        buffer[:remainder] = buffer[start : self.__size]
+        self.__size = remainder
+
+        return messages
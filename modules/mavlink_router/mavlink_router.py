@@ -0,0 +1,178 @@
+"""
+Owns the MAVLink connection: reads and writes on behalf of every worker.
+"""
+
+# pylint: disable=broad-exception-caught,too-many-instance-attributes
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_controller
+from . import bulk_reader
+from . import outbound_writer
+from . import reconnecting_connection
+from ..common.modules.logger import logger
+
+
+class MavlinkRouter:
+    """
+    Only reader and writer of the connection.
+    Each received message is decoded once and its frame is forwarded to the queues
+    subscribed to its type, or to its type from its vehicle,
+    and its outbound writer sends the frames of every worker in order.
+
+    If the connection has a file descriptor, waits on it together with the worker controller
+    and forwards every available message per wakeup, otherwise blocks in `recv_match()`.
+    TCP connections are read in bulk.
+    """
+
+    __private_key = object()
+
+    # Longest wait for a message before checking for exit
+    __RECEIVE_TIMEOUT = 0.1  # seconds
+
+    @classmethod
+    def create(
+        cls,
+        connection: mavutil.mavfile,
+        routes: "dict[str | tuple[int, str], list[queue_proxy_wrapper.QueueProxyWrapper]]",
+        outbound_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        local_logger: logger.Logger,
+    ) -> "tuple[bool, MavlinkRouter | None]":
+        """
+        Fallible create (instantiation) method to create a MavlinkRouter object.
+
+        routes: Queues to forward each message type to, other types are dropped.
+        A `(system ID, message type)` key routes the messages of one vehicle only,
+        and takes precedence over the message type alone.
+        outbound_queue: Frames to send, from `routed_connection.RoutedConnection`.
+        """
+        try:
+            return True, cls(cls.__private_key, connection, routes, outbound_queue, local_logger)
+        except Exception as exc:
+            local_logger.error(f"Failed to create MavlinkRouter: {exc}", True)
+            return False, None
+
+    def __init__(
+        self,
+        key: object,
+        connection: mavutil.mavfile,
+        routes: "dict[str | tuple[int, str], list[queue_proxy_wrapper.QueueProxyWrapper]]",
+        outbound_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        local_logger: logger.Logger,
+    ) -> None:
+        assert key is MavlinkRouter.__private_key, "Use create() method"
+
+        self.connection = connection
+        self.routes = routes
+        self.outbound_queue = outbound_queue
+        self.logger = local_logger
+
+        self.fd = None
+        self.bulk_reader = None
+        self.__attach()
+
+        # Writes from its own thread, so sending never waits for reception
+        self.writer = outbound_writer.OutboundWriter(connection, outbound_queue, local_logger)
+
+        self.routed_count = 0
+        self.unrouted_count = 0
+
+    def run(self, args: worker_controller.WorkerController) -> None:
+        """
+        Waits briefly for messages and forwards them.
+        """
+        if self.fd is None:
+            self.route(self.connection.recv_match(blocking=True, timeout=self.__RECEIVE_TIMEOUT))
+            return
+
+        if not args.wait_for_readable(self.fd, self.__RECEIVE_TIMEOUT):
+            return
+
+        if self.bulk_reader is not None:
+            try:
+                messages = self.bulk_reader.read_messages()
+            except ConnectionError as exc:
+                if not self.__reconnect(args, exc):
+                    # mavutil handles reconnecting
+                    self.logger.error(f"Bulk read failed, falling back to mavutil: {exc}", True)
+                    self.bulk_reader = None
+
+                return
+
+            for msg in messages:
+                self.route(msg)
+
+            return
+
+        while True:
+            try:
+                msg = self.connection.recv_match(blocking=False)
+            except OSError as exc:
+                if not self.__reconnect(args, exc):
+                    raise
+
+                return
+
+            if msg is None:
+                return
+
+            self.route(msg)
+
+    def route(self, msg: "mavutil.mavlink.MAVLink_message | None") -> None:
+        """
+        Forwards the frame of a received message to its subscribers.
+        """
+        if msg is None:
+            return
+
+        message_type = msg.get_type()
+        subscribers = self.routes.get((msg.get_srcSystem(), message_type))
+        if subscribers is None:
+            subscribers = self.routes.get(message_type)
+
+        if subscribers is None:
+            self.unrouted_count += 1
+            return
+
+        frame = bytes(msg.get_msgbuf())
+        for subscriber in subscribers:
+            # Subscriber backpressure policy keeps a slow worker from stalling reception
+            subscriber.put(frame)
+
+        self.routed_count += 1
+
+    def __attach(self) -> None:
+        """
+        Sets up reading the current connection.
+        """
+        # Sockets and serial ports have one
+        self.fd = getattr(self.connection, "fd", None)
+
+        self.bulk_reader = None
+        if self.fd is not None:
+            try:
+                self.bulk_reader = bulk_reader.BulkMavlinkReader(self.connection)
+            except ValueError:
+                # Not TCP, read through mavutil
+                pass
+
+    def __reconnect(self, args: worker_controller.WorkerController, exc: Exception) -> bool:
+        """
+        Re-establishes a lost link if the connection can, while workers keep running.
+
+        Returns whether the connection can reconnect.
+        """
+        # mavutil connections have their own reconnect(), which only acts with autoreconnect
+        if not isinstance(self.connection, reconnecting_connection.ReconnectingConnection):
+            return False
+
+        self.logger.warning(f"Link lost, reconnecting: {exc}", True)
+        if not self.connection.reconnect(args):
+            # Exit requested
+            return True
+
+        self.logger.info(f"Reconnected: {self.connection.summary()}", True)
+        self.__attach()
+
+        return True
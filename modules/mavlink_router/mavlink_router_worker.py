@@ -0,0 +1,80 @@
+"""
+MAVLink router worker that owns the connection.
+"""
+
+# pylint: disable=broad-exception-caught
+
+import os
+import pathlib
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_closed
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers.worker_controller import WorkerController
+from . import mavlink_router
+from . import reconnecting_connection
+from ..common.modules.logger import logger
+
+
+def mavlink_router_worker(
+    connection: mavutil.mavfile,
+    routes: "dict[str | tuple[int, str], list[queue_proxy_wrapper.QueueProxyWrapper]]",
+    args: WorkerController,
+    outbound_queue: queue_proxy_wrapper.QueueProxyWrapper,
+) -> None:
+    """
+    Worker process.
+
+    routes: Queues to forward each message type to.
+    args: WorkerController instance controlling pause/exit
+    outbound_queue: Frames from the other workers to send
+    """
+    # Instantiate logger
+    worker_name = pathlib.Path(__file__).stem
+    process_id = os.getpid()
+    result, local_logger = logger.Logger.create(f"{worker_name}_{process_id}", True)
+    if not result:
+        print("ERROR: Worker failed to create logger")
+        return
+
+    assert local_logger is not None
+    local_logger.info("Logger initialized", True)
+
+    # Instantiate MavlinkRouter
+    result, router = mavlink_router.MavlinkRouter.create(
+        connection,
+        routes,
+        outbound_queue,
+        local_logger,
+    )
+    if not result or router is None:
+        local_logger.error("Failed to create MavlinkRouter", True)
+        return
+
+    # Sends until the outbound queue is closed, also while paused
+    router.writer.start()
+
+    # Main loop
+    while not args.is_exit_requested():
+        try:
+            args.check_pause()
+
+            router.run(args)
+
+        except queue_closed.QueueClosed:
+            break
+
+        except Exception as exc:
+            local_logger.error(f"MAVLink router error: {exc}", True)
+
+    router.writer.stop()
+    local_logger.info(f"Outbound writes: {router.writer.summary()}", True)
+    if isinstance(connection, reconnecting_connection.ReconnectingConnection):
+        local_logger.info(f"Link: {connection.summary()}", True)
+
+    local_logger.info(
+        f"MAVLink router exiting, routed {router.routed_count} messages, "
+        f"dropped {router.unrouted_count} unrouted",
+        True,
+    )
@@ -0,0 +1,168 @@
+"""
+Sends the frames of every worker with as few writes as possible.
+"""
+
+# pylint: disable=broad-exception-caught,too-many-instance-attributes
+
+import select
+import socket
+import threading
+import time
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_closed
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_statistics
+from ..common.modules.logger import logger
+
+
+class OutboundWriter:
+    """
+    Thread which alone writes to the connection: each wakeup takes every pending frame
+    from the outbound queue and sends them together.
+
+    Frames are `(enqueue time, frame)` pairs as put by `RoutedConnection`,
+    the time since then is recorded as queue delay.
+    Stream connections get the frames in a single write, datagram connections one per frame
+    since each datagram is a separate packet anyway.
+    """
+
+    # Longest wait for a frame before checking whether to stop
+    __WAIT_TIMEOUT = 0.1  # seconds
+
+    def __init__(
+        self,
+        connection: mavutil.mavfile,
+        outbound_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        local_logger: logger.Logger,
+    ) -> None:
+        """
+        connection: Connection to write to.
+        outbound_queue: Frames from the workers.
+        """
+        self.connection = connection
+        self.outbound_queue = outbound_queue
+        self.logger = local_logger
+
+        self.__thread = None
+        self.__is_stop_requested = threading.Event()
+
+        self.write_count = 0
+        self.frame_count = 0
+        self.byte_count = 0
+        self.max_frames_per_write = 0
+        # Time from a worker sending to the frame being written, in `queue_statistics` buckets
+        self.queue_delay_histogram = [0] * queue_statistics.NUM_BUCKETS
+        self.max_queue_delay = 0.0
+
+    def start(self) -> None:
+        """
+        Starts writing in a background thread.
+        """
+        self.__is_stop_requested.clear()
+        self.__thread = threading.Thread(target=self.__run, name="outbound_writer", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Sends what is pending and stops the thread.
+        """
+        if self.__thread is None:
+            return
+
+        self.__is_stop_requested.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def write_pending(self, timeout: "float | None" = 0.0) -> int:
+        """
+        Waits for frames and sends every pending one.
+        Raises `QueueClosed` once the outbound queue is closed and empty.
+
+        timeout: Time waiting in seconds, 0 does not wait and None waits forever.
+
+        Returns the number of frames sent.
+        """
+        items = self.outbound_queue.get_many(0, timeout)
+        if len(items) == 0:
+            return 0
+
+        now = time.time()
+        frames = []
+        for enqueue_time, frame in items:
+            delay = max(now - enqueue_time, 0.0)
+            self.queue_delay_histogram[queue_statistics.bucket_index(int(delay * 1e9))] += 1
+            self.max_queue_delay = max(self.max_queue_delay, delay)
+            frames.append(frame)
+
+        # Looked up every time, `mavutil` replaces the socket when reconnecting
+        port = getattr(self.connection, "port", None)
+        if not isinstance(port, socket.socket):
+            self.connection.write(b"".join(frames))
+        elif port.type == socket.SOCK_DGRAM:
+            for frame in frames:
+                self.connection.write(frame)
+        else:
+            self.__send_all(port, b"".join(frames))
+
+        self.write_count += 1
+        self.frame_count += len(frames)
+        self.byte_count += sum(len(frame) for frame in frames)
+        self.max_frames_per_write = max(self.max_frames_per_write, len(frames))
+
+        return len(frames)
+
+    def summary(self) -> str:
+        """
+        Formats the write counters and queue delay percentiles for logging.
+        """
+        if self.write_count == 0:
+            return "nothing written"
+
+        delay_p50 = queue_statistics.histogram_percentile(self.queue_delay_histogram, 0.5)
+        delay_p99 = queue_statistics.histogram_percentile(self.queue_delay_histogram, 0.99)
+
+        return (
+            f"{self.frame_count} frames in {self.write_count} writes"
+            f", {self.frame_count / self.write_count:.2f} frames"
+            f" and {self.byte_count / self.write_count:.0f} bytes per write"
+            f" (max {self.max_frames_per_write} frames)"
+            f", queue delay p50 < {delay_p50 * 1e6:.0f} us p99 < {delay_p99 * 1e6:.0f} us"
+            f" max {self.max_queue_delay * 1e6:.0f} us"
+        )
+
+    def __run(self) -> None:
+        """
+        Writes until stopped or the outbound queue is closed.
+        """
+        while True:
+            try:
+                if self.__is_stop_requested.is_set():
+                    # Flush what the workers sent before stopping
+                    self.write_pending()
+                    return
+
+                self.write_pending(self.__WAIT_TIMEOUT)
+
+            except queue_closed.QueueClosed:
+                return
+
+            except Exception as exc:
+                self.logger.error(f"Outbound write failed: {exc}", True)
+
+    @staticmethod
+    def __send_all(port: socket.socket, data: bytes) -> None:
+        """
+        `socket.sendall()` for the non-blocking socket `mavutil` creates,
+        waiting until writable whenever the send buffer is full.
+        """
+        view = memoryview(data)
+        while len(view) > 0:
+            try:
+                sent = port.send(view)
+            except BlockingIOError:
+                select.select([], [port], [])
+                continue
+
+            view = view[sent:]
@@ -0,0 +1,205 @@
+"""
+MAVLink connection which re-establishes itself when the link drops.
+"""
+
+# pylint: disable=broad-exception-caught,too-many-instance-attributes
+
+import time
+
+from pymavlink import mavutil
+
+from utilities.workers import worker_controller
+from . import stream_rates
+from . import transport
+
+
+class ReconnectingConnection:
+    """
+    Stands in for the `mavutil.mavfile` it currently wraps, forwarding every attribute to it,
+    and replaces it with a new one on `reconnect()`.
+
+    Attempts wait twice as long after each failure, up to a maximum,
+    and an attempt succeeds once the new link delivers a heartbeat.
+    Stream rates are requested again after reconnecting, since the autopilot may have restarted.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        rates: list[stream_rates.StreamRates] | None = None,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        heartbeat_timeout: float = 2.0,
+        receive_buffer_size: int = 0,
+        send_buffer_size: int = 0,
+        **connection_kwargs: object,
+    ) -> None:
+        """
+        connection_string: Same as `mavutil.mavlink_connection()`.
+        rates: Of every vehicle, requested again after every reconnection, can be set later.
+        initial_backoff: Seconds to wait after the first failed attempt.
+        max_backoff: Longest wait in seconds between attempts.
+        heartbeat_timeout: Seconds to wait for a heartbeat on a new link.
+        receive_buffer_size: `SO_RCVBUF` of every new link in bytes, 0 keeps the system default.
+        send_buffer_size: `SO_SNDBUF` of every new link in bytes, 0 keeps the system default.
+        connection_kwargs: Passed to `mavutil.mavlink_connection()`.
+        """
+        if initial_backoff <= 0 or max_backoff < initial_backoff:
+            raise ValueError(
+                f"Backoff must be positive and not above its maximum, "
+                f"got {initial_backoff} and {max_backoff}"
+            )
+
+        self.connection_string = connection_string
+        self.rates = [] if rates is None else list(rates)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.heartbeat_timeout = heartbeat_timeout
+        self.receive_buffer_size = receive_buffer_size
+        self.send_buffer_size = send_buffer_size
+        # Attempts are paced here, not by `mavutil` retrying with a fixed delay
+        self.connection_kwargs = {"retries": 0, **connection_kwargs}
+
+        self.connection = None
+        # (receive, send) buffer sizes in effect, None if not a socket
+        self.socket_buffer_sizes = None
+
+        self.reconnect_count = 0
+        self.failed_attempt_count = 0
+        # Time from starting the successful attempt to its heartbeat
+        self.last_reconnect_time = 0.0
+        # Time from the link loss being detected to the link being back
+        self.last_outage = 0.0
+        self.max_outage = 0.0
+        self.total_outage = 0.0
+
+    def __getattr__(self, name: str) -> object:
+        # Only called for attributes not found on the wrapper itself
+        connection = self.__dict__.get("connection")
+        if connection is None:
+            raise AttributeError(f"Not connected, no attribute {name}")
+
+        return getattr(connection, name)
+
+    def write(self, buf: bytes) -> None:
+        """
+        Same as `mavutil.mavfile.write()`, dropped while not connected.
+        """
+        connection = self.connection
+        if connection is None:
+            return
+
+        connection.write(buf)
+
+    def connect(
+        self,
+        timeout: "float | None" = None,
+        controller: worker_controller.WorkerController | None = None,
+    ) -> bool:
+        """
+        Attempts to connect with backoff until a heartbeat is received.
+
+        timeout: Seconds to keep trying for, None tries forever.
+        controller: Stops trying once exit is requested, None keeps trying.
+
+        Returns whether connected.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        backoff = self.initial_backoff
+
+        while True:
+            if self.__attempt():
+                return True
+
+            self.failed_attempt_count += 1
+
+            if deadline is not None:
+                backoff = min(backoff, deadline - time.monotonic())
+                if backoff <= 0:
+                    return False
+
+            if controller is None:
+                time.sleep(backoff)
+            elif controller.wait_for_exit(backoff):
+                return False
+
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def reconnect(self, controller: worker_controller.WorkerController | None = None) -> bool:
+        """
+        Replaces the connection after the link has been lost, and requests stream rates again.
+
+        controller: Stops trying once exit is requested, None keeps trying.
+
+        Returns whether reconnected.
+        """
+        outage_start = time.monotonic()
+
+        self.close()
+        if not self.connect(controller=controller):
+            return False
+
+        for vehicle_rates in self.rates:
+            vehicle_rates.replay()
+
+        self.reconnect_count += 1
+        self.last_outage = time.monotonic() - outage_start
+        self.max_outage = max(self.max_outage, self.last_outage)
+        self.total_outage += self.last_outage
+
+        return True
+
+    def close(self) -> None:
+        """
+        Closes the current connection, if any.
+        """
+        if self.connection is None:
+            return
+
+        try:
+            self.connection.close()
+        except Exception:
+            # Already broken
+            pass
+
+        self.connection = None
+
+    def summary(self) -> str:
+        """
+        Formats the reconnection metrics for logging.
+        """
+        return (
+            f"reconnected {self.reconnect_count} times, {self.failed_attempt_count} failed attempts"
+            f", last reconnect {self.last_reconnect_time * 1000:.1f} ms"
+            f", outage last {self.last_outage * 1000:.1f} ms max {self.max_outage * 1000:.1f} ms"
+            f" total {self.total_outage:.1f} s"
+        )
+
+    def __attempt(self) -> bool:
+        """
+        Opens a new connection and waits for a heartbeat on it.
+        """
+        start = time.monotonic()
+
+        try:
+            connection = mavutil.mavlink_connection(
+                self.connection_string, **self.connection_kwargs
+            )
+        except Exception:
+            return False
+
+        # Before the peer starts sending
+        self.socket_buffer_sizes = transport.set_socket_buffers(
+            connection, self.receive_buffer_size, self.send_buffer_size
+        )
+        # A listening UDP peer only sends once it has heard from us
+        transport.announce(connection)
+
+        if connection.wait_heartbeat(timeout=self.heartbeat_timeout) is None:
+            connection.close()
+            return False
+
+        self.connection = connection
+        self.last_reconnect_time = time.monotonic() - start
+
+        return True
@@ -0,0 +1,103 @@
+"""
+Connection used by workers behind the MAVLink router.
+"""
+
+import queue
+import time
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_proxy_wrapper
+
+
+class RoutedConnection:
+    """
+    Stands in for `mavutil.mavfile` in a worker process:
+    `recv_match()` reads the frames the router forwards to this worker,
+    and `mav` sends by handing packed frames to the router, which alone writes to the socket.
+    """
+
+    def __init__(
+        self,
+        inbound_queue: "queue_proxy_wrapper.QueueProxyWrapper | None",
+        outbound_queue: queue_proxy_wrapper.QueueProxyWrapper,
+        source_system: int = 255,
+        source_component: int = 0,
+    ) -> None:
+        """
+        inbound_queue: Frames routed to this worker, None if it only sends.
+        outbound_queue: Frames for the router to send, with the time they were sent.
+        source_system: MAVLink system ID of sent messages, same default as `mavutil`.
+        source_component: MAVLink component ID of sent messages, same default as `mavutil`.
+        """
+        self.inbound_queue = inbound_queue
+        self.outbound_queue = outbound_queue
+        self.source_system = source_system
+        self.source_component = source_component
+
+        # Created in the worker process, the encoder state is not picklable
+        self.__mav = None
+
+    @property
+    def mav(self) -> mavutil.mavlink.MAVLink:
+        """
+        Encoder and decoder, sending writes to the router.
+        """
+        if self.__mav is None:
+            self.__mav = mavutil.mavlink.MAVLink(self, self.source_system, self.source_component)
+
+        return self.__mav
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_RoutedConnection__mav"] = None
+        return state
+
+    def write(self, frame: bytes) -> None:
+        """
+        Sends a packed frame through the router, called by `mav`.
+        Raises `QueueClosed` if the router has been closed.
+        """
+        self.outbound_queue.put((time.time(), bytes(frame)))
+
+    def recv_frame(self, blocking: bool = False, timeout: "float | None" = None) -> "bytes | None":
+        """
+        Returns the next routed frame undecoded, None on timeout.
+        Raises `QueueClosed` if the router has been closed.
+        """
+        if self.inbound_queue is None:
+            return None
+
+        try:
+            return self.inbound_queue.queue.get(blocking, timeout)
+        except queue.Empty:
+            return None
+
+    def recv_match(
+        self,
+        condition: None = None,
+        type: "str | list[str] | None" = None,  # pylint: disable=redefined-builtin
+        blocking: bool = False,
+        timeout: "float | None" = None,
+    ) -> "mavutil.mavlink.MAVLink_message | None":
+        """
+        Same as `mavutil.mavfile.recv_match()` without conditions:
+        returns the next routed message of the given types, None on timeout.
+        Raises `QueueClosed` if the router has been closed.
+        """
+        assert condition is None, "Conditions are not supported"
+
+        types = type
+        if isinstance(types, str):
+            types = [types]
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            frame = self.recv_frame(blocking, remaining)
+            if frame is None:
+                return None
+
+            message = self.mav.decode(bytearray(frame))
+            if types is None or message.get_type() in types:
+                return message
@@ -0,0 +1,301 @@
+"""
+Asks the autopilot for the message rates the pipeline needs.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import time
+
+from pymavlink import mavutil
+
+
+class StreamRates:
+    """
+    Requests each message at its target rate with `MAV_CMD_SET_MESSAGE_INTERVAL`,
+    falling back to the deprecated `REQUEST_DATA_STREAM` if the autopilot rejects it
+    or does not answer, and measures the rates achieved from message arrival intervals.
+
+    Works with any connection, including routed ones, so rates can be changed at runtime.
+    At runtime, whoever reads the connection hands acknowledgements to `process_ack()`
+    and calls `fall_back_expired()` periodically.
+    """
+
+    # Streams of the fallback, which cannot set messages individually
+    __DATA_STREAMS = {
+        "LOCAL_POSITION_NED": mavutil.mavlink.MAV_DATA_STREAM_POSITION,
+        "ATTITUDE": mavutil.mavlink.MAV_DATA_STREAM_EXTRA1,
+    }
+    __DISABLE_INTERVAL = -1  # microseconds
+
+    def __init__(
+        self,
+        connection: mavutil.mavfile,
+        target_rates: "dict[str, float]",
+        target_system: int = 1,
+        target_component: int = 0,
+        ack_timeout: float = 1.0,
+    ) -> None:
+        """
+        connection: Connection to send requests on.
+        target_rates: Rate in Hz of each message type, 0 stops the message.
+        target_system: System ID of the autopilot.
+        target_component: Component ID of the autopilot.
+        ack_timeout: Seconds to wait for an acknowledgement at runtime before falling back.
+        """
+        for message_type, rate in target_rates.items():
+            self.__message_id(message_type)
+            if rate < 0:
+                raise ValueError(f"Rate of {message_type} must not be negative, got {rate}")
+
+        self.connection = connection
+        self.target_rates = dict(target_rates)
+        self.target_system = target_system
+        self.target_component = target_component
+        self.ack_timeout = ack_timeout
+
+        # (message type, send time) of requests waiting for acknowledgement, in sending order
+        self.__pending = []
+        # Message type to how its rate was set: "interval", "data stream" or "failed"
+        self.methods = {}
+
+        # Message type to (count, first arrival, last arrival) since the last reset
+        self.__arrivals = {}
+
+    def request_all(self) -> None:
+        """
+        Requests every target rate.
+        """
+        for message_type, rate in self.target_rates.items():
+            self.set_rate(message_type, rate)
+
+    def set_rate(self, message_type: str, rate: float) -> None:
+        """
+        Requests a message at a rate, and makes it the target.
+
+        rate: Rate in Hz, 0 stops the message.
+        """
+        message_id = self.__message_id(message_type)
+        if rate < 0:
+            raise ValueError(f"Rate of {message_type} must not be negative, got {rate}")
+
+        self.target_rates[message_type] = rate
+
+        interval = self.__DISABLE_INTERVAL if rate == 0 else 1_000_000 / rate
+        self.connection.mav.command_long_send(
+            self.target_system,
+            self.target_component,
+            mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL,
+            0,
+            message_id,  # param1: message ID
+            interval,  # param2: interval in microseconds
+            0,
+            0,
+            0,
+            0,
+            0,
+        )
+        self.__pending.append((message_type, time.monotonic()))
+
+    def replay(self) -> None:
+        """
+        Requests every target rate again the way it was set before, for a new link.
+        Acknowledgements are not expected.
+        """
+        for message_type, rate in self.target_rates.items():
+            if self.methods.get(message_type) == "data stream":
+                self.__request_data_stream(message_type)
+            else:
+                self.set_rate(message_type, rate)
+
+        self.__pending.clear()
+
+    def process_ack(self, msg: "mavutil.mavlink.MAVLink_command_ack_message") -> bool:
+        """
+        Matches an acknowledgement with the oldest pending request,
+        falling back to a data stream request if rejected.
+
+        Returns whether it acknowledged a request.
+        """
+        if msg.command != mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL or len(self.__pending) == 0:
+            return False
+
+        if msg.get_srcSystem() != self.target_system:
+            return False
+
+        message_type, _ = self.__pending.pop(0)
+        if msg.result == mavutil.mavlink.MAV_RESULT_ACCEPTED:
+            self.methods[message_type] = "interval"
+        else:
+            self.__request_data_stream(message_type)
+
+        return True
+
+    def negotiate(self, duration: float) -> "dict[str, float]":
+        """
+        Requests every target rate and reads the connection for the duration,
+        to collect acknowledgements and measure the rates achieved.
+        Requests not acknowledged by then fall back to data streams.
+        Call before any other reader of the connection starts.
+
+        duration: Seconds to read for.
+
+        Returns the rates achieved.
+        """
+        self.negotiate_all([self], duration)
+
+        return self.achieved_rates()
+
+    @staticmethod
+    def negotiate_all(vehicle_rates: "list[StreamRates]", duration: float) -> None:
+        """
+        Same as `negotiate()` for several vehicles on the same connection at once,
+        each message goes to the rates of the vehicle that sent it.
+
+        vehicle_rates: Rates of each vehicle, all on the same connection.
+        duration: Seconds to read for.
+        """
+        if len(vehicle_rates) == 0:
+            return
+
+        for rates in vehicle_rates:
+            rates.request_all()
+            rates.reset_measurement()
+
+        connection = vehicle_rates[0].connection
+        deadline = time.monotonic() + duration
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            msg = connection.recv_match(blocking=True, timeout=remaining)
+            if msg is None:
+                continue
+
+            is_ack = msg.get_type() == "COMMAND_ACK"
+            for rates in vehicle_rates:
+                if is_ack:
+                    rates.process_ack(msg)
+                else:
+                    rates.record(msg)
+
+        for rates in vehicle_rates:
+            rates.fall_back_pending()
+
+    def fall_back_pending(self) -> None:
+        """
+        Requests data streams for every request not acknowledged.
+        """
+        for message_type, _ in self.__pending:
+            self.__request_data_stream(message_type)
+
+        self.__pending.clear()
+
+    def fall_back_expired(self) -> int:
+        """
+        Requests data streams for every request not acknowledged within the timeout.
+
+        Returns the number of requests that fell back.
+        """
+        deadline = time.monotonic() - self.ack_timeout
+        count = 0
+        while len(self.__pending) > 0 and self.__pending[0][1] <= deadline:
+            message_type, _ = self.__pending.pop(0)
+            self.__request_data_stream(message_type)
+            count += 1
+
+        return count
+
+    def pending_count(self) -> int:
+        """
+        Returns the number of requests waiting for an acknowledgement.
+        """
+        return len(self.__pending)
+
+    def record(self, msg: "mavutil.mavlink.MAVLink_message") -> None:
+        """
+        Records the arrival of a message, if sent by the target system.
+        """
+        message_type = msg.get_type()
+        if message_type not in self.target_rates or msg.get_srcSystem() != self.target_system:
+            return
+
+        now = time.monotonic()
+        count, first, _ = self.__arrivals.get(message_type, (0, now, now))
+        self.__arrivals[message_type] = (count + 1, first, now)
+
+    def reset_measurement(self) -> None:
+        """
+        Starts measuring from scratch, for example after changing a rate.
+        """
+        self.__arrivals.clear()
+
+    def achieved_rates(self) -> "dict[str, float]":
+        """
+        Returns the rate in Hz of each target message type from the mean interval
+        between arrivals, 0 for those received less than twice.
+        """
+        rates = {}
+        for message_type in self.target_rates:
+            count, first, last = self.__arrivals.get(message_type, (0, 0.0, 0.0))
+            if count < 2 or last <= first:
+                rates[message_type] = 0.0
+            else:
+                rates[message_type] = (count - 1) / (last - first)
+
+        return rates
+
+    def mismatches(self, tolerance: float = 0.2) -> "dict[str, tuple[float, float]]":
+        """
+        Returns the (target, achieved) rates of the message types off target.
+
+        tolerance: Largest accepted difference as a fraction of the target rate.
+        """
+        return {
+            message_type: (self.target_rates[message_type], achieved)
+            for message_type, achieved in self.achieved_rates().items()
+            if abs(achieved - self.target_rates[message_type])
+            > tolerance * self.target_rates[message_type]
+        }
+
+    def summary(self) -> str:
+        """
+        Formats target and achieved rates for logging.
+        """
+        achieved_rates = self.achieved_rates()
+        return ", ".join(
+            f"{message_type} {achieved_rates[message_type]:.1f}/{rate:.1f} Hz"
+            f" ({self.methods.get(message_type, 'pending')})"
+            for message_type, rate in self.target_rates.items()
+        )
+
+    def __request_data_stream(self, message_type: str) -> None:
+        """
+        Fallback for a message whose interval could not be set.
+        Its whole data stream gets the rate, rounded to whole Hz.
+        """
+        stream_id = self.__DATA_STREAMS.get(message_type)
+        if stream_id is None:
+            self.methods[message_type] = "failed"
+            return
+
+        rate = self.target_rates[message_type]
+        self.connection.mav.request_data_stream_send(
+            self.target_system,
+            self.target_component,
+            stream_id,
+            max(round(rate), 1),
+            0 if rate == 0 else 1,  # start or stop
+        )
+        self.methods[message_type] = "data stream"
+
+    @staticmethod
+    def __message_id(message_type: str) -> int:
+        """
+        Raises `ValueError` for unknown message types.
+        """
+        message_id = getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{message_type}", None)
+        if message_id is None:
+            raise ValueError(f"Unknown message type: {message_type}")
+
+        return message_id
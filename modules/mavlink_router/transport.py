@@ -0,0 +1,120 @@
+"""
+Connection strings, socket buffer sizes and kernel drop counts of the MAVLink link.
+"""
+
+import os
+import socket
+
+from pymavlink import mavutil
+
+# Overrides the connection string of the GCS, and through `peer_connection_string()`
+# the one of the mock drones, for example "udpout:localhost:12345"
+CONNECTION_STRING_VARIABLE = "BOOTCAMP_CONNECTION_STRING"
+DEFAULT_CONNECTION_STRING = "tcp:localhost:12345"
+
+# Connecting side to listening side and back
+PEER_SCHEMES = {
+    "tcp": "tcpin",
+    "tcpin": "tcp",
+    "udpout": "udpin",
+    "udpin": "udpout",
+    # `mavutil` treats it as udpin
+    "udp": "udpout",
+}
+
+PROC_NET_FILES = ["/proc/net/udp", "/proc/net/udp6"]
+PROC_NET_INODE_COLUMN = 9
+PROC_NET_DROPS_COLUMN = 12
+
+
+def connection_string(default: str = DEFAULT_CONNECTION_STRING) -> str:
+    """
+    Connection string of the GCS, from the environment if set there.
+    """
+    return os.environ.get(CONNECTION_STRING_VARIABLE, default)
+
+
+def peer_connection_string(gcs_connection_string: str) -> str:
+    """
+    Connection string for the other end of the link, like a mock drone:
+    the side that connects becomes the side that listens and the other way around.
+    """
+    scheme, separator, address = gcs_connection_string.partition(":")
+    peer_scheme = PEER_SCHEMES.get(scheme)
+    if peer_scheme is None or separator == "":
+        raise ValueError(f"No peer for connection string: {gcs_connection_string}")
+
+    return f"{peer_scheme}:{address}"
+
+
+def is_datagram(connection: mavutil.mavfile) -> bool:
+    """
+    Whether the connection is over UDP.
+    """
+    port = getattr(connection, "port", None)
+    return isinstance(port, socket.socket) and port.type == socket.SOCK_DGRAM
+
+
+def announce(connection: mavutil.mavfile) -> None:
+    """
+    Sends a GCS heartbeat over a UDP connection that sends to a fixed address,
+    so a listening peer learns where to send before the first regular heartbeat.
+    Does nothing on other connections.
+    """
+    if not is_datagram(connection) or getattr(connection, "udp_server", True):
+        return
+
+    connection.mav.heartbeat_send(
+        mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+    )
+
+
+def set_socket_buffers(
+    connection: mavutil.mavfile, receive_buffer_size: int = 0, send_buffer_size: int = 0
+) -> "tuple[int, int] | None":
+    """
+    Sets `SO_RCVBUF` and `SO_SNDBUF` of a socket connection, 0 keeps the system default.
+    The kernel caps requests at its maximum, `net.core.rmem_max` and `net.core.wmem_max` on Linux.
+
+    Returns the (receive, send) sizes in effect, None if the connection is not a socket.
+    """
+    port = getattr(connection, "port", None)
+    if not isinstance(port, socket.socket):
+        return None
+
+    if receive_buffer_size > 0:
+        port.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+
+    if send_buffer_size > 0:
+        port.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer_size)
+
+    return (
+        port.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+        port.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF),
+    )
+
+
+def kernel_drop_count(connection: mavutil.mavfile) -> "int | None":
+    """
+    Datagrams the kernel dropped because the receive buffer of a UDP connection was full,
+    since the socket was opened.
+
+    Returns None if not available: not UDP, or not Linux.
+    """
+    if not is_datagram(connection):
+        return None
+
+    inode = str(os.fstat(connection.port.fileno()).st_ino)
+    for path in PROC_NET_FILES:
+        try:
+            with open(path, encoding="ascii") as proc_net_file:
+                # Skip the header
+                next(proc_net_file, None)
+                for line in proc_net_file:
+                    columns = line.split()
+                    if columns[PROC_NET_INODE_COLUMN] == inode:
+                        return int(columns[PROC_NET_DROPS_COLUMN])
+        except OSError:
+            continue
+
+    return None
@@ -8,14 +8,59 @@ Telemetry gathering logic.
 # pylint: disable=unused-argument
 # pylint: disable=too-many-positional-arguments
 
+import collections
+import enum
+import math
+import struct
+
 from pymavlink import mavutil
 
+from utilities.workers import queue_closed
+from utilities.workers import worker_controller
 from ..common.modules.logger import logger
 
 
+class EmissionPolicy(enum.Enum):
+    """
+    When `Telemetry` outputs the newest position paired with the newest attitude,
+    once both have been received.
+    """
+
+    # On every message, repeating the unchanged half
+    ON_ANY = 0
+    # On every position
+    ON_POSITION = 1
+    # On every attitude
+    ON_ATTITUDE = 2
+    # Once both have been updated since the last output
+    ON_BOTH_UPDATED = 3
+    # At most once per emission period of drone time
+    FIXED_RATE = 4
+
+
 class TelemetryData:
     """Struct for telemetry data."""
 
+    __slots__ = (
+        "time_since_boot",
+        "x",
+        "y",
+        "z",
+        "x_velocity",
+        "y_velocity",
+        "z_velocity",
+        "roll",
+        "pitch",
+        "yaw",
+        "roll_speed",
+        "pitch_speed",
+        "yaw_speed",
+    )
+
+    # Bitmask of fields that are not None, time since boot, then the float fields in slot order
+    __WIRE_FORMAT = struct.Struct("<HI12d")
+    __ALL_PRESENT = (1 << len(__slots__)) - 1
+
     def __init__(
         self,
         time_since_boot: int | None = None,
@@ -46,11 +91,310 @@ class TelemetryData:
         self.pitch_speed = pitch_speed
         self.yaw_speed = yaw_speed
 
+    def to_bytes(self) -> bytes:
+        """
+        Encodes into a fixed size little endian layout, much smaller and faster than pickle.
+        """
+        fields = (
+            self.time_since_boot,
+            self.x,
+            self.y,
+            self.z,
+            self.x_velocity,
+            self.y_velocity,
+            self.z_velocity,
+            self.roll,
+            self.pitch,
+            self.yaw,
+            self.roll_speed,
+            self.pitch_speed,
+            self.yaw_speed,
+        )
+
+        if None not in fields:
+            return self.__WIRE_FORMAT.pack(self.__ALL_PRESENT, *fields)
+
+        present = 0
+        for i, value in enumerate(fields):
+            if value is not None:
+                present |= 1 << i
+
+        return self.__WIRE_FORMAT.pack(
+            present, *(0 if value is None else value for value in fields)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TelemetryData":
+        """
+        Decodes the layout created by `to_bytes()`.
+        """
+        present, *fields = cls.__WIRE_FORMAT.unpack(data)
+
+        if present != cls.__ALL_PRESENT:
+            fields = [value if present >> i & 1 else None for i, value in enumerate(fields)]
+
+        return cls(*fields)
+
+
+class TelemetryDecoder:
+    """
+    Unpacks `LOCAL_POSITION_NED` and `ATTITUDE` payloads into a telemetry record,
+    without building a pymavlink message object.
+
+    The checksum is not verified, so frames must come from a source that has already decoded
+    them, like the MAVLink router.
+    """
+
+    __STX_V1 = 0xFE
+    __STX_V2 = 0xFD
+    __HEADER_SIZE_V1 = 6
+    __HEADER_SIZE_V2 = 10
+
+    # Both payloads are time since boot followed by 6 floats, in wire order
+    __PAYLOAD_FORMAT = struct.Struct("<I6f")
+
+    POSITION_ID = mavutil.mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED
+    ATTITUDE_ID = mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE
+
+    def __init__(self) -> None:
+        self.__writers = {
+            self.POSITION_ID: self.__write_position,
+            self.ATTITUDE_ID: self.__write_attitude,
+        }
+
+    def decode_into(
+        self, frame: "bytes | bytearray | memoryview", record: TelemetryData
+    ) -> int | None:
+        """
+        Writes the fields of a position or attitude frame into the record,
+        including its time since boot.
+
+        frame: Complete MAVLink 1 or 2 frame.
+        record: Record to update in place.
+
+        Returns the message ID, None if the frame is another message and was not decoded.
+        """
+        if frame[0] == self.__STX_V2:
+            message_id = frame[7] | frame[8] << 8 | frame[9] << 16
+            payload_start = self.__HEADER_SIZE_V2
+        elif frame[0] == self.__STX_V1:
+            message_id = frame[5]
+            payload_start = self.__HEADER_SIZE_V1
+        else:
+            return None
+
+        writer = self.__writers.get(message_id)
+        if writer is None:
+            return None
+
+        payload_size = frame[1]
+        if payload_size >= self.__PAYLOAD_FORMAT.size:
+            fields = self.__PAYLOAD_FORMAT.unpack_from(frame, payload_start)
+        else:
+            # MAVLink 2 truncates trailing zero bytes of the payload
+            payload = bytearray(self.__PAYLOAD_FORMAT.size)
+            payload[:payload_size] = frame[payload_start : payload_start + payload_size]
+            fields = self.__PAYLOAD_FORMAT.unpack(payload)
+
+        writer(record, fields)
+        return message_id
+
+    @staticmethod
+    def __write_position(record: TelemetryData, fields: "tuple[int | float, ...]") -> None:
+        (
+            record.time_since_boot,
+            record.x,
+            record.y,
+            record.z,
+            record.x_velocity,
+            record.y_velocity,
+            record.z_velocity,
+        ) = fields
+
+    @staticmethod
+    def __write_attitude(record: TelemetryData, fields: "tuple[int | float, ...]") -> None:
+        (
+            record.time_since_boot,
+            record.roll,
+            record.pitch,
+            record.yaw,
+            record.roll_speed,
+            record.pitch_speed,
+            record.yaw_speed,
+        ) = fields
+
+
+class TelemetryFusion:
+    """
+    Aligns position and attitude in time: keeps a short history of each stream
+    and interpolates both to each output time, attitude angles along the shorter arc.
+
+    With an output period, outputs follow a fixed clock on the drone's time since boot,
+    otherwise there is an output at every position timestamp.
+    An output is made once both streams have reached its time,
+    so it lags the slower stream by up to one of its periods.
+    """
+
+    def __init__(self, output_period: int = 0, history_size: int = 8) -> None:
+        """
+        output_period: Milliseconds of drone time between outputs, 0 outputs at every position.
+        history_size: Messages of each stream kept for interpolation, at least 2.
+        """
+        if output_period < 0:
+            raise ValueError(f"Output period must not be negative, got {output_period}")
+
+        if history_size < 2:
+            raise ValueError(f"History size must be at least 2, got {history_size}")
+
+        self.output_period = output_period
+
+        # (time since boot, fields in `TelemetryData` slot order) of each message, oldest first
+        self.__positions = collections.deque(maxlen=history_size)
+        self.__attitudes = collections.deque(maxlen=history_size)
+        # Output times not reached by both streams yet, with no output period
+        self.__pending_times = collections.deque(maxlen=history_size)
+        # With an output period
+        self.__next_output_time = None
+
+        # Newest output, updated in place
+        self.telemetry_data = TelemetryData()
+        # Including outputs superseded by a newer one in the same poll
+        self.output_count = 0
+
+    def add_position(self, time_since_boot: int, fields: "tuple[float, ...]") -> None:
+        """
+        fields: x, y, z, x velocity, y velocity, z velocity.
+        """
+        self.__add(self.__positions, time_since_boot, fields)
+        if self.output_period == 0:
+            self.__pending_times.append(time_since_boot)
+
+    def add_attitude(self, time_since_boot: int, fields: "tuple[float, ...]") -> None:
+        """
+        fields: roll, pitch, yaw, roll speed, pitch speed, yaw speed.
+        """
+        self.__add(self.__attitudes, time_since_boot, fields)
+
+    def poll(self) -> TelemetryData | None:
+        """
+        Makes every output both streams have reached.
+
+        Returns the newest, None if none was due.
+        The record returned is updated in place by later calls.
+        """
+        if len(self.__positions) == 0 or len(self.__attitudes) == 0:
+            return None
+
+        reached = min(self.__positions[-1][0], self.__attitudes[-1][0])
+        output_time = None
+
+        if self.output_period == 0:
+            while len(self.__pending_times) > 0 and self.__pending_times[0] <= reached:
+                output_time = self.__pending_times.popleft()
+                self.output_count += 1
+        else:
+            # Outputs before the history are skipped, like after a gap in either stream
+            earliest = max(self.__positions[0][0], self.__attitudes[0][0])
+            if self.__next_output_time is None or self.__next_output_time < earliest:
+                self.__next_output_time = -(-earliest // self.output_period) * self.output_period
+
+            while self.__next_output_time <= reached:
+                output_time = self.__next_output_time
+                self.__next_output_time += self.output_period
+                self.output_count += 1
+
+        if output_time is None:
+            return None
+
+        record = self.telemetry_data
+        record.time_since_boot = output_time
+        (
+            record.x,
+            record.y,
+            record.z,
+            record.x_velocity,
+            record.y_velocity,
+            record.z_velocity,
+        ) = self.__interpolate(self.__positions, output_time, 0)
+        (
+            record.roll,
+            record.pitch,
+            record.yaw,
+            record.roll_speed,
+            record.pitch_speed,
+            record.yaw_speed,
+        ) = self.__interpolate(self.__attitudes, output_time, 3)
+
+        return record
+
+    def __add(
+        self,
+        history: "collections.deque[tuple[int, tuple[float, ...]]]",
+        time_since_boot: int,
+        fields: "tuple[float, ...]",
+    ) -> None:
+        """
+        Appends to a history, starting over if the drone clock went back like after a reboot.
+        """
+        if len(history) > 0 and time_since_boot < history[-1][0]:
+            self.__positions.clear()
+            self.__attitudes.clear()
+            self.__pending_times.clear()
+            self.__next_output_time = None
+
+        history.append((time_since_boot, fields))
+
+    @staticmethod
+    def __interpolate(
+        history: "collections.deque[tuple[int, tuple[float, ...]]]",
+        output_time: int,
+        num_angles: int,
+    ) -> "list[float]":
+        """
+        Linear interpolation between the messages around the time,
+        the first fields are angles in radians. Clamps to the oldest and newest message.
+        """
+        before = None
+        for after in history:
+            if after[0] > output_time:
+                break
+
+            before = after
+        else:
+            return list(history[-1][1])
+
+        if before is None:
+            return list(after[1])
+
+        before_time, before_fields = before
+        after_time, after_fields = after
+        fraction = (output_time - before_time) / (after_time - before_time)
+
+        values = [a + (b - a) * fraction for a, b in zip(before_fields, after_fields)]
+        for i in range(num_angles):
+            difference = (after_fields[i] - before_fields[i] + math.pi) % (2 * math.pi) - math.pi
+            values[i] = (before_fields[i] + difference * fraction + math.pi) % (
+                2 * math.pi
+            ) - math.pi
+
+        return values
+
 
 class Telemetry:
-    """Reads MAVLink position and attitude messages."""
+    """
+    Reads MAVLink position and attitude messages.
+
+    Routed connections hand over raw frames, which are decoded straight into a record.
+    Otherwise, if the connection has a file descriptor, waits on it together with the worker
+    controller and parses every available message per wakeup, else blocks in `recv_match()`.
+
+    With fusion, position and attitude are aligned in time by `TelemetryFusion`
+    instead of pairing the newest of each.
+    """
 
     __private_key = object()
+    __MESSAGE_TYPES = ["LOCAL_POSITION_NED", "ATTITUDE"]
+    __RECEIVE_TIMEOUT = 1  # seconds
 
     @classmethod
     def create(
@@ -58,10 +402,31 @@ class Telemetry:
         connection: mavutil.mavfile,
         args: object,
         local_logger: logger.Logger,
+        fusion_period: int | None = None,
+        emission_policy: EmissionPolicy = EmissionPolicy.ON_ANY,
+        emission_period: int = 0,
     ) -> tuple[bool, "Telemetry"]:
-        """Create Telemetry safely."""
+        """
+        Create Telemetry safely.
+
+        fusion_period: Milliseconds of drone time between time aligned outputs,
+        0 aligns attitude to every position, None pairs the newest of each instead.
+        emission_policy: When to output a pairing, without fusion.
+        emission_period: Milliseconds of drone time between outputs with `FIXED_RATE`.
+        """
         try:
-            return True, cls(cls.__private_key, connection, local_logger)
+            if emission_policy == EmissionPolicy.FIXED_RATE and emission_period <= 0:
+                raise ValueError(f"Emission period must be positive, got {emission_period}")
+
+            fusion = None if fusion_period is None else TelemetryFusion(fusion_period)
+            return True, cls(
+                cls.__private_key,
+                connection,
+                local_logger,
+                fusion,
+                emission_policy,
+                emission_period,
+            )
         except Exception as exc:
             local_logger.error(f"Failed to create Telemetry: {exc}", True)
             return False, None
@@ -71,57 +436,227 @@ class Telemetry:
         key: object,
         connection: mavutil.mavfile,
         local_logger: logger.Logger,
+        fusion: TelemetryFusion | None = None,
+        emission_policy: EmissionPolicy = EmissionPolicy.ON_ANY,
+        emission_period: int = 0,
     ) -> None:
         assert key is Telemetry.__private_key
 
         self.connection = connection
         self.logger = local_logger
 
-        self.last_position = None
-        self.last_attitude = None
+        # Sockets and serial ports have one, routed connections do not
+        self.fd = getattr(connection, "fd", None)
+        # Only routed connections have one
+        self.recv_frame = getattr(connection, "recv_frame", None)
+        self.decoder = TelemetryDecoder()
+
+        # Newest values of both messages, updated in place
+        self.telemetry_data = TelemetryData()
+        self.position_time = None
+        self.attitude_time = None
+        self.fusion = fusion
 
-    def run(self, args: object) -> TelemetryData | None:
+        self.emission_policy = emission_policy
+        self.emission_period = emission_period
+        # Message IDs updated since the last output
+        self.__updated = set()
+        self.__last_emission_time = None
+
+        # Copy of the pairing last output, later suppressed messages only change the newest values
+        self.__emitted_data = TelemetryData()
+
+        self.emitted_count = 0
+        # Pairings not output by the emission policy, each a duplicate of the previous output
+        # in one of its halves
+        self.suppressed_count = 0
+
+    def run(self, args: worker_controller.WorkerController) -> TelemetryData | None:
         """
         Combine LOCAL_POSITION_NED and ATTITUDE into TelemetryData.
-        """
-        _ = args
+        Returns the newest combination of the messages received.
 
+        The record returned is updated in place by later calls, copy or encode it before then.
+        Raises `QueueClosed` once a routed connection has been closed.
+        """
         try:
-            msg = self.connection.recv_match(
-                type=["LOCAL_POSITION_NED", "ATTITUDE"],
-                blocking=True,
-                timeout=1,
-            )
+            if self.recv_frame is not None:
+                # Decode everything that arrived, only the newest combination is useful
+                telemetry_data = None
+                frame = self.recv_frame(blocking=True, timeout=self.__RECEIVE_TIMEOUT)
+                while frame is not None:
+                    telemetry_data = self.process_frame(frame) or telemetry_data
+                    frame = self.recv_frame(blocking=False)
 
-            if msg is None:
-                return None
+                return telemetry_data
 
-            if msg.get_type() == "LOCAL_POSITION_NED":
-                self.last_position = msg
-            elif msg.get_type() == "ATTITUDE":
-                self.last_attitude = msg
-
-            if self.last_position and self.last_attitude:
-                return TelemetryData(
-                    time_since_boot=max(
-                        self.last_position.time_boot_ms,
-                        self.last_attitude.time_boot_ms,
-                    ),
-                    x=self.last_position.x,
-                    y=self.last_position.y,
-                    z=self.last_position.z,
-                    x_velocity=self.last_position.vx,
-                    y_velocity=self.last_position.vy,
-                    z_velocity=self.last_position.vz,
-                    roll=self.last_attitude.roll,
-                    pitch=self.last_attitude.pitch,
-                    yaw=self.last_attitude.yaw,
-                    roll_speed=self.last_attitude.rollspeed,
-                    pitch_speed=self.last_attitude.pitchspeed,
-                    yaw_speed=self.last_attitude.yawspeed,
+            if self.fd is None:
+                msg = self.connection.recv_match(
+                    type=self.__MESSAGE_TYPES,
+                    blocking=True,
+                    timeout=self.__RECEIVE_TIMEOUT,
                 )
+                return self.process_message(msg)
+
+            if not args.wait_for_readable(self.fd, self.__RECEIVE_TIMEOUT):
+                return None
+
+            # Parse everything that arrived, only the newest combination is useful
+            telemetry_data = None
+            while True:
+                msg = self.connection.recv_match(type=self.__MESSAGE_TYPES, blocking=False)
+                if msg is None:
+                    return telemetry_data
+
+                telemetry_data = self.process_message(msg) or telemetry_data
+
+        except queue_closed.QueueClosed:
+            # Router has stopped, the worker exits
+            raise
 
         except Exception as exc:
             self.logger.error(f"Telemetry error: {exc}", True)
 
         return None
+
+    def process_frame(self, frame: "bytes | bytearray | memoryview") -> TelemetryData | None:
+        """
+        Stores a received frame, falling back to pymavlink for other message types.
+        Returns the combination with the other message type, None until both have been received.
+        """
+        message_id = self.decoder.decode_into(frame, self.telemetry_data)
+        if message_id is None:
+            return self.process_message(self.connection.mav.decode(bytearray(frame)))
+
+        return self.__combine(message_id)
+
+    def process_message(
+        self, msg: "mavutil.mavlink.MAVLink_message | None"
+    ) -> TelemetryData | None:
+        """
+        Stores a received message.
+        Returns the combination with the other message type, None until both have been received.
+        """
+        if msg is None:
+            return None
+
+        record = self.telemetry_data
+        message_type = msg.get_type()
+        if message_type == "LOCAL_POSITION_NED":
+            record.time_since_boot = msg.time_boot_ms
+            record.x = msg.x
+            record.y = msg.y
+            record.z = msg.z
+            record.x_velocity = msg.vx
+            record.y_velocity = msg.vy
+            record.z_velocity = msg.vz
+            return self.__combine(TelemetryDecoder.POSITION_ID)
+
+        if message_type == "ATTITUDE":
+            record.time_since_boot = msg.time_boot_ms
+            record.roll = msg.roll
+            record.pitch = msg.pitch
+            record.yaw = msg.yaw
+            record.roll_speed = msg.rollspeed
+            record.pitch_speed = msg.pitchspeed
+            record.yaw_speed = msg.yawspeed
+            return self.__combine(TelemetryDecoder.ATTITUDE_ID)
+
+        return None
+
+    def __combine(self, message_id: int) -> TelemetryData | None:
+        """
+        Called after a message has been written into the record, with its own time since boot.
+        """
+        if self.fusion is not None:
+            telemetry_data = self.__fuse(message_id)
+            if telemetry_data is not None:
+                self.emitted_count += 1
+
+            return telemetry_data
+
+        if message_id == TelemetryDecoder.POSITION_ID:
+            self.position_time = self.telemetry_data.time_since_boot
+        else:
+            self.attitude_time = self.telemetry_data.time_since_boot
+
+        self.__updated.add(message_id)
+
+        if self.position_time is None or self.attitude_time is None:
+            return None
+
+        self.telemetry_data.time_since_boot = max(self.position_time, self.attitude_time)
+
+        if not self.__should_emit(message_id):
+            self.suppressed_count += 1
+            return None
+
+        self.__updated.clear()
+        self.__last_emission_time = self.telemetry_data.time_since_boot
+        self.emitted_count += 1
+
+        # Every message is output, the newest values are always the newest output
+        if self.emission_policy == EmissionPolicy.ON_ANY:
+            return self.telemetry_data
+
+        for name in TelemetryData.__slots__:
+            setattr(self.__emitted_data, name, getattr(self.telemetry_data, name))
+
+        return self.__emitted_data
+
+    def __should_emit(self, message_id: int) -> bool:
+        """
+        Whether the emission policy outputs the pairing completed by the message.
+        """
+        policy = self.emission_policy
+        if policy == EmissionPolicy.ON_ANY:
+            return True
+
+        if policy == EmissionPolicy.ON_POSITION:
+            return message_id == TelemetryDecoder.POSITION_ID
+
+        if policy == EmissionPolicy.ON_ATTITUDE:
+            return message_id == TelemetryDecoder.ATTITUDE_ID
+
+        if policy == EmissionPolicy.ON_BOTH_UPDATED:
+            return len(self.__updated) == 2
+
+        time_since_boot = self.telemetry_data.time_since_boot
+        return (
+            self.__last_emission_time is None
+            # Drone clock went back, like after a reboot
+            or time_since_boot < self.__last_emission_time
+            or time_since_boot - self.__last_emission_time >= self.emission_period
+        )
+
+    def __fuse(self, message_id: int) -> TelemetryData | None:
+        """
+        Hands the message written into the record to the fusion.
+        """
+        record = self.telemetry_data
+        if message_id == TelemetryDecoder.POSITION_ID:
+            self.fusion.add_position(
+                record.time_since_boot,
+                (
+                    record.x,
+                    record.y,
+                    record.z,
+                    record.x_velocity,
+                    record.y_velocity,
+                    record.z_velocity,
+                ),
+            )
+        else:
+            self.fusion.add_attitude(
+                record.time_since_boot,
+                (
+                    record.roll,
+                    record.pitch,
+                    record.yaw,
+                    record.roll_speed,
+                    record.pitch_speed,
+                    record.yaw_speed,
+                ),
+            )
+
+        return self.fusion.poll()
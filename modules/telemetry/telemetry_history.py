@@ -0,0 +1,129 @@
+"""
+Columnar history of telemetry for windowed queries.
+"""
+
+import numpy as np
+
+from .telemetry import TelemetryData
+
+
+class TelemetryHistory:
+    """
+    Fixed capacity ring buffer of telemetry, one preallocated array per field.
+
+    Every sample is written twice, capacity apart, so the newest samples are always contiguous
+    and queries return read only views instead of copies.
+    A view stays valid until the capacity of samples has been appended after it was taken.
+    """
+
+    TIME_FIELD = "time_since_boot"
+    # Missing values are NaN
+    FLOAT_FIELDS = TelemetryData.__slots__[1:]
+
+    def __init__(self, capacity: int) -> None:
+        """
+        capacity: Number of newest samples kept.
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+
+        self.capacity = capacity
+
+        self.__columns = {self.TIME_FIELD: np.zeros(2 * capacity, dtype=np.int64)}
+        for name in self.FLOAT_FIELDS:
+            self.__columns[name] = np.full(2 * capacity, np.nan)
+
+        # Same arrays in slot order, to append without looking up names
+        self.__float_columns = [self.__columns[name] for name in self.FLOAT_FIELDS]
+        self.__times = self.__columns[self.TIME_FIELD]
+
+        # Index in the first copy of the newest sample
+        self.__newest = -1
+        self.__size = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def clear(self) -> None:
+        """
+        Forgets every sample, outstanding views keep their values until overwritten.
+        """
+        self.__newest = -1
+        self.__size = 0
+
+    def append(self, telemetry_data: TelemetryData) -> None:
+        """
+        Adds a sample, replacing the oldest once full.
+        History starts over when the drone clock goes back, like after a reboot.
+        """
+        time_since_boot = telemetry_data.time_since_boot
+        if time_since_boot is None:
+            raise ValueError("Telemetry without time since boot")
+
+        if self.__size > 0 and time_since_boot < self.__times[self.__newest]:
+            self.clear()
+
+        index = self.__newest + 1
+        if index == self.capacity:
+            index = 0
+
+        mirror = index + self.capacity
+        self.__times[index] = time_since_boot
+        self.__times[mirror] = time_since_boot
+        for column, name in zip(self.__float_columns, self.FLOAT_FIELDS):
+            value = getattr(telemetry_data, name)
+            if value is None:
+                value = np.nan
+
+            column[index] = value
+            column[mirror] = value
+
+        self.__newest = index
+        if self.__size < self.capacity:
+            self.__size += 1
+
+    def last(self, count: int) -> "dict[str, np.ndarray]":
+        """
+        Views of the newest samples of each field by name, oldest first.
+
+        count: Number of samples, at most the number kept.
+        """
+        if count < 0:
+            raise ValueError(f"Count must not be negative, got {count}")
+
+        count = min(count, self.__size)
+        stop = self.__newest + self.capacity + 1
+        return self.__views(stop - count, stop)
+
+    def window(self, duration: int) -> "dict[str, np.ndarray]":
+        """
+        Views of the samples of each field by name from the last duration of drone time,
+        oldest first.
+
+        duration: Milliseconds of drone time before the newest sample, which is included.
+        """
+        if duration < 0:
+            raise ValueError(f"Duration must not be negative, got {duration}")
+
+        stop = self.__newest + self.capacity + 1
+        start = stop - self.__size
+        # Times of kept samples never decrease, the window starts at the first one inside it
+        if self.__size > 0:
+            newest_time = self.__times[self.__newest]
+            start += int(
+                np.searchsorted(self.__times[start:stop], newest_time - duration, side="left")
+            )
+
+        return self.__views(start, stop)
+
+    def __views(self, start: int, stop: int) -> "dict[str, np.ndarray]":
+        """
+        Read only views of the slice of every field.
+        """
+        views = {}
+        for name, column in self.__columns.items():
+            view = column[start:stop]
+            view.flags.writeable = False
+            views[name] = view
+
+        return views
@@ -9,6 +9,7 @@ import pathlib
 
 from pymavlink import mavutil
 
+from utilities.workers import queue_closed
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers.worker_controller import WorkerController
 from . import telemetry
@@ -22,10 +23,18 @@ def telemetry_worker(
     connection: mavutil.mavfile,
     args: WorkerController,
     telemetry_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    fusion_period: int | None = None,
+    emission_policy: telemetry.EmissionPolicy = telemetry.EmissionPolicy.ON_ANY,
+    emission_period: int = 0,
 ) -> None:
     """
     Worker process.
     Continuously gathers telemetry and pushes it to the queue.
+
+    fusion_period: Milliseconds of drone time between time aligned outputs,
+    0 aligns attitude to every position, None pairs the newest of each instead.
+    emission_policy: When to output a pairing, without fusion.
+    emission_period: Milliseconds of drone time between outputs with `FIXED_RATE`.
     """
 
     # Instantiate logger
@@ -44,6 +53,9 @@ def telemetry_worker(
         connection,
         args,
         local_logger,
+        fusion_period,
+        emission_policy,
+        emission_period,
     )
 
     if not result or telemetry_logic is None:
@@ -58,12 +70,21 @@ def telemetry_worker(
             telemetry_data = telemetry_logic.run(args)
 
             if telemetry_data is not None:
-                telemetry_queue.queue.put(telemetry_data)
+                # Fixed binary layout is cheaper to move than a pickled object
+                # Queue backpressure policy decides what happens when command falls behind
+                telemetry_queue.put(telemetry_data.to_bytes())
+
+        except queue_closed.QueueClosed:
+            break
 
         except Exception as exc:
             local_logger.error(f"Telemetry worker error: {exc}", True)
 
-    local_logger.info("Telemetry worker exiting", True)
+    local_logger.info(
+        f"Telemetry worker exiting: {telemetry_logic.emitted_count} emitted"
+        f", {telemetry_logic.suppressed_count} duplicates avoided",
+        True,
+    )
 
 
 # =================================================================================================
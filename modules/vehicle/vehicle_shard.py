@@ -0,0 +1,268 @@
+"""
+Telemetry and command pipelines of several vehicles in one process.
+"""
+
+# pylint: disable=broad-exception-caught
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_closed
+from utilities.workers import worker_controller
+from ..command import command
+from ..common.modules.logger import logger
+from ..mavlink_router import stream_rates
+from ..telemetry import telemetry
+from ..telemetry import telemetry_history
+
+
+def shard_vehicles(system_ids: "list[int]", num_shards: int) -> "list[list[int]]":
+    """
+    Splits vehicles into at most the number of shards, their sizes differing by at most 1.
+    """
+    if num_shards < 1:
+        raise ValueError(f"Number of shards must be positive, got {num_shards}")
+
+    shards = [system_ids[i::num_shards] for i in range(num_shards)]
+    return [shard for shard in shards if len(shard) > 0]
+
+
+class Vehicle:
+    """
+    Pipeline of one vehicle.
+    """
+
+    def __init__(
+        self,
+        system_id: int,
+        telemetry_logic: telemetry.Telemetry,
+        command_logic: command.Command,
+        history: telemetry_history.TelemetryHistory | None = None,
+        rates: stream_rates.StreamRates | None = None,
+    ) -> None:
+        """
+        system_id: MAVLink system ID of the vehicle.
+        history: Every telemetry output of the vehicle, None keeps none.
+        rates: Changes the message rates of the vehicle at runtime, None if not needed.
+        """
+        self.system_id = system_id
+        self.telemetry = telemetry_logic
+        self.command = command_logic
+        self.history = history
+        self.rates = rates
+
+        # Newest combined telemetry not decided on yet
+        self.telemetry_data = None
+
+
+class VehicleShard:
+    """
+    Demultiplexes the frames routed to the shard by MAVLink system ID,
+    decodes each vehicle's telemetry and decides its command.
+
+    Frames of each vehicle are all decoded, but only the newest telemetry is decided on
+    per wakeup, like the conflating telemetry queue of the single vehicle pipeline.
+    """
+
+    __private_key = object()
+
+    __STX_V2 = 0xFD
+    __ACK_ID = mavutil.mavlink.MAVLINK_MSG_ID_COMMAND_ACK
+    __SET_MESSAGE_INTERVAL = mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL
+    __RECEIVE_TIMEOUT = 0.1  # seconds
+
+    @classmethod
+    def create(
+        cls,
+        connection: mavutil.mavfile,
+        targets: "dict[int, command.Position]",
+        local_logger: logger.Logger,
+        hold_off: float = 0.0,
+        param_threshold: float = 0.0,
+        ack_timeout: float = 0.0,
+        max_retries: int = 0,
+        fusion_period: int | None = None,
+        emission_policy: telemetry.EmissionPolicy = telemetry.EmissionPolicy.ON_ANY,
+        emission_period: int = 0,
+        history_capacity: int = 0,
+        target_rates: "dict[str, float] | None" = None,
+    ) -> "tuple[bool, VehicleShard | None]":
+        """
+        Fallible create (instantiation) method to create a VehicleShard object.
+
+        connection: Routed connection of the shard, receiving the frames of its vehicles.
+        targets: Target position of each vehicle by MAVLink system ID.
+        fusion_period, emission_policy, emission_period: Same as `telemetry.Telemetry.create()`.
+        history_capacity: Number of telemetry outputs kept per vehicle, 0 keeps none.
+        target_rates: Message rates negotiated at startup, to change with `set_rate()`,
+        None does not allow changing them.
+        Other arguments are the same as `command.Command.create()`.
+        """
+        vehicles = {}
+        for system_id, target in targets.items():
+            result, telemetry_logic = telemetry.Telemetry.create(
+                connection, None, local_logger, fusion_period, emission_policy, emission_period
+            )
+            if not result:
+                return False, None
+
+            result, command_logic = command.Command.create(
+                connection,
+                target,
+                None,
+                local_logger,
+                hold_off,
+                param_threshold,
+                ack_timeout,
+                max_retries,
+                system_id,
+            )
+            if not result:
+                return False, None
+
+            vehicles[system_id] = Vehicle(system_id, telemetry_logic, command_logic)
+
+        try:
+            if history_capacity > 0:
+                for vehicle in vehicles.values():
+                    vehicle.history = telemetry_history.TelemetryHistory(history_capacity)
+
+            if target_rates is not None:
+                for vehicle in vehicles.values():
+                    vehicle.rates = stream_rates.StreamRates(
+                        connection, target_rates, vehicle.system_id
+                    )
+
+            return True, cls(cls.__private_key, connection, vehicles, local_logger)
+        except Exception as exc:
+            local_logger.error(f"Failed to create VehicleShard: {exc}", True)
+            return False, None
+
+    def __init__(
+        self,
+        key: object,
+        connection: mavutil.mavfile,
+        vehicles: "dict[int, Vehicle]",
+        local_logger: logger.Logger,
+    ) -> None:
+        assert key is VehicleShard.__private_key, "Use create() method"
+
+        self.connection = connection
+        self.vehicles = vehicles
+        self.logger = local_logger
+
+        self.frame_count = 0
+        # Frames of vehicles not in the shard, the routes are wrong if any
+        self.unknown_count = 0
+
+    def run(self, args: worker_controller.WorkerController) -> "list[str]":
+        """
+        Waits briefly for frames, processes every one available and decides on the result.
+        Raises `QueueClosed` once the routed connection has been closed.
+
+        Returns the decision of each vehicle that made one, prefixed by its system ID.
+        """
+        _ = args
+
+        try:
+            frame = self.connection.recv_frame(blocking=True, timeout=self.__RECEIVE_TIMEOUT)
+            while frame is not None:
+                self.process_frame(frame)
+                frame = self.connection.recv_frame(blocking=False)
+
+        except queue_closed.QueueClosed:
+            # Router has stopped, the worker exits
+            raise
+
+        except Exception as exc:
+            self.logger.error(f"Vehicle shard error: {exc}", True)
+
+        return self.decide()
+
+    def process_frame(self, frame: "bytes | bytearray | memoryview") -> "Vehicle | None":
+        """
+        Hands a frame to the pipeline of the vehicle that sent it.
+
+        Returns the vehicle, None if it is not in the shard.
+        """
+        self.frame_count += 1
+
+        if frame[0] == self.__STX_V2:
+            system_id = frame[5]
+            message_id = frame[7] | frame[8] << 8 | frame[9] << 16
+        else:
+            system_id = frame[3]
+            message_id = frame[5]
+
+        vehicle = self.vehicles.get(system_id)
+        if vehicle is None:
+            self.unknown_count += 1
+            return None
+
+        if message_id == self.__ACK_ID:
+            msg = self.connection.mav.decode(bytearray(frame))
+            if msg.command == self.__SET_MESSAGE_INTERVAL and vehicle.rates is not None:
+                vehicle.rates.process_ack(msg)
+            else:
+                vehicle.command.command_manager.process_ack(msg)
+
+            return vehicle
+
+        telemetry_data = vehicle.telemetry.process_frame(frame)
+        if telemetry_data is not None:
+            vehicle.telemetry_data = telemetry_data
+            # Outputs between decisions are only kept here
+            if vehicle.history is not None:
+                vehicle.history.append(telemetry_data)
+
+        return vehicle
+
+    def decide(self) -> "list[str]":
+        """
+        Decides on the newest telemetry of each vehicle that received some,
+        retries commands not acknowledged in time,
+        and falls back to data streams for rate changes not acknowledged in time.
+
+        Returns the decision of each vehicle that made one, prefixed by its system ID.
+        """
+        results = []
+        for vehicle in self.vehicles.values():
+            if vehicle.telemetry_data is not None:
+                result = vehicle.command.run(vehicle.telemetry_data)
+                vehicle.telemetry_data = None
+
+                if result is not None:
+                    results.append(f"Vehicle {vehicle.system_id}: {result}")
+
+            if vehicle.command.command_manager.is_tracking_acks:
+                vehicle.command.command_manager.retry_expired()
+
+            if vehicle.rates is not None:
+                vehicle.rates.fall_back_expired()
+
+        return results
+
+    def set_rate(self, system_id: int, message_type: str, rate: float) -> None:
+        """
+        Requests a message of a vehicle at a rate, see `stream_rates.StreamRates.set_rate()`.
+        Raises `ValueError` if the vehicle is not in the shard or rates can not be changed.
+        """
+        vehicle = self.vehicles.get(system_id)
+        if vehicle is None or vehicle.rates is None:
+            raise ValueError(f"Can not change the rates of vehicle {system_id}")
+
+        vehicle.rates.set_rate(message_type, rate)
+
+    def summary(self) -> str:
+        """
+        Formats the frame counters and the telemetry and command counters of each vehicle
+        for logging.
+        """
+        text = f"{self.frame_count} frames, {self.unknown_count} from unknown vehicles"
+        for vehicle in self.vehicles.values():
+            text += (
+                f"; vehicle {vehicle.system_id}: {vehicle.telemetry.emitted_count} telemetry"
+                f" emitted, {vehicle.telemetry.suppressed_count} duplicates avoided"
+                f", {vehicle.command.command_manager.summary()}"
+            )
+
+        return text
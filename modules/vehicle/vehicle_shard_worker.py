@@ -0,0 +1,90 @@
+"""
+Vehicle shard worker that runs the telemetry and command pipelines of several vehicles.
+"""
+
+# pylint: disable=broad-exception-caught
+
+import os
+import pathlib
+
+from pymavlink import mavutil
+
+from utilities.workers import queue_closed
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import worker_controller
+from . import vehicle_shard
+from ..command import command
+from ..common.modules.logger import logger
+from ..telemetry import telemetry
+
+
+def vehicle_shard_worker(
+    connection: mavutil.mavfile,
+    targets: "dict[int, command.Position]",
+    args: worker_controller.WorkerController,
+    command_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    hold_off: float = 0.0,
+    param_threshold: float = 0.0,
+    ack_timeout: float = 0.0,
+    max_retries: int = 0,
+    fusion_period: int | None = None,
+    emission_policy: telemetry.EmissionPolicy = telemetry.EmissionPolicy.ON_ANY,
+    emission_period: int = 0,
+    history_capacity: int = 0,
+    target_rates: "dict[str, float] | None" = None,
+) -> None:
+    """
+    Worker process that decodes the telemetry of its vehicles and produces their commands.
+
+    connection: Routed connection receiving the frames of every vehicle in the shard.
+    targets: Target position of each vehicle in the shard by MAVLink system ID.
+    fusion_period, emission_policy, emission_period: Same as `telemetry_worker.telemetry_worker()`.
+    history_capacity, target_rates: Same as `vehicle_shard.VehicleShard.create()`.
+    Other arguments are the same as `command_worker.command_worker()`.
+    """
+
+    # Instantiate logger
+    worker_name = pathlib.Path(__file__).stem
+    process_id = os.getpid()
+    result, local_logger = logger.Logger.create(f"{worker_name}_{process_id}", True)
+    if not result:
+        print("ERROR: Worker failed to create logger")
+        return
+
+    assert local_logger is not None
+    local_logger.info(f"Logger initialized, vehicles {list(targets)}", True)
+
+    # Instantiate VehicleShard logic
+    result, shard = vehicle_shard.VehicleShard.create(
+        connection,
+        targets,
+        local_logger,
+        hold_off,
+        param_threshold,
+        ack_timeout,
+        max_retries,
+        fusion_period,
+        emission_policy,
+        emission_period,
+        history_capacity,
+        target_rates,
+    )
+
+    if not result or shard is None:
+        local_logger.error("Failed to create VehicleShard", True)
+        return
+
+    # Main loop
+    while not args.is_exit_requested():
+        try:
+            args.check_pause()
+
+            command_queue.put_many(shard.run(args))
+
+        except queue_closed.QueueClosed:
+            break
+
+        except Exception as exc:
+            local_logger.error(f"Vehicle shard worker error: {exc}", True)
+
+    local_logger.info(f"Vehicle shard exiting: {shard.summary()}", True)
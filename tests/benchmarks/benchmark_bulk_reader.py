@@ -0,0 +1,147 @@
+"""
+Benchmark decoding a high rate telemetry stream, `recv_match()` against bulk reading. To run:
+```
+python -m tests.benchmarks.benchmark_bulk_reader
+```
+"""
+
+import select
+import socket
+import threading
+import time
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import bulk_reader
+
+NUM_MESSAGES = 100000
+SEND_CHUNK_SIZE = 4096  # bytes
+
+
+class SocketConnection(mavutil.mavfile):
+    """
+    `mavutil` connection over an existing stream socket, read the same way as TCP.
+    """
+
+    def __init__(self, port: socket.socket) -> None:
+        self.port = port
+        super().__init__(port.fileno(), "socket")
+
+    def recv(self, n: "int | None" = None) -> bytes:
+        """
+        Same as `mavutil.mavtcp.recv()` without reconnecting.
+        """
+        if n is None:
+            n = self.mav.bytes_needed()
+
+        try:
+            return self.port.recv(n)
+        except BlockingIOError:
+            return b""
+
+    def write(self, buf: bytes) -> None:
+        """
+        Same as `mavutil.mavtcp.write()` without reconnecting.
+        """
+        self.port.sendall(buf)
+
+
+def encode_stream(count: int) -> bytes:
+    """
+    Alternating position and attitude frames, as sent by the drone.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, 1, 0)
+    frames = []
+    for i in range(count):
+        if i % 2 == 0:
+            message = encoder.local_position_ned_encode(i, 1.0, 2.0, 3.0, 0.1, 0.2, 0.3)
+        else:
+            message = encoder.attitude_encode(i, 0.1, 0.2, 0.3, 0.01, 0.02, 0.03)
+
+        frames.append(message.pack(encoder))
+
+    return b"".join(frames)
+
+
+def send_stream(port: socket.socket, stream: bytes) -> None:
+    """
+    Sends the stream in chunks like a network would deliver it.
+    """
+    for start in range(0, len(stream), SEND_CHUNK_SIZE):
+        port.sendall(stream[start : start + SEND_CHUNK_SIZE])
+
+
+def benchmark_recv_match(stream: bytes) -> float:
+    """
+    Returns messages per second.
+    """
+    reader_socket, writer_socket = socket.socketpair()
+    reader_socket.setblocking(False)
+    connection = SocketConnection(reader_socket)
+
+    sender = threading.Thread(target=send_stream, args=(writer_socket, stream))
+    start = time.perf_counter()
+    sender.start()
+
+    count = 0
+    while count < NUM_MESSAGES:
+        msg = connection.recv_match(blocking=False)
+        if msg is None:
+            select.select([reader_socket], [], [], 1)
+            continue
+
+        count += 1
+
+    elapsed = time.perf_counter() - start
+    sender.join()
+    reader_socket.close()
+    writer_socket.close()
+
+    return count / elapsed
+
+
+def benchmark_bulk(stream: bytes) -> float:
+    """
+    Returns messages per second.
+    """
+    reader_socket, writer_socket = socket.socketpair()
+    reader_socket.setblocking(False)
+    connection = SocketConnection(reader_socket)
+    reader = bulk_reader.BulkMavlinkReader(connection)
+
+    sender = threading.Thread(target=send_stream, args=(writer_socket, stream))
+    start = time.perf_counter()
+    sender.start()
+
+    count = 0
+    while count < NUM_MESSAGES:
+        select.select([reader_socket], [], [], 1)
+        count += len(reader.read_messages())
+
+    elapsed = time.perf_counter() - start
+    sender.join()
+    reader_socket.close()
+    writer_socket.close()
+
+    return count / elapsed
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    stream = encode_stream(NUM_MESSAGES)
+    print(f"{NUM_MESSAGES} messages, {len(stream)} bytes")
+
+    print(f"recv_match: {benchmark_recv_match(stream):9.0f} messages/s")
+    print(f"      bulk: {benchmark_bulk(stream):9.0f} messages/s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
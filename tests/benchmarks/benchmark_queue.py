@@ -0,0 +1,121 @@
+"""
+Benchmark the queue backends. To run:
+```
+python -m tests.benchmarks.benchmark_queue
+```
+"""
+
+import multiprocessing as mp
+import statistics
+import time
+
+from utilities.workers import queue_manager
+from utilities.workers import queue_proxy_wrapper
+
+QUEUE_SIZE = 10
+NUM_ROUND_TRIPS = 2000
+NUM_ITEMS = 20000
+
+# Roughly the size of a telemetry sample
+PAYLOAD = tuple(float(i) for i in range(13))
+
+
+def echo(
+    input_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    output_queue: queue_proxy_wrapper.QueueProxyWrapper,
+    count: int,
+) -> None:
+    """
+    Sends every item back.
+    """
+    for _ in range(count):
+        output_queue.queue.put(input_queue.queue.get())
+
+
+def produce(output_queue: queue_proxy_wrapper.QueueProxyWrapper, count: int) -> None:
+    """
+    Sends items as fast as possible.
+    """
+    for _ in range(count):
+        output_queue.queue.put(PAYLOAD)
+
+
+def benchmark_latency(
+    mp_manager: queue_manager.QueueManager, backend: queue_proxy_wrapper.QueueBackend
+) -> "list[float]":
+    """
+    Ping pong between 2 processes.
+
+    Returns the one way latencies in seconds.
+    """
+    ping_queue = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_SIZE, backend)
+    pong_queue = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_SIZE, backend)
+
+    worker = mp.Process(target=echo, args=(ping_queue, pong_queue, NUM_ROUND_TRIPS))
+    worker.start()
+
+    latencies = []
+    for _ in range(NUM_ROUND_TRIPS):
+        start = time.perf_counter()
+        ping_queue.queue.put(PAYLOAD)
+        pong_queue.queue.get()
+        latencies.append((time.perf_counter() - start) / 2)
+
+    worker.join()
+    ping_queue.release()
+    pong_queue.release()
+
+    return latencies
+
+
+def benchmark_throughput(
+    mp_manager: queue_manager.QueueManager, backend: queue_proxy_wrapper.QueueBackend
+) -> float:
+    """
+    One producer process, consumed by this process.
+
+    Returns the items per second.
+    """
+    data_queue = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_SIZE, backend)
+
+    worker = mp.Process(target=produce, args=(data_queue, NUM_ITEMS))
+
+    start = time.perf_counter()
+    worker.start()
+    for _ in range(NUM_ITEMS):
+        data_queue.queue.get()
+
+    elapsed = time.perf_counter() - start
+
+    worker.join()
+    data_queue.release()
+
+    return NUM_ITEMS / elapsed
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    mp_manager = queue_manager.create_queue_manager()
+
+    for backend in queue_proxy_wrapper.QueueBackend:
+        latencies = benchmark_latency(mp_manager, backend)
+        throughput = benchmark_throughput(mp_manager, backend)
+
+        print(
+            f"{backend.name:>13}: "
+            f"latency median {statistics.median(latencies) * 1e6:8.1f} us, "
+            f"p99 {statistics.quantiles(latencies, n=100)[98] * 1e6:8.1f} us, "
+            f"throughput {throughput:10.0f} items/s"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
@@ -0,0 +1,152 @@
+"""
+Compare the multiprocessing and asyncio runtimes of bootcamp_main against a mock drone.
+Measures time to first command, memory of the process tree,
+and latency from telemetry sent to command received. To run:
+```
+python -m tests.benchmarks.benchmark_runtime
+```
+"""
+
+import os
+import pathlib
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import transport
+
+CONNECTION_STRING = transport.peer_connection_string(transport.connection_string())
+RUNTIMES = ["multiprocessing", "asyncio"]
+MEASURE_TIME = 5  # seconds
+TELEMETRY_PERIOD = 0.05  # seconds
+HEARTBEAT_PERIOD = 1  # seconds
+STARTUP_TIMEOUT = 30  # seconds
+
+
+def tree_rss(pid: int) -> int:
+    """
+    Returns the resident memory in bytes of the process and all of its descendants.
+    """
+    total = 0
+    pending = [pid]
+    while len(pending) > 0:
+        current = pending.pop()
+        try:
+            status = pathlib.Path(f"/proc/{current}/status").read_text(encoding="utf-8")
+            children = pathlib.Path(f"/proc/{current}/task/{current}/children").read_text(
+                encoding="utf-8"
+            )
+        except OSError:
+            continue
+
+        for line in status.splitlines():
+            if line.startswith("VmRSS:"):
+                total += int(line.split()[1]) * 1024
+
+        pending += [int(child) for child in children.split()]
+
+    return total
+
+
+def benchmark(runtime: str) -> "tuple[float, int, list[float]]":
+    """
+    Starts bootcamp_main with the runtime and plays the drone.
+
+    Returns the time to first command in seconds, the memory in bytes,
+    and the telemetry to command latencies in seconds.
+    """
+    drone = mavutil.mavlink_connection(CONNECTION_STRING, source_system=1, source_component=0)
+
+    start = time.perf_counter()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "bootcamp_main", "--runtime", runtime],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    first_command_time = None
+    rss = 0
+    latencies = []
+    last_telemetry_time = None
+    next_heartbeat = 0.0
+    next_telemetry = 0.0
+    measure_end = None
+
+    while measure_end is None or time.perf_counter() < measure_end:
+        now = time.perf_counter()
+        if now - start > STARTUP_TIMEOUT and first_command_time is None:
+            print(f"{runtime}: no command received, is the mock drone port free?")
+            break
+
+        if now >= next_heartbeat:
+            drone.mav.heartbeat_send(
+                mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_GENERIC, 0, 0, 0
+            )
+            next_heartbeat = now + HEARTBEAT_PERIOD
+
+        if now >= next_telemetry:
+            time_boot_ms = int((now - start) * 1000)
+            # Below the target so that every sample produces a command
+            drone.mav.attitude_send(time_boot_ms, 0, 0, 0, 0, 0, 0)
+            drone.mav.local_position_ned_send(time_boot_ms, 0, 0, 0, 0, 0, 0)
+            last_telemetry_time = time.perf_counter()
+            next_telemetry = now + TELEMETRY_PERIOD
+
+        msg = drone.recv_match(type="COMMAND_LONG", blocking=True, timeout=0.001)
+        if msg is None:
+            continue
+
+        received_time = time.perf_counter()
+        if first_command_time is None:
+            first_command_time = received_time - start
+            measure_end = received_time + MEASURE_TIME
+            continue
+
+        latencies.append(received_time - last_telemetry_time)
+        if rss == 0 and received_time > measure_end - MEASURE_TIME / 2:
+            rss = tree_rss(process.pid)
+
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+    drone.close()
+
+    return first_command_time or float("nan"), rss, latencies
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    os.chdir(pathlib.Path(__file__).parents[2])
+
+    for runtime in RUNTIMES:
+        first_command_time, rss, latencies = benchmark(runtime)
+        if len(latencies) == 0:
+            continue
+
+        latencies.sort()
+        print(
+            f"{runtime:>15}: first command after {first_command_time:6.2f} s, "
+            f"RSS {rss / 2**20:6.1f} MiB, latency "
+            f"median {statistics.median(latencies) * 1000:6.2f} ms "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
@@ -0,0 +1,95 @@
+"""
+Benchmark encoding telemetry for the queue. To run:
+```
+python -m tests.benchmarks.benchmark_telemetry_data
+```
+"""
+
+# Legacy struct replica
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+import pickle
+import timeit
+
+from modules.telemetry import telemetry
+
+NUM_REPEATS = 100000
+
+
+class DictTelemetryData:
+    """
+    TelemetryData before `__slots__`, pickled with its full `__dict__`.
+    """
+
+    def __init__(self, *fields: float) -> None:
+        (
+            self.time_since_boot,
+            self.x,
+            self.y,
+            self.z,
+            self.x_velocity,
+            self.y_velocity,
+            self.z_velocity,
+            self.roll,
+            self.pitch,
+            self.yaw,
+            self.roll_speed,
+            self.pitch_speed,
+            self.yaw_speed,
+        ) = fields
+
+
+def report(name: str, size: int, encode: "(...) -> object", decode: "(...) -> object") -> None:  # type: ignore
+    """
+    Times the encode and decode functions and prints a line.
+    """
+    encode_time = timeit.timeit(encode, number=NUM_REPEATS) / NUM_REPEATS
+    decode_time = timeit.timeit(decode, number=NUM_REPEATS) / NUM_REPEATS
+
+    print(
+        f"{name:>14}: {size:4d} bytes, "
+        f"encode {encode_time * 1e6:6.2f} us, decode {decode_time * 1e6:6.2f} us"
+    )
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    fields = (123456, 1.0, 2.0, -30.0, 0.5, 0.25, -0.1, 0.01, -0.02, 1.57, 0.001, 0.002, 0.003)
+
+    legacy = DictTelemetryData(*fields)
+    legacy_pickle = pickle.dumps(legacy, pickle.HIGHEST_PROTOCOL)
+    report(
+        "pickle __dict__",
+        len(legacy_pickle),
+        lambda: pickle.dumps(legacy, pickle.HIGHEST_PROTOCOL),
+        lambda: pickle.loads(legacy_pickle),
+    )
+
+    slotted = telemetry.TelemetryData(*fields)
+    slotted_pickle = pickle.dumps(slotted, pickle.HIGHEST_PROTOCOL)
+    report(
+        "pickle slots",
+        len(slotted_pickle),
+        lambda: pickle.dumps(slotted, pickle.HIGHEST_PROTOCOL),
+        lambda: pickle.loads(slotted_pickle),
+    )
+
+    wire = slotted.to_bytes()
+    report(
+        "to_bytes",
+        len(wire),
+        slotted.to_bytes,
+        lambda: telemetry.TelemetryData.from_bytes(wire),
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
@@ -0,0 +1,74 @@
+"""
+Benchmark decoding telemetry frames, pymavlink against the telemetry decoder. To run:
+```
+python -m tests.benchmarks.benchmark_telemetry_decoder
+```
+"""
+
+import itertools
+import timeit
+
+from pymavlink import mavutil
+
+from modules.telemetry import telemetry
+
+NUM_REPEATS = 100000
+
+
+def report(name: str, function: "(...) -> object") -> None:  # type: ignore
+    """
+    Times the function and prints a line.
+    """
+    decode_time = timeit.timeit(function, number=NUM_REPEATS) / NUM_REPEATS
+    print(f"{name:>26}: {decode_time * 1e6:6.2f} us per message")
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, 1, 0)
+    frames = [
+        encoder.local_position_ned_encode(1000, 1.0, 2.0, -30.0, 0.5, 0.25, -0.1).pack(encoder),
+        encoder.attitude_encode(1000, 0.01, -0.02, 1.57, 0.001, 0.002, 0.003).pack(encoder),
+    ]
+
+    # Decoding only
+    decoder = mavutil.mavlink.MAVLink(None)
+    generic_frames = itertools.cycle(frames)
+    report("pymavlink decode", lambda: decoder.decode(bytearray(next(generic_frames))))
+
+    telemetry_decoder = telemetry.TelemetryDecoder()
+    record = telemetry.TelemetryData()
+    fast_frames = itertools.cycle(frames)
+    report("TelemetryDecoder", lambda: telemetry_decoder.decode_into(next(fast_frames), record))
+
+    # Decoding and combining, as the telemetry worker does
+    connection = mavutil.mavlink.MAVLink(None)
+    connection.mav = connection
+
+    _, generic_logic = telemetry.Telemetry.create(connection, None, None)  # type: ignore
+    generic_frames = itertools.cycle(frames)
+    report(
+        "pymavlink process_message",
+        lambda: generic_logic.process_message(decoder.decode(bytearray(next(generic_frames)))),
+    )
+
+    _, fast_logic = telemetry.Telemetry.create(connection, None, None)  # type: ignore
+    fast_frames = itertools.cycle(frames)
+    report("process_frame", lambda: fast_logic.process_frame(next(fast_frames)))
+
+    # Interpolating attitude to every position
+    _, fused_logic = telemetry.Telemetry.create(connection, None, None, 0)  # type: ignore
+    fused_frames = itertools.cycle(frames)
+    report("process_frame fused", lambda: fused_logic.process_frame(next(fused_frames)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
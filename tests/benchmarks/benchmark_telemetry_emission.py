@@ -0,0 +1,130 @@
+"""
+Benchmark telemetry queue traffic of each emission policy against the telemetry mock drone. To run:
+```
+python -m tests.benchmarks.benchmark_telemetry_emission
+```
+
+Messages are received from the drone in wakeups, like the telemetry worker does.
+Each wakeup hands its frames to one Telemetry per policy and runs it once,
+queueing the result like the worker does, so at most one item is queued per wakeup.
+"""
+
+import subprocess
+import sys
+import time
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import transport
+from modules.telemetry import telemetry
+
+MOCK_DRONE_MODULE = "tests.integration.mock_drones.telemetry_drone"
+CONNECTION_STRING = transport.connection_string()
+EMISSION_PERIOD = 500  # ms, with FIXED_RATE only
+WAKEUP_PERIOD = 0.01  # seconds
+
+
+class FrameBatch:
+    """
+    Connection handing the frames of one wakeup to Telemetry, like a routed connection.
+    """
+
+    def __init__(self, mav: mavutil.mavlink.MAVLink) -> None:
+        self.mav = mav
+        self.frames = []
+
+    def recv_frame(self, blocking: bool = False, timeout: float | None = None) -> "bytes | None":
+        """
+        Next frame of the wakeup, None once all have been handed out.
+        """
+        _ = blocking, timeout
+        if len(self.frames) == 0:
+            return None
+
+        return self.frames.pop(0)
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    drone_process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", MOCK_DRONE_MODULE]
+    )
+
+    # Give the drone time to listen
+    time.sleep(1)
+    gcs = mavutil.mavlink_connection(CONNECTION_STRING)
+    gcs.mav.heartbeat_send(
+        mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+    )
+
+    batches = {}
+    telemetry_logics = {}
+    # Items put on each telemetry queue
+    queues = {}
+    for emission_policy in telemetry.EmissionPolicy:
+        batches[emission_policy] = FrameBatch(gcs.mav)
+        result, telemetry_logic = telemetry.Telemetry.create(
+            batches[emission_policy],
+            None,
+            None,  # type: ignore
+            None,
+            emission_policy,
+            EMISSION_PERIOD,
+        )
+        if not result or telemetry_logic is None:
+            print(f"ERROR: Failed to create Telemetry with {emission_policy.name}")
+            drone_process.kill()
+            return -1
+
+        telemetry_logics[emission_policy] = telemetry_logic
+        queues[emission_policy] = []
+
+    message_count = 0
+    wakeup_count = 0
+    # The drone is silent for a while between phases, so stop only once it has exited
+    while drone_process.poll() is None:
+        time.sleep(WAKEUP_PERIOD)
+
+        # Not blocking, the socket reports end of file on every read once the drone is done
+        frames = []
+        msg = gcs.recv_match(type=["ATTITUDE", "LOCAL_POSITION_NED"], blocking=False)
+        while msg is not None:
+            frames.append(msg.get_msgbuf())
+            msg = gcs.recv_match(type=["ATTITUDE", "LOCAL_POSITION_NED"], blocking=False)
+
+        if len(frames) == 0:
+            continue
+
+        message_count += len(frames)
+        wakeup_count += 1
+        for emission_policy, telemetry_logic in telemetry_logics.items():
+            batches[emission_policy].frames.extend(frames)
+            telemetry_data = telemetry_logic.run(None)  # type: ignore
+            if telemetry_data is not None:
+                queues[emission_policy].append(telemetry_data.to_bytes())
+
+    gcs.close()
+
+    print(f"Messages received: {message_count} in {wakeup_count} wakeups")
+    baseline = len(queues[telemetry.EmissionPolicy.ON_ANY])
+    for emission_policy, telemetry_logic in telemetry_logics.items():
+        queued = queues[emission_policy]
+        reduction = 1 - len(queued) / baseline if baseline > 0 else 0
+        print(
+            f"{emission_policy.name:>16}: {len(queued):4} queued"
+            f" ({sum(len(item) for item in queued):6} B)"
+            f", {telemetry_logic.suppressed_count:4} duplicates avoided"
+            f", traffic reduction {reduction:6.1%}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
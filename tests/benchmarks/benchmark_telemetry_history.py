@@ -0,0 +1,80 @@
+"""
+Benchmark rolling statistics over the columnar telemetry history. To run:
+```
+python -m tests.benchmarks.benchmark_telemetry_history
+```
+
+Compared against a deque of TelemetryData, averaging the velocity over the last window.
+"""
+
+import collections
+import statistics
+import timeit
+
+from modules.telemetry import telemetry
+from modules.telemetry import telemetry_history
+
+CAPACITY = 3000  # samples
+SAMPLE_PERIOD = 20  # ms
+WINDOW = 10000  # ms
+NUM_REPEATS = 1000
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    samples = [
+        telemetry.TelemetryData(
+            i * SAMPLE_PERIOD, float(i), 2.0, -30.0, 0.5, 0.25, -0.1, 0.01, -0.02, 1.57, 0, 0, 0
+        )
+        for i in range(CAPACITY)
+    ]
+
+    history = telemetry_history.TelemetryHistory(CAPACITY)
+    records = collections.deque(maxlen=CAPACITY)
+
+    append_time = timeit.timeit(lambda: history.append(samples[0]), number=NUM_REPEATS)
+    history.clear()
+    # Stored records are copies, the telemetry record is updated in place
+    copy_time = timeit.timeit(
+        lambda: records.append(telemetry.TelemetryData.from_bytes(samples[0].to_bytes())),
+        number=NUM_REPEATS,
+    )
+    records.clear()
+
+    for telemetry_data in samples:
+        history.append(telemetry_data)
+        records.append(telemetry_data)
+
+    def columnar_mean() -> float:
+        return float(history.window(WINDOW)["x_velocity"].mean())
+
+    def object_mean() -> float:
+        start = records[-1].time_since_boot - WINDOW
+        return statistics.fmean(
+            record.x_velocity for record in reversed(records) if record.time_since_boot >= start
+        )
+
+    assert columnar_mean() == object_mean()
+    columnar_time = timeit.timeit(columnar_mean, number=NUM_REPEATS) / NUM_REPEATS
+    object_time = timeit.timeit(object_mean, number=NUM_REPEATS) / NUM_REPEATS
+
+    print(
+        f"Append: columnar {append_time / NUM_REPEATS * 1e6:6.2f} us"
+        f", object copy {copy_time / NUM_REPEATS * 1e6:6.2f} us"
+    )
+    print(
+        f"Mean over {WINDOW} ms ({WINDOW // SAMPLE_PERIOD + 1} samples):"
+        f" columnar {columnar_time * 1e6:8.2f} us, object {object_time * 1e6:8.2f} us"
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
@@ -0,0 +1,114 @@
+"""
+Benchmark telemetry latency over TCP against UDP on loopback. To run:
+```
+python -m tests.benchmarks.benchmark_transport
+```
+
+A drone thread streams position messages with periodic bursts,
+the GCS measures the time from sending to receiving each one.
+Both ends share a process, so latencies include waiting for the interpreter lock.
+"""
+
+import statistics
+import threading
+import time
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import transport
+
+GCS_CONNECTION_STRINGS = ["tcp:127.0.0.1:14560", "udpout:127.0.0.1:14561"]
+RECEIVE_BUFFER_SIZE = 1 << 20  # bytes
+NUM_MESSAGES = 5000
+TELEMETRY_PERIOD = 0.002  # seconds
+BURST_PERIOD = 500  # messages
+BURST_SIZE = 200  # messages
+RECEIVE_TIMEOUT = 1  # seconds
+
+
+def run_drone(connection_string: str, send_times: "list[float]", is_ready: threading.Event) -> None:
+    """
+    Waits for the GCS, then sends every message, stamped with its index.
+    """
+    drone = mavutil.mavlink_connection(connection_string, source_system=1, source_component=0)
+    is_ready.set()
+    drone.wait_heartbeat()
+
+    for i in range(NUM_MESSAGES):
+        send_times[i] = time.perf_counter()
+        drone.mav.local_position_ned_send(i, 1.0, 2.0, 3.0, 0.1, 0.2, 0.3)
+
+        # Bursts are sent back to back, like a log download next to telemetry
+        if i % BURST_PERIOD >= BURST_SIZE:
+            time.sleep(TELEMETRY_PERIOD)
+
+    # Time to drain before closing
+    time.sleep(RECEIVE_TIMEOUT)
+    drone.close()
+
+
+def measure(gcs_connection_string: str) -> None:
+    """
+    Streams from a drone and prints the latency percentiles.
+    """
+    send_times = [0.0] * NUM_MESSAGES
+    is_ready = threading.Event()
+    drone_thread = threading.Thread(
+        target=run_drone,
+        args=(transport.peer_connection_string(gcs_connection_string), send_times, is_ready),
+    )
+    drone_thread.start()
+    is_ready.wait()
+
+    gcs = mavutil.mavlink_connection(gcs_connection_string)
+    sizes = transport.set_socket_buffers(gcs, RECEIVE_BUFFER_SIZE, 0)
+    gcs.mav.heartbeat_send(
+        mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+    )
+
+    latencies = []
+    while True:
+        msg = gcs.recv_match(type="LOCAL_POSITION_NED", blocking=True, timeout=RECEIVE_TIMEOUT)
+        if msg is None:
+            break
+
+        latencies.append(time.perf_counter() - send_times[msg.time_boot_ms])
+        if msg.time_boot_ms == NUM_MESSAGES - 1:
+            break
+
+    kernel_drops = transport.kernel_drop_count(gcs)
+    gcs.close()
+    drone_thread.join()
+
+    latencies.sort()
+    if len(latencies) == 0:
+        print(f"{gcs_connection_string:>24}: nothing received")
+        return
+
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(
+        f"{gcs_connection_string:>24}: latency mean {statistics.mean(latencies) * 1e6:7.0f} us"
+        f", p50 {p50 * 1e6:7.0f} us, p99 {p99 * 1e6:7.0f} us, max {latencies[-1] * 1e6:7.0f} us"
+        f", received {len(latencies)}/{NUM_MESSAGES}"
+        f", kernel drops {'n/a' if kernel_drops is None else kernel_drops}"
+        f", buffers {sizes}"
+    )
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    for gcs_connection_string in GCS_CONNECTION_STRINGS:
+        measure(gcs_connection_string)
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
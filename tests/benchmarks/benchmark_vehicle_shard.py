@@ -0,0 +1,133 @@
+"""
+Benchmark how many simulated vehicles one host can handle at a fixed telemetry rate. To run:
+```
+python -m tests.benchmarks.benchmark_vehicle_shard
+```
+
+Times 1 second worth of telemetry through the router (parsing and demultiplexing)
+and through a vehicle shard (decoding and deciding), without the queues between processes.
+The router is a single process, shards run in parallel on the remaining cores.
+A link carries at most 255 vehicles, higher limits are headroom for more links.
+"""
+
+import os
+import time
+import types
+
+from pymavlink import mavutil
+
+from modules.command import command
+from modules.mavlink_router import mavlink_router
+from modules.mavlink_router import routed_connection
+from modules.vehicle import vehicle_shard
+
+TELEMETRY_RATE = 10  # Hz, of each of position and attitude
+WAKEUPS_PER_SECOND = 10  # shard wakeups, each decides once per vehicle
+# MAVLink system IDs are 1 to 255
+VEHICLE_COUNTS = [1, 10, 50, 250]
+
+
+class ListQueue:
+    """
+    Stands in for a queue, keeping the items in a list.
+    """
+
+    def __init__(self) -> None:
+        self.items = []
+
+    def put(self, item: object) -> None:
+        """
+        Appends the item.
+        """
+        self.items.append(item)
+
+
+def encode_second(num_vehicles: int) -> bytes:
+    """
+    1 second of position and attitude from every vehicle, interleaved as on a shared link.
+    """
+    encoders = [
+        mavutil.mavlink.MAVLink(None, system_id, 1) for system_id in range(1, num_vehicles + 1)
+    ]
+    stream = bytearray()
+    for i in range(TELEMETRY_RATE):
+        for encoder in encoders:
+            position = encoder.local_position_ned_encode(i * 100, 1.0, 2.0, 0.0, 0.0, 0.0, 0.0)
+            attitude = encoder.attitude_encode(i * 100, 0.0, 0.0, 0.1, 0.0, 0.0, 0.0)
+            stream += position.pack(encoder) + attitude.pack(encoder)
+
+    return bytes(stream)
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    num_cores = os.cpu_count() or 1
+    # Main and the router take a core each
+    num_shard_cores = max(num_cores - 2, 1)
+    print(f"{TELEMETRY_RATE} Hz position and attitude per vehicle, {num_cores} cores")
+
+    for num_vehicles in VEHICLE_COUNTS:
+        stream = encode_second(num_vehicles)
+        system_ids = list(range(1, num_vehicles + 1))
+
+        # Router, every vehicle routed to 1 shard
+        shard_inbound = ListQueue()
+        routes = {}
+        for system_id in system_ids:
+            for message_type in ["LOCAL_POSITION_NED", "ATTITUDE", "COMMAND_ACK"]:
+                routes[(system_id, message_type)] = [shard_inbound]
+
+        _, router = mavlink_router.MavlinkRouter.create(
+            types.SimpleNamespace(), routes, None, None  # type: ignore
+        )
+        assert router is not None
+
+        start = time.perf_counter()
+        for msg in mavutil.mavlink.MAVLink(None).parse_buffer(stream):
+            router.route(msg)
+
+        router_time = time.perf_counter() - start
+
+        # Shard with every vehicle
+        connection = routed_connection.RoutedConnection(None, ListQueue())  # type: ignore
+        _, shard = vehicle_shard.VehicleShard.create(
+            connection,
+            {system_id: command.Position(10, 20, 30) for system_id in system_ids},
+            None,  # type: ignore
+            hold_off=1.0,
+            param_threshold=1.0,
+        )
+        assert shard is not None
+
+        frames = shard_inbound.items
+        batch_size = max(len(frames) // WAKEUPS_PER_SECOND, 1)
+        start = time.perf_counter()
+        for i in range(0, len(frames), batch_size):
+            for frame in frames[i : i + batch_size]:
+                shard.process_frame(frame)
+
+            shard.decide()
+
+        shard_time = time.perf_counter() - start
+
+        router_capacity = num_vehicles / router_time
+        shard_capacity = num_vehicles / shard_time
+        host_capacity = min(router_capacity, shard_capacity * num_shard_cores)
+        print(
+            f"{num_vehicles:>5} vehicles: router {router_time * 100:6.2f}% of a core"
+            f", shard {shard_time * 100:6.2f}% of a core"
+            f" -> router limit {router_capacity:6.0f}, shard limit {shard_capacity:6.0f} per core"
+            f", host limit {host_capacity:6.0f} vehicles"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
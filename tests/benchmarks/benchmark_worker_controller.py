@@ -0,0 +1,113 @@
+"""
+Benchmark the worker loop overhead of the controller checks. To run:
+```
+python -m tests.benchmarks.benchmark_worker_controller
+```
+"""
+
+import multiprocessing as mp
+import time
+
+from utilities.workers import worker_controller
+
+NUM_ITERATIONS = 100000
+
+# One loop per worker started by bootcamp_main
+WORKER_NAMES = ["heartbeat_sender", "heartbeat_receiver", "telemetry", "command"]
+
+
+class LegacyWorkerController:
+    """
+    WorkerController before the shared memory flags: an exit queue and a pause semaphore
+    which are queried on every loop.
+    """
+
+    def __init__(self) -> None:
+        self.__pause = mp.BoundedSemaphore(1)
+        self.__exit_queue = mp.Queue(1)
+
+    def check_pause(self) -> None:
+        """
+        Same as the original.
+        """
+        self.__pause.acquire()
+        self.__pause.release()
+
+    def is_exit_requested(self) -> bool:
+        """
+        Same as the original.
+        """
+        return not self.__exit_queue.empty()
+
+
+def worker_loop(
+    controller: "worker_controller.WorkerController | LegacyWorkerController",
+    start_event: mp.Event,  # type: ignore
+    output_queue: mp.Queue,
+) -> None:
+    """
+    Empty worker loop, reports the time per iteration in seconds.
+    """
+    start_event.wait()
+
+    start = time.perf_counter()
+    for _ in range(NUM_ITERATIONS):
+        if controller.is_exit_requested():
+            break
+
+        controller.check_pause()
+
+    output_queue.put((time.perf_counter() - start) / NUM_ITERATIONS)
+
+
+def benchmark(
+    controller: "worker_controller.WorkerController | LegacyWorkerController",
+) -> "list[float]":
+    """
+    Runs every worker loop at the same time.
+
+    Returns the time per iteration in seconds of each loop.
+    """
+    start_event = mp.Event()
+    output_queue = mp.Queue()
+
+    workers = [
+        mp.Process(target=worker_loop, args=(controller, start_event, output_queue))
+        for _ in WORKER_NAMES
+    ]
+    for worker in workers:
+        worker.start()
+
+    start_event.set()
+    results = [output_queue.get() for _ in workers]
+
+    for worker in workers:
+        worker.join()
+
+    return results
+
+
+def main() -> int:
+    """
+    Main function.
+    """
+    for name, controller in [
+        ("legacy", LegacyWorkerController()),
+        ("shared flags", worker_controller.WorkerController()),
+    ]:
+        results = benchmark(controller)
+        print(
+            f"{name:>12}: {len(results)} loops, "
+            f"mean {sum(results) / len(results) * 1e9:8.1f} ns per iteration, "
+            f"worst {max(results) * 1e9:8.1f} ns"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    result_main = main()
+    if result_main < 0:
+        print(f"ERROR: Status code: {result_main}")
+
+    print("Done!")
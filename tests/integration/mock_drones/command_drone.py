@@ -9,8 +9,9 @@ from pymavlink import mavutil
 
 from modules.command import command
 from modules.common.modules.logger import logger
+from modules.mavlink_router import transport
 
-CONNECTION_STRING = "tcpin:localhost:12345"
+CONNECTION_STRING = transport.peer_connection_string(transport.connection_string())
 TIMEOUT = 3.5
 NUM_TRIALS = 26
 FLOAT_TOLERANCE = 1e-6
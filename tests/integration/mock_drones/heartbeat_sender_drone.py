@@ -9,8 +9,9 @@ import time
 from pymavlink import mavutil
 
 from modules.common.modules.logger import logger
+from modules.mavlink_router import transport
 
-CONNECTION_STRING = "tcpin:localhost:12345"
+CONNECTION_STRING = transport.peer_connection_string(transport.connection_string())
 HEARTBEAT_PERIOD = 1
 NUM_TRIALS = 10
 ERROR_TOLERANCE = 1e-2
@@ -10,8 +10,9 @@ import time
 from pymavlink import mavutil
 
 from modules.common.modules.logger import logger
+from modules.mavlink_router import transport
 
-CONNECTION_STRING = "tcpin:localhost:12345"
+CONNECTION_STRING = transport.peer_connection_string(transport.connection_string())
 ATTITUDE_PERIOD = 1 / 3
 POSITION_PERIOD = 1 / 2
 TOTAL_PERIOD = 1
@@ -17,12 +17,14 @@ from modules.command import command_worker
 from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
+from modules.mavlink_router import transport
 from modules.telemetry import telemetry
+from utilities.workers import queue_manager
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 
 MOCK_DRONE_MODULE = "tests.integration.mock_drones.command_drone"
-CONNECTION_STRING = "tcp:localhost:12345"
+CONNECTION_STRING = transport.connection_string()
 
 # Please do not modify these, these are for the test cases (but do take note of them!)
 TELEMETRY_PERIOD = 0.5
@@ -86,7 +88,7 @@ def put_queue(
     Place mocked inputs into the input queue periodically.
     """
     for data in path:
-        telemetry_queue.queue.put(data)
+        telemetry_queue.queue.put(data.to_bytes())
         time.sleep(TELEMETRY_PERIOD)
 
 
@@ -139,7 +141,7 @@ def main() -> int:
     args = worker_controller.WorkerController()
 
     # Create a multiprocess manager for synchronized queues
-    manager = mp.Manager()
+    manager = queue_manager.create_queue_manager()
 
     # Create your queues
     telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(manager)
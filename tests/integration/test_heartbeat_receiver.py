@@ -14,11 +14,13 @@ from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
 from modules.heartbeat import heartbeat_receiver_worker
+from modules.mavlink_router import transport
+from utilities.workers import queue_manager
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 
 MOCK_DRONE_MODULE = "tests.integration.mock_drones.heartbeat_receiver_drone"
-CONNECTION_STRING = "tcp:localhost:12345"
+CONNECTION_STRING = transport.connection_string()
 
 # Please do not modify these, these are for the test cases (but do take note of them!)
 HEARTBEAT_PERIOD = 1
@@ -67,8 +69,8 @@ def read_queue(
     """
     while True:
         try:
-            status = status_queue.get()
-            main_logger.info(f"Heartbeat status: {status}")
+            for status, _ in status_queue.get_many(0, timeout=None):
+                main_logger.info(f"Heartbeat status: {status}")
         except Exception:
             break
 
@@ -122,7 +124,7 @@ def main() -> int:
     args = worker_controller.WorkerController()
 
     # Create a multiprocess manager for synchronized queues
-    manager = mp.Manager()
+    manager = queue_manager.create_queue_manager()
 
     # Create your queues
     status_queue = queue_proxy_wrapper.QueueProxyWrapper(manager)
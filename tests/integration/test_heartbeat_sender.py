@@ -14,10 +14,11 @@ from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
 from modules.heartbeat import heartbeat_sender_worker
+from modules.mavlink_router import transport
 from utilities.workers import worker_controller
 
 MOCK_DRONE_MODULE = "tests.integration.mock_drones.heartbeat_sender_drone"
-CONNECTION_STRING = "tcp:localhost:12345"
+CONNECTION_STRING = transport.connection_string()
 
 # Please do not modify these, these are for the test cases
 HEARTBEAT_PERIOD = 1
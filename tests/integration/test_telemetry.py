@@ -13,12 +13,15 @@ from pymavlink import mavutil
 from modules.common.modules.logger import logger
 from modules.common.modules.logger import logger_main_setup
 from modules.common.modules.read_yaml import read_yaml
+from modules.mavlink_router import transport
+from modules.telemetry import telemetry
 from modules.telemetry import telemetry_worker
+from utilities.workers import queue_manager
 from utilities.workers import queue_proxy_wrapper
 from utilities.workers import worker_controller
 
 MOCK_DRONE_MODULE = "tests.integration.mock_drones.telemetry_drone"
-CONNECTION_STRING = "tcp:localhost:12345"
+CONNECTION_STRING = transport.connection_string()
 
 # Please do not modify these
 TELEMETRY_PERIOD = 1
@@ -43,7 +46,7 @@ def read_queue(
 ) -> None:
     while True:
         try:
-            data = telemetry_queue.queue.get(timeout=1)
+            data = telemetry.TelemetryData.from_bytes(telemetry_queue.queue.get(timeout=1))
             main_logger.info(f"Telemetry: {data}")
         except Exception:
             break
@@ -84,7 +87,7 @@ def main() -> int:
 
     args = worker_controller.WorkerController()
 
-    manager = mp.Manager()
+    manager = queue_manager.create_queue_manager()
 
     telemetry_queue = queue_proxy_wrapper.QueueProxyWrapper(
         manager,
@@ -0,0 +1,92 @@
+"""
+Test reading MAVLink from the event loop.
+"""
+
+import asyncio
+import socket
+import types
+
+from pymavlink import mavutil
+
+from modules.async_runtime import async_runtime
+from modules.mavlink_router import reconnecting_connection
+from . import test_reconnecting_connection
+
+
+class TestAsyncMavlinkReader:
+    """
+    Messages are handed to their subscribers until the peer closes a connection
+    that cannot reconnect.
+    """
+
+    def test_peer_closed(self) -> None:
+        """
+        Reading stops at end of file instead of the callback running in a loop.
+        """
+        # Setup
+        port, peer = socket.socketpair()
+        port.setblocking(False)
+        encoder = mavutil.mavlink.MAVLink(None, 1, 0)
+        connection = types.SimpleNamespace(
+            port=port, fd=port.fileno(), mav=mavutil.mavlink.MAVLink(None)
+        )
+
+        async def read() -> "tuple[asyncio.Queue, bool]":
+            reader = async_runtime.AsyncMavlinkReader(connection)  # type: ignore
+            heartbeats = reader.subscribe(["HEARTBEAT"])
+            reader.start()
+
+            peer.sendall(encoder.heartbeat_encode(6, 8, 0, 0, 0).pack(encoder))
+            peer.close()
+            await asyncio.sleep(0.1)
+
+            is_reading = asyncio.get_running_loop().remove_reader(port.fileno())
+            assert reader.is_closed
+            return heartbeats, is_reading
+
+        # Run
+        heartbeats, is_reading = asyncio.run(read())
+        port.close()
+
+        # Test
+        assert heartbeats.qsize() == 1
+        assert not is_reading
+
+    def test_reconnect(self) -> None:
+        """
+        Reading resumes on the new link after the peer closes a reconnecting connection.
+        """
+        # Setup
+        server = test_reconnecting_connection.HeartbeatServer()
+        connection = reconnecting_connection.ReconnectingConnection(
+            f"tcp:127.0.0.1:{server.port}", initial_backoff=0.05
+        )
+        assert connection.connect(timeout=2)
+        first_link = connection.connection
+
+        async def read() -> None:
+            reader = async_runtime.AsyncMavlinkReader(connection)  # type: ignore
+            heartbeats = reader.subscribe(["HEARTBEAT"])
+            reader.start()
+
+            server.drop_client()
+            while connection.reconnect_count == 0:
+                await asyncio.sleep(0.05)
+
+            # Only heartbeats sent over the new link
+            while not heartbeats.empty():
+                heartbeats.get_nowait()
+
+            await asyncio.wait_for(heartbeats.get(), 1)
+            reader.stop()
+            assert not reader.is_closed
+
+        # Run
+        asyncio.run(asyncio.wait_for(read(), 5))
+
+        # Test
+        assert connection.reconnect_count == 1
+        assert connection.connection is not first_link
+
+        connection.close()
+        server.stop()
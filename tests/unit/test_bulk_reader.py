@@ -0,0 +1,138 @@
+"""
+Test bulk MAVLink reading.
+"""
+
+import socket
+import types
+
+import pytest
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import bulk_reader
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture()
+def sockets() -> "tuple[socket.socket, socket.socket]":  # type: ignore
+    """
+    Connected stream sockets, the first is non-blocking.
+    """
+    reader, writer = socket.socketpair()
+    reader.setblocking(False)
+    yield reader, writer  # type: ignore
+    reader.close()
+    writer.close()
+
+
+def create_reader(port: socket.socket) -> bulk_reader.BulkMavlinkReader:
+    """
+    Reader for a connection with the given socket.
+    """
+    connection = types.SimpleNamespace(port=port, mav=mavutil.mavlink.MAVLink(None))
+    return bulk_reader.BulkMavlinkReader(connection)  # type: ignore
+
+
+def encode_stream(count: int) -> bytes:
+    """
+    Alternating position and attitude frames.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, 1, 0)
+    frames = []
+    for i in range(count):
+        if i % 2 == 0:
+            message = encoder.local_position_ned_encode(i, 1.0, 2.0, 3.0, 0.1, 0.2, 0.3)
+        else:
+            message = encoder.attitude_encode(i, 0.1, 0.2, 0.3, 0.0, 0.0, 0.0)
+
+        frames.append(message.pack(encoder))
+
+    return b"".join(frames)
+
+
+class TestBulkMavlinkReader:
+    """
+    Every frame is decoded once, however the stream is split.
+    """
+
+    def test_decode_all(self, sockets: "tuple[socket.socket, socket.socket]") -> None:
+        """
+        All frames in a read are returned in order.
+        """
+        # Setup
+        reader_socket, writer_socket = sockets
+        reader = create_reader(reader_socket)
+        writer_socket.sendall(encode_stream(10))
+
+        # Run
+        messages = reader.read_messages()
+
+        # Test
+        assert [message.time_boot_ms for message in messages] == list(range(10))
+        assert messages[0].get_type() == "LOCAL_POSITION_NED"
+        assert messages[1].get_type() == "ATTITUDE"
+
+    def test_split_frame(self, sockets: "tuple[socket.socket, socket.socket]") -> None:
+        """
+        Incomplete frame is kept until the rest arrives.
+        """
+        # Setup
+        reader_socket, writer_socket = sockets
+        reader = create_reader(reader_socket)
+        stream = encode_stream(2)
+        split = len(stream) - 5
+
+        # Run
+        writer_socket.sendall(stream[:split])
+        first = reader.read_messages()
+        writer_socket.sendall(stream[split:])
+        second = reader.read_messages()
+
+        # Test
+        assert len(first) == 1
+        assert len(second) == 1
+        assert second[0].time_boot_ms == 1
+
+    def test_skip_bad_data(self, sockets: "tuple[socket.socket, socket.socket]") -> None:
+        """
+        Garbage between frames is skipped.
+        """
+        # Setup
+        reader_socket, writer_socket = sockets
+        reader = create_reader(reader_socket)
+        stream = encode_stream(2)
+        writer_socket.sendall(b"\x00\x01\xfd\x02" + stream)
+
+        # Run
+        messages = reader.read_messages()
+
+        # Test
+        assert len(messages) == 2
+        assert reader.bad_data_count > 0
+
+    def test_nothing_available(self, sockets: "tuple[socket.socket, socket.socket]") -> None:
+        """
+        Does not wait.
+        """
+        # Setup
+        reader_socket, _ = sockets
+        reader = create_reader(reader_socket)
+
+        # Test
+        assert len(reader.read_messages()) == 0
+
+    def test_closed(self, sockets: "tuple[socket.socket, socket.socket]") -> None:
+        """
+        Peer closing is reported.
+        """
+        # Setup
+        reader_socket, writer_socket = sockets
+        reader = create_reader(reader_socket)
+        writer_socket.close()
+
+        # Test
+        with pytest.raises(ConnectionError):
+            reader.read_messages()
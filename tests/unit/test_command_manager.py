@@ -0,0 +1,291 @@
+"""
+Test suppressing repeated outbound commands.
+"""
+
+import time
+
+import pytest
+from pymavlink import mavutil
+from pymavlink.dialects.v20 import common
+
+from modules.command import command_manager
+
+CHANGE_ALT = mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT
+YAW = mavutil.mavlink.MAV_CMD_CONDITION_YAW
+
+
+class RecordingConnection:
+    """
+    Connection whose `mav` records every command sent.
+    """
+
+    def __init__(self) -> None:
+        self.mav = self
+        self.sent = []
+        # Ground station defaults of mavutil
+        self.srcSystem = 255  # pylint: disable=invalid-name
+        self.srcComponent = 0  # pylint: disable=invalid-name
+
+    def command_long_send(self, *args: float) -> None:
+        """
+        Records the arguments.
+        """
+        self.sent.append(args)
+
+
+class TestCommandManager:
+    """
+    Repeats within the hold-off are suppressed, changes are sent.
+    """
+
+    def test_no_hold_off(self) -> None:
+        """
+        Every command is sent by default.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection)  # type: ignore
+
+        # Run
+        results = [manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30) for _ in range(3)]
+
+        # Test
+        assert results == [True, True, True]
+        assert len(connection.sent) == 3
+        assert connection.sent[0] == (1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+        assert manager.sent_count == 3
+        assert manager.suppressed_count == 0
+
+    def test_suppress_repeat(self) -> None:
+        """
+        Identical commands are sent once per hold-off.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 0.1)  # type: ignore
+
+        # Run
+        first = manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+        second = manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+        time.sleep(0.15)
+        third = manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+
+        # Test
+        assert first
+        assert not second
+        assert third
+        assert len(connection.sent) == 2
+        assert manager.sent_count == 2
+        assert manager.suppressed_count == 1
+
+    def test_parameter_change(self) -> None:
+        """
+        Changes within the threshold are suppressed, larger changes are sent.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 60, 1.0)  # type: ignore
+
+        # Run
+        first = manager.send(1, 0, YAW, 0, 45.0, 5, 1, 1, 0, 0, 0)
+        small_change = manager.send(1, 0, YAW, 0, 44.5, 5, 1, 1, 0, 0, 0)
+        large_change = manager.send(1, 0, YAW, 0, 40.0, 5, 1, 1, 0, 0, 0)
+        direction_change = manager.send(1, 0, YAW, 0, 40.0, 5, -1, 1, 0, 0, 0)
+
+        # Test
+        assert first
+        assert not small_change
+        assert large_change
+        assert direction_change
+        assert [sent[4] for sent in connection.sent] == [45.0, 40.0, 40.0]
+        assert manager.suppressed_count == 1
+
+    def test_commands_independent(self) -> None:
+        """
+        Each command and target has its own hold-off.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 60)  # type: ignore
+
+        # Run
+        altitude = manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+        yaw = manager.send(1, 0, YAW, 0, 45.0, 5, 1, 1, 0, 0, 0)
+        other_target = manager.send(2, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+        altitude_repeat = manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+
+        # Test
+        assert altitude
+        assert yaw
+        assert other_target
+        assert not altitude_repeat
+        assert manager.sent_count == 3
+
+    def test_invalid(self) -> None:
+        """
+        Negative hold-off and threshold are rejected.
+        """
+        # Setup
+        connection = RecordingConnection()
+
+        # Test
+        with pytest.raises(ValueError):
+            command_manager.CommandManager(connection, -1)  # type: ignore
+
+        with pytest.raises(ValueError):
+            command_manager.CommandManager(connection, 1, -1)  # type: ignore
+
+
+def create_ack(
+    command: int, result: int, source_system: int = 1
+) -> "mavutil.mavlink.MAVLink_command_ack_message":
+    """
+    Acknowledgement as received from the drone.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, source_system, 0)
+    frame = encoder.command_ack_encode(command, result).pack(encoder)
+    return mavutil.mavlink.MAVLink(None).decode(bytearray(frame))
+
+
+class TestAcknowledgement:
+    """
+    Commands stay in flight until acknowledged, and are retried with backoff.
+    """
+
+    def test_acknowledged(self) -> None:
+        """
+        Acknowledgement completes the command and records its latency.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 0, 0, 60, 3)  # type: ignore
+        manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+
+        # Run
+        in_flight = manager.in_flight_count()
+        matched = manager.process_ack(create_ack(CHANGE_ALT, mavutil.mavlink.MAV_RESULT_ACCEPTED))
+        unmatched = manager.process_ack(create_ack(YAW, mavutil.mavlink.MAV_RESULT_ACCEPTED))
+
+        # Test
+        assert in_flight == 1
+        assert matched
+        assert not unmatched
+        assert manager.in_flight_count() == 0
+        assert manager.acknowledged_count == 1
+        assert manager.rejected_count == 0
+        assert sum(manager.ack_latency_histogram) == 1
+
+    def test_foreign_acks(self) -> None:
+        """
+        Acknowledgements from another vehicle or for another ground station are ignored.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 0, 0, 60, 3)  # type: ignore
+        manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+
+        encoder = common.MAVLink(None, 1, 1)
+        frame = encoder.command_ack_encode(
+            CHANGE_ALT, mavutil.mavlink.MAV_RESULT_ACCEPTED, 0, 0, 254, 0
+        ).pack(encoder)
+        other_station = common.MAVLink(None).decode(bytearray(frame))
+
+        # Run
+        other_vehicle = manager.process_ack(
+            create_ack(CHANGE_ALT, mavutil.mavlink.MAV_RESULT_ACCEPTED, 2)
+        )
+        other_target = manager.process_ack(other_station)
+
+        # Test
+        assert not other_vehicle
+        assert not other_target
+        assert manager.in_flight_count() == 1
+        assert manager.ignored_ack_count == 2
+        assert manager.process_ack(create_ack(CHANGE_ALT, mavutil.mavlink.MAV_RESULT_ACCEPTED))
+
+    def test_rejected(self) -> None:
+        """
+        Any result other than accepted is counted as rejected.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 0, 0, 60, 3)  # type: ignore
+        manager.send(1, 0, YAW, 0, 45.0, 5, 1, 1, 0, 0, 0)
+
+        # Run
+        manager.process_ack(create_ack(YAW, mavutil.mavlink.MAV_RESULT_DENIED))
+
+        # Test
+        assert manager.acknowledged_count == 1
+        assert manager.rejected_count == 1
+
+    def test_retry_with_backoff(self) -> None:
+        """
+        Unacknowledged commands are sent again with an incremented confirmation,
+        waiting twice as long each time, until out of retries.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 0, 0, 0.05, 2)  # type: ignore
+        manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+
+        # Run
+        early = manager.retry_expired()
+        time.sleep(0.06)
+        first = manager.retry_expired()
+        time.sleep(0.06)
+        before_backoff = manager.retry_expired()
+        time.sleep(0.06)
+        second = manager.retry_expired()
+        time.sleep(0.25)
+        out_of_retries = manager.retry_expired()
+
+        # Test
+        assert early == 0
+        assert first == 1
+        assert before_backoff == 0
+        assert second == 1
+        assert out_of_retries == 0
+        assert [sent[3] for sent in connection.sent] == [0, 1, 2]
+        assert manager.retry_count == 2
+        assert manager.failed_count == 1
+        assert manager.in_flight_count() == 0
+
+    def test_in_progress(self) -> None:
+        """
+        Command in progress gets another timeout instead of a retry.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 0, 0, 0.05, 1)  # type: ignore
+        manager.send(1, 0, YAW, 0, 45.0, 5, 1, 1, 0, 0, 0)
+
+        # Run
+        time.sleep(0.03)
+        manager.process_ack(create_ack(YAW, mavutil.mavlink.MAV_RESULT_IN_PROGRESS))
+        time.sleep(0.03)
+        retried = manager.retry_expired()
+
+        # Test
+        assert retried == 0
+        assert manager.in_flight_count() == 1
+        assert manager.acknowledged_count == 0
+
+    def test_suppress_in_flight(self) -> None:
+        """
+        Identical command is not sent while one is in flight, even without hold-off.
+        """
+        # Setup
+        connection = RecordingConnection()
+        manager = command_manager.CommandManager(connection, 0, 0, 60, 3)  # type: ignore
+        manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+
+        # Run
+        while_in_flight = manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+        manager.process_ack(create_ack(CHANGE_ALT, mavutil.mavlink.MAV_RESULT_ACCEPTED))
+        after_ack = manager.send(1, 0, CHANGE_ALT, 0, 1, 0, 0, 0, 0, 0, 30)
+
+        # Test
+        assert not while_in_flight
+        assert after_ack
+        assert manager.suppressed_count == 1
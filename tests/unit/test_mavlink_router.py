@@ -0,0 +1,190 @@
+"""
+Test routing MAVLink messages between the connection and workers.
+"""
+
+import math
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import mavlink_router
+from modules.mavlink_router import routed_connection
+from utilities.workers import queue_proxy_wrapper
+
+QUEUE_SIZE = 4
+
+
+class LoopbackConnection:
+    """
+    Connection which receives prepared messages and records sent frames.
+    """
+
+    def __init__(self, messages: "list[mavutil.mavlink.MAVLink_message]") -> None:
+        self.messages = messages
+        self.written = []
+
+    def recv_match(
+        self, blocking: bool = False, timeout: "float | None" = None
+    ) -> "mavutil.mavlink.MAVLink_message | None":
+        """
+        Returns the next prepared message.
+        """
+        _ = blocking, timeout
+        if len(self.messages) == 0:
+            return None
+
+        return self.messages.pop(0)
+
+    def write(self, frame: bytes) -> None:
+        """
+        Records the frame.
+        """
+        self.written.append(frame)
+
+
+def create_queue() -> queue_proxy_wrapper.QueueProxyWrapper:
+    """
+    Creates a shared memory queue, no manager required.
+    """
+    return queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY  # type: ignore
+    )
+
+
+def decoded(frame: bytes) -> "mavutil.mavlink.MAVLink_message":
+    """
+    Decodes a frame like the connection would.
+    """
+    return mavutil.mavlink.MAVLink(None).decode(bytearray(frame))
+
+
+class TestMavlinkRouter:
+    """
+    Router forwards by message type and sends for every worker.
+    """
+
+    def test_route_by_type(self) -> None:
+        """
+        Each message reaches only the workers subscribed to its type.
+        """
+        # Setup
+        encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+        heartbeat = encoder.heartbeat_encode(2, 3, 0, 0, 0)
+        attitude = encoder.attitude_encode(10, 0.1, 0.2, 0.3, 0.0, 0.0, 0.0)
+        connection = LoopbackConnection(
+            [decoded(message.pack(encoder)) for message in [heartbeat, attitude, heartbeat]]
+        )
+
+        heartbeat_queue = create_queue()
+        telemetry_queue = create_queue()
+        outbound_queue = create_queue()
+        result, router = mavlink_router.MavlinkRouter.create(
+            connection,  # type: ignore
+            {"HEARTBEAT": [heartbeat_queue], "ATTITUDE": [telemetry_queue]},
+            outbound_queue,
+            None,  # type: ignore
+        )
+        assert result
+        assert router is not None
+
+        heartbeat_connection = routed_connection.RoutedConnection(heartbeat_queue, outbound_queue)
+        telemetry_connection = routed_connection.RoutedConnection(telemetry_queue, outbound_queue)
+
+        # Run
+        for _ in range(3):
+            router.run(None)
+
+        first = heartbeat_connection.recv_match(type="HEARTBEAT", blocking=False)
+        second = heartbeat_connection.recv_match(type="HEARTBEAT", blocking=False)
+        third = heartbeat_connection.recv_match(type="HEARTBEAT", blocking=False)
+        attitude_received = telemetry_connection.recv_match(
+            type=["LOCAL_POSITION_NED", "ATTITUDE"], blocking=True, timeout=1
+        )
+
+        # Test
+        assert first is not None and first.get_type() == "HEARTBEAT"
+        assert second is not None and second.get_type() == "HEARTBEAT"
+        assert third is None
+        assert attitude_received is not None
+        assert math.isclose(attitude_received.yaw, attitude.yaw, rel_tol=1e-6)
+        assert router.routed_count == 3
+
+        for wrapper in [heartbeat_queue, telemetry_queue, outbound_queue]:
+            wrapper.release()
+
+    def test_route_by_vehicle(self) -> None:
+        """
+        Routes of a vehicle take precedence over routes of the message type.
+        """
+        # Setup
+        frames = []
+        for system_id in [1, 2, 3]:
+            encoder = mavutil.mavlink.MAVLink(None, system_id, 1)
+            frames.append(encoder.attitude_encode(10, 0.1, 0.2, 0.3, 0.0, 0.0, 0.0).pack(encoder))
+
+        connection = LoopbackConnection([decoded(frame) for frame in frames])
+
+        first_queue = create_queue()
+        second_queue = create_queue()
+        any_queue = create_queue()
+        outbound_queue = create_queue()
+        _, router = mavlink_router.MavlinkRouter.create(
+            connection,  # type: ignore
+            {
+                (1, "ATTITUDE"): [first_queue],
+                (2, "ATTITUDE"): [second_queue],
+                "ATTITUDE": [any_queue],
+            },
+            outbound_queue,
+            None,  # type: ignore
+        )
+        assert router is not None
+
+        # Run
+        for _ in range(3):
+            router.run(None)
+
+        # Test
+        assert first_queue.get_many(0) == [frames[0]]
+        assert second_queue.get_many(0) == [frames[1]]
+        assert any_queue.get_many(0) == [frames[2]]
+
+        for wrapper in [first_queue, second_queue, any_queue, outbound_queue]:
+            wrapper.release()
+
+    def test_send_through_router(self) -> None:
+        """
+        Frames sent by workers are written by the router in order, in a single write.
+        """
+        # Setup
+        connection = LoopbackConnection([])
+        outbound_queue = create_queue()
+        result, router = mavlink_router.MavlinkRouter.create(
+            connection, {}, outbound_queue, None  # type: ignore
+        )
+        assert result
+        assert router is not None
+
+        worker_connection = routed_connection.RoutedConnection(None, outbound_queue)
+
+        # Run
+        worker_connection.mav.heartbeat_send(
+            mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+        )
+        worker_connection.mav.command_long_send(
+            1, 0, mavutil.mavlink.MAV_CMD_CONDITION_YAW, 0, 10, 5, 1, 1, 0, 0, 0
+        )
+        sent_count = router.writer.write_pending()
+
+        # Test
+        assert sent_count == 2
+        assert len(connection.written) == 1
+        decoder = mavutil.mavlink.MAVLink(None)
+        messages = decoder.parse_buffer(connection.written[0])
+        assert [message.get_type() for message in messages] == ["HEARTBEAT", "COMMAND_LONG"]
+        assert messages[0].get_srcSystem() == 255
+        assert router.writer.write_count == 1
+        assert router.writer.frame_count == 2
+        assert router.writer.byte_count == len(connection.written[0])
+        assert sum(router.writer.queue_delay_histogram) == 2
+
+        outbound_queue.release()
@@ -0,0 +1,119 @@
+"""
+Test coalescing outbound frames.
+"""
+
+import socket
+import time
+import types
+
+import pytest
+
+from pymavlink import mavutil
+
+from modules.mavlink_router import outbound_writer
+from modules.mavlink_router import routed_connection
+from utilities.workers import queue_proxy_wrapper
+
+QUEUE_SIZE = 16
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture()
+def outbound_queue() -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Shared memory queue, no manager required.
+    """
+    wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY  # type: ignore
+    )
+    yield wrapper  # type: ignore
+    wrapper.release()
+
+
+def send_heartbeats(outbound_queue: queue_proxy_wrapper.QueueProxyWrapper, count: int) -> None:
+    """
+    Sends from a worker connection.
+    """
+    worker_connection = routed_connection.RoutedConnection(None, outbound_queue)
+    for _ in range(count):
+        worker_connection.mav.heartbeat_send(
+            mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+        )
+
+
+class TestOutboundWriter:
+    """
+    Pending frames are sent together.
+    """
+
+    def test_stream_socket(self, outbound_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Every pending frame goes out in 1 write on a TCP like socket.
+        """
+        # Setup
+        local, remote = socket.socketpair()
+        local.setblocking(False)
+        writer = outbound_writer.OutboundWriter(
+            types.SimpleNamespace(port=local), outbound_queue, None  # type: ignore
+        )
+        send_heartbeats(outbound_queue, 5)
+
+        # Run
+        sent_count = writer.write_pending()
+        received = remote.recv(4096)
+
+        # Test
+        assert sent_count == 5
+        assert writer.write_count == 1
+        assert writer.max_frames_per_write == 5
+        assert len(received) == writer.byte_count
+        messages = mavutil.mavlink.MAVLink(None).parse_buffer(received)
+        assert len(messages) == 5
+
+        local.close()
+        remote.close()
+
+    def test_thread(self, outbound_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Thread sends as frames arrive and flushes the rest when stopped.
+        """
+        # Setup
+        written = []
+        connection = types.SimpleNamespace(write=written.append)
+        writer = outbound_writer.OutboundWriter(connection, outbound_queue, None)  # type: ignore
+
+        # Run
+        writer.start()
+        send_heartbeats(outbound_queue, 1)
+        time.sleep(0.05)
+        first_written = len(written)
+        send_heartbeats(outbound_queue, 2)
+        writer.stop()
+
+        # Test
+        assert first_written == 1
+        assert writer.frame_count == 3
+        assert sum(len(data) for data in written) == writer.byte_count
+        assert writer.max_queue_delay < 1
+
+    def test_closed(self, outbound_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Thread exits once the outbound queue is closed.
+        """
+        # Setup
+        connection = types.SimpleNamespace(write=lambda data: None)
+        writer = outbound_writer.OutboundWriter(connection, outbound_queue, None)  # type: ignore
+        writer.start()
+
+        # Run
+        outbound_queue.close()
+        start = time.monotonic()
+        writer.stop()
+        stop_time = time.monotonic() - start
+
+        # Test
+        assert stop_time < 0.5
+        assert writer.summary() == "nothing written"
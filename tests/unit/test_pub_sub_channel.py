@@ -0,0 +1,174 @@
+"""
+Test the publish/subscribe channel.
+"""
+
+import multiprocessing as mp
+
+import pytest
+
+from utilities.workers import pub_sub_channel
+from utilities.workers import queue_closed
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+CAPACITY = 4
+MAX_SUBSCRIBERS = 3
+SLOT_SIZE = 256
+
+
+@pytest.fixture()
+def channel() -> pub_sub_channel.PubSubChannel:  # type: ignore
+    """
+    Creates an empty channel.
+    """
+    instance = pub_sub_channel.PubSubChannel(CAPACITY, MAX_SUBSCRIBERS, SLOT_SIZE)
+    yield instance  # type: ignore
+    instance.unlink()
+
+
+def collect(
+    subscription: pub_sub_channel.PubSubSubscription, count: int, output_queue: mp.Queue
+) -> None:
+    """
+    Receives items in a separate process and reports them.
+    """
+    items = []
+    while len(items) < count:
+        items += subscription.receive_many(0, timeout=5)
+
+    output_queue.put(items)
+
+
+class TestPubSubChannel:
+    """
+    Every subscriber sees every item.
+    """
+
+    def test_fan_out(self, channel: pub_sub_channel.PubSubChannel) -> None:
+        """
+        Each subscriber receives every item in order independently.
+        """
+        # Setup
+        first = channel.subscribe()
+        second = channel.subscribe()
+        expected = [b"bytes", 2, "three"]
+
+        # Run
+        for item in expected:
+            channel.publish(item)
+
+        first_items = first.receive_many(0)
+        second_head = second.receive_many(1)
+        second_tail = second.receive_many(0)
+
+        # Test
+        assert first_items == expected
+        assert second_head + second_tail == expected
+        assert first.receive_many(0) == []
+
+    def test_only_items_after_subscribing(self, channel: pub_sub_channel.PubSubChannel) -> None:
+        """
+        A late subscriber does not see earlier items.
+        """
+        # Setup
+        channel.publish(1)
+        subscription = channel.subscribe()
+
+        # Run
+        channel.publish(2)
+
+        # Test
+        assert subscription.receive_many(0) == [2]
+
+    def test_slow_subscriber_misses(self, channel: pub_sub_channel.PubSubChannel) -> None:
+        """
+        Publisher overwrites items a subscriber has not read yet.
+        """
+        # Setup
+        subscription = channel.subscribe()
+        expected = list(range(CAPACITY + 2))
+
+        # Run
+        for item in expected:
+            channel.publish(item)
+
+        actual = subscription.receive_many(0)
+
+        # Test
+        assert actual == expected[2:]
+        assert subscription.missed_count() == 2
+
+    def test_receive_latest(self, channel: pub_sub_channel.PubSubChannel) -> None:
+        """
+        Latest skips older unread items without counting them as missed.
+        """
+        # Setup
+        subscription = channel.subscribe()
+        for item in range(3):
+            channel.publish(item)
+
+        # Run
+        actual = subscription.receive_latest()
+
+        # Test
+        assert actual == 2
+        assert subscription.receive_latest() is None
+        assert subscription.missed_count() == 0
+
+    def test_too_many_subscribers(self, channel: pub_sub_channel.PubSubChannel) -> None:
+        """
+        Subscriber count is bounded.
+        """
+        # Setup
+        for _ in range(MAX_SUBSCRIBERS):
+            channel.subscribe()
+
+        # Test
+        with pytest.raises(ValueError):
+            channel.subscribe()
+
+    def test_close(self, channel: pub_sub_channel.PubSubChannel) -> None:
+        """
+        Remaining items are readable after close, then `QueueClosed` is raised.
+        """
+        # Setup
+        subscription = channel.subscribe()
+        channel.publish(1)
+
+        # Run
+        channel.close()
+
+        # Test
+        assert subscription.receive_many(0, timeout=None) == [1]
+        with pytest.raises(queue_closed.QueueClosed):
+            subscription.receive_many(0, timeout=None)
+        with pytest.raises(queue_closed.QueueClosed):
+            channel.publish(2)
+
+    def test_across_processes(self, channel: pub_sub_channel.PubSubChannel) -> None:
+        """
+        Subscribers in other processes receive every item.
+        """
+        # Setup
+        expected = list(range(CAPACITY))
+        output_queue = mp.Queue()
+        workers = [
+            mp.Process(target=collect, args=(channel.subscribe(), len(expected), output_queue))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+
+        # Run
+        for item in expected:
+            channel.publish(item)
+
+        results = [output_queue.get(timeout=10) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        # Test
+        assert results == [expected, expected]
@@ -0,0 +1,522 @@
+"""
+Test the queue wrapper with both backends.
+"""
+
+import threading
+import time
+
+import pytest
+
+from utilities.workers import queue_closed
+from utilities.workers import queue_manager
+from utilities.workers import queue_proxy_wrapper
+from utilities.workers import queue_statistics
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+QUEUE_SIZE = 4
+
+
+@pytest.fixture(scope="module")
+def mp_manager() -> queue_manager.QueueManager:  # type: ignore
+    """
+    Starts a manager shared by all tests in this file.
+    """
+    manager = queue_manager.create_queue_manager()
+    yield manager  # type: ignore
+    manager.shutdown()
+
+
+@pytest.fixture(params=list(queue_proxy_wrapper.QueueBackend))
+def wrapper(
+    mp_manager: queue_manager.QueueManager, request: pytest.FixtureRequest
+) -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Creates an empty queue for each backend.
+    """
+    instance = queue_proxy_wrapper.QueueProxyWrapper(mp_manager, QUEUE_SIZE, request.param)
+    yield instance  # type: ignore
+    instance.release()
+
+
+class TestBatch:
+    """
+    Bulk operations.
+    """
+
+    def test_put_many_get_many(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        All items come out in order.
+        """
+        # Setup
+        expected = [1, "two", 3.0]
+
+        # Run
+        count = wrapper.put_many(expected)
+        actual = wrapper.get_many(0)
+
+        # Test
+        assert count == len(expected)
+        assert actual == expected
+
+    def test_put_many_stops_when_full(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Only as many items as fit are put.
+        """
+        # Setup
+        items = list(range(QUEUE_SIZE + 2))
+
+        # Run
+        count = wrapper.put_many(items, timeout=0.01)
+
+        # Test
+        assert count == QUEUE_SIZE
+        assert wrapper.get_many(0) == items[:QUEUE_SIZE]
+
+    def test_get_many_limit(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        No more than `max_items` are removed.
+        """
+        # Setup
+        wrapper.put_many([1, 2, 3])
+
+        # Run
+        first = wrapper.get_many(2)
+        second = wrapper.get_many(2)
+
+        # Test
+        assert first == [1, 2]
+        assert second == [3]
+
+    def test_get_many_empty(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Nothing available in time.
+        """
+        # Run
+        actual = wrapper.get_many(0, timeout=0.01)
+
+        # Test
+        assert not actual
+
+
+@pytest.fixture(params=list(queue_proxy_wrapper.QueueBackend))
+def conflating_wrapper(
+    mp_manager: queue_manager.QueueManager, request: pytest.FixtureRequest
+) -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Creates an empty conflating queue for each backend.
+    """
+    instance = queue_proxy_wrapper.QueueProxyWrapper(
+        mp_manager,
+        QUEUE_SIZE,
+        request.param,
+        queue_proxy_wrapper.QueueMode.CONFLATING,
+    )
+    yield instance  # type: ignore
+    instance.release()
+
+
+class TestConflating:
+    """
+    Latest value mode.
+    """
+
+    def test_newest_wins(self, conflating_wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Only the newest unread item is kept and puts never block.
+        """
+        # Run
+        for i in range(QUEUE_SIZE * 2):
+            conflating_wrapper.queue.put(i, timeout=0.01)
+
+        actual = conflating_wrapper.get_many(0)
+
+        # Test
+        assert actual == [QUEUE_SIZE * 2 - 1]
+        assert conflating_wrapper.overwritten_count() == QUEUE_SIZE * 2 - 1
+
+    def test_put_many(self, conflating_wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        A batch counts every item but the last as overwritten.
+        """
+        # Run
+        count = conflating_wrapper.put_many([1, 2, 3])
+        actual = conflating_wrapper.queue.get(timeout=0.01)
+
+        # Test
+        assert count == 3
+        assert actual == 3
+        assert conflating_wrapper.overwritten_count() == 2
+
+    def test_read_then_write(
+        self, conflating_wrapper: queue_proxy_wrapper.QueueProxyWrapper
+    ) -> None:
+        """
+        Items that were read are not counted as overwritten.
+        """
+        # Run
+        conflating_wrapper.queue.put(1)
+        first = conflating_wrapper.queue.get(timeout=0.01)
+        conflating_wrapper.queue.put(2)
+        second = conflating_wrapper.queue.get(timeout=0.01)
+
+        # Test
+        assert [first, second] == [1, 2]
+        assert conflating_wrapper.overwritten_count() == 0
+        assert conflating_wrapper.get_many(0, timeout=0.01) == []
+
+
+class TestClose:
+    """
+    Shutdown by closing the queue.
+    """
+
+    def test_wakes_blocked_consumer(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        A consumer blocked forever is released almost immediately.
+        """
+        # Setup
+        errors = []
+
+        def consume() -> None:
+            try:
+                wrapper.queue.get()
+            except queue_closed.QueueClosed as exc:
+                errors.append(exc)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        time.sleep(0.05)
+
+        # Run
+        start = time.perf_counter()
+        wrapper.close()
+        consumer.join(timeout=5)
+        elapsed = time.perf_counter() - start
+
+        # Test
+        assert not consumer.is_alive()
+        assert len(errors) == 1
+        assert elapsed < 0.1
+
+    def test_wakes_blocked_producer(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        A producer blocked on a full queue is released.
+        """
+        # Setup
+        errors = []
+        wrapper.put_many(list(range(QUEUE_SIZE)))
+
+        def produce() -> None:
+            try:
+                wrapper.queue.put(QUEUE_SIZE)
+            except queue_closed.QueueClosed as exc:
+                errors.append(exc)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        time.sleep(0.05)
+
+        # Run
+        wrapper.close()
+        producer.join(timeout=5)
+
+        # Test
+        assert not producer.is_alive()
+        assert len(errors) == 1
+
+    def test_drain_after_close(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Items already in the queue can still be read, then gets and puts raise.
+        """
+        # Setup
+        wrapper.put_many([1, 2])
+
+        # Run
+        wrapper.close()
+        actual = wrapper.get_many(0)
+
+        # Test
+        assert actual == [1, 2]
+        with pytest.raises(queue_closed.QueueClosed):
+            wrapper.get_many(0, timeout=None)
+
+        with pytest.raises(queue_closed.QueueClosed):
+            wrapper.queue.put(3)
+
+
+@pytest.fixture(params=list(queue_proxy_wrapper.QueueBackend))
+def instrumented_wrapper(
+    mp_manager: queue_manager.QueueManager, request: pytest.FixtureRequest
+) -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Creates an empty instrumented queue for each backend.
+    """
+    instance = queue_proxy_wrapper.QueueProxyWrapper(
+        mp_manager,
+        QUEUE_SIZE,
+        request.param,
+        instrument=True,
+    )
+    yield instance  # type: ignore
+    instance.release()
+
+
+class TestStatistics:
+    """
+    Optional counters and histograms.
+    """
+
+    def test_not_instrumented(self, wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Nothing is recorded by default.
+        """
+        assert wrapper.statistics() is None
+
+    def test_counters(self, instrumented_wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Items, depth and waits are counted.
+        """
+        # Run
+        instrumented_wrapper.put_many([1, 2, 3])
+        instrumented_wrapper.queue.put(4)
+        instrumented_wrapper.get_many(2)
+        actual = instrumented_wrapper.statistics()
+
+        # Test
+        assert actual is not None
+        assert actual.puts == 4
+        assert actual.gets == 2
+        assert actual.depth == 2
+        assert actual.max_depth == 4
+        assert sum(actual.put_wait_histogram) == 2
+        assert sum(actual.get_wait_histogram) == 1
+        # Nothing waited
+        assert actual.put_wait_total < 1.0
+        assert actual.get_wait_total < 1.0
+
+    def test_get_wait(self, instrumented_wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Time spent waiting on an empty queue lands in a matching bucket.
+        """
+        # Setup
+        wait = 0.05
+
+        # Run
+        threading.Timer(wait, instrumented_wrapper.queue.put, (1,)).start()
+        instrumented_wrapper.queue.get(timeout=5)
+        actual = instrumented_wrapper.statistics()
+
+        # Test
+        assert actual is not None
+        assert actual.get_wait_total >= wait
+        assert queue_statistics.histogram_percentile(actual.get_wait_histogram, 1.0) >= wait
+
+
+def create_with_policy(
+    mp_manager: queue_manager.QueueManager,
+    backend: queue_proxy_wrapper.QueueBackend,
+    backpressure: queue_proxy_wrapper.BackpressurePolicy,
+    sample_period: int = 1,
+) -> queue_proxy_wrapper.QueueProxyWrapper:
+    """
+    Creates a FIFO queue with a short put timeout.
+    """
+    return queue_proxy_wrapper.QueueProxyWrapper(
+        mp_manager,
+        QUEUE_SIZE,
+        backend,
+        backpressure=backpressure,
+        put_timeout=0.01,
+        sample_period=sample_period,
+    )
+
+
+@pytest.mark.parametrize("backend", list(queue_proxy_wrapper.QueueBackend))
+class TestBackpressure:
+    """
+    Put policies when the queue is full.
+    """
+
+    @pytest.mark.parametrize(
+        "backpressure",
+        [
+            queue_proxy_wrapper.BackpressurePolicy.BLOCK_TIMEOUT,
+            queue_proxy_wrapper.BackpressurePolicy.DROP_NEWEST,
+        ],
+    )
+    def test_drop_newest(
+        self,
+        mp_manager: queue_manager.QueueManager,
+        backend: queue_proxy_wrapper.QueueBackend,
+        backpressure: queue_proxy_wrapper.BackpressurePolicy,
+    ) -> None:
+        """
+        Items that do not fit are dropped and counted.
+        """
+        # Setup
+        wrapper = create_with_policy(mp_manager, backend, backpressure)
+        items = list(range(QUEUE_SIZE + 2))
+
+        # Run
+        results = [wrapper.put(item) for item in items]
+
+        # Test
+        assert results == [True] * QUEUE_SIZE + [False] * 2
+        assert wrapper.dropped_count() == 2
+        assert wrapper.get_many(0) == items[:QUEUE_SIZE]
+
+        wrapper.release()
+
+    def test_drop_oldest(
+        self, mp_manager: queue_manager.QueueManager, backend: queue_proxy_wrapper.QueueBackend
+    ) -> None:
+        """
+        Newest items are kept.
+        """
+        # Setup
+        wrapper = create_with_policy(
+            mp_manager, backend, queue_proxy_wrapper.BackpressurePolicy.DROP_OLDEST
+        )
+        items = list(range(QUEUE_SIZE + 2))
+
+        # Run
+        results = [wrapper.put(item) for item in items]
+
+        # Test
+        assert all(results)
+        assert wrapper.dropped_count() == 2
+        assert wrapper.get_many(0) == items[2:]
+
+        wrapper.release()
+
+    def test_sample(
+        self, mp_manager: queue_manager.QueueManager, backend: queue_proxy_wrapper.QueueBackend
+    ) -> None:
+        """
+        Every Nth item is forwarded.
+        """
+        # Setup
+        wrapper = create_with_policy(
+            mp_manager, backend, queue_proxy_wrapper.BackpressurePolicy.SAMPLE, 3
+        )
+        items = list(range(7))
+
+        # Run
+        for item in items:
+            wrapper.put(item)
+
+        # Test
+        assert wrapper.get_many(0) == [0, 3, 6]
+        assert wrapper.dropped_count() == 4
+
+        wrapper.release()
+
+    def test_block_does_not_drop(
+        self, mp_manager: queue_manager.QueueManager, backend: queue_proxy_wrapper.QueueBackend
+    ) -> None:
+        """
+        Default policy waits for the consumer.
+        """
+        # Setup
+        wrapper = create_with_policy(
+            mp_manager, backend, queue_proxy_wrapper.BackpressurePolicy.BLOCK
+        )
+        items = list(range(QUEUE_SIZE + 1))
+
+        def consume() -> None:
+            time.sleep(0.05)
+            wrapper.get_many(1)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+
+        # Run
+        results = [wrapper.put(item) for item in items]
+        consumer.join()
+
+        # Test
+        assert all(results)
+        assert wrapper.dropped_count() == 0
+        assert wrapper.get_many(0) == items[1:]
+
+        wrapper.release()
+
+
+@pytest.fixture(params=list(queue_proxy_wrapper.QueueBackend))
+def priority_wrapper(
+    mp_manager: queue_manager.QueueManager, request: pytest.FixtureRequest
+) -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Creates an empty priority queue for each backend.
+    """
+    instance = queue_proxy_wrapper.QueueProxyWrapper(
+        mp_manager,
+        QUEUE_SIZE,
+        request.param,
+        queue_proxy_wrapper.QueueMode.PRIORITY,
+        backpressure=queue_proxy_wrapper.BackpressurePolicy.DROP_OLDEST,
+    )
+    yield instance  # type: ignore
+    instance.release()
+
+
+class TestPriority:
+    """
+    High priority items preempt normal ones.
+    """
+
+    def test_high_priority_first(
+        self, priority_wrapper: queue_proxy_wrapper.QueueProxyWrapper
+    ) -> None:
+        """
+        High priority items come out first, each priority in order.
+        """
+        # Setup
+        priority_wrapper.put("Connected 1")
+        priority_wrapper.put("Connected 2")
+        priority_wrapper.put("Disconnected 1", True)
+        priority_wrapper.put("Disconnected 2", True)
+
+        # Run
+        first = priority_wrapper.queue.get()
+        rest = priority_wrapper.get_many(0)
+
+        # Test
+        assert first == "Disconnected 1"
+        assert rest == ["Disconnected 2", "Connected 1", "Connected 2"]
+
+    def test_share_maxsize(self, priority_wrapper: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Both priorities count towards `maxsize`.
+        """
+        # Setup
+        items = [(i % 2 == 0, i) for i in range(QUEUE_SIZE + 1)]
+
+        # Run
+        count = priority_wrapper.put_many(items, timeout=0.01)
+
+        # Test
+        assert count == QUEUE_SIZE
+        assert priority_wrapper.get_many(0) == [0, 2, 1, 3]
+
+    def test_drop_oldest_keeps_high_priority(
+        self, priority_wrapper: queue_proxy_wrapper.QueueProxyWrapper
+    ) -> None:
+        """
+        Normal items are discarded to make space before high priority ones.
+        """
+        # Setup
+        priority_wrapper.put("Disconnected", True)
+        for i in range(QUEUE_SIZE):
+            priority_wrapper.put(i)
+
+        # Run
+        actual = priority_wrapper.get_many(0)
+
+        # Test
+        assert priority_wrapper.dropped_count() == 1
+        assert actual == ["Disconnected", 1, 2, 3]
@@ -0,0 +1,155 @@
+"""
+Test re-establishing a dropped link.
+"""
+
+import socket
+import threading
+import time
+import types
+
+import pytest
+from pymavlink import mavutil
+
+from modules.mavlink_router import reconnecting_connection
+
+ENCODER = mavutil.mavlink.MAVLink(None, 1, 1)
+HEARTBEAT = ENCODER.heartbeat_encode(
+    mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA, 0, 0, 0
+).pack(ENCODER)
+
+
+class HeartbeatServer:
+    """
+    Drone which sends heartbeats to every client until the client is dropped.
+    """
+
+    def __init__(self) -> None:
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+
+        self.client = None
+        self.__is_stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def drop_client(self) -> None:
+        """
+        Closes the current client connection.
+        """
+        client = self.client
+        self.client = None
+        if client is not None:
+            client.close()
+
+    def stop(self) -> None:
+        """
+        Stops accepting and closes every socket.
+        """
+        self.__is_stopped.set()
+        self.drop_client()
+        self.listener.close()
+        self.__thread.join()
+
+    def __run(self) -> None:
+        """
+        Accepts one client at a time and sends it heartbeats.
+        """
+        self.listener.settimeout(0.05)
+        while not self.__is_stopped.is_set():
+            if self.client is None:
+                try:
+                    self.client, _ = self.listener.accept()
+                except OSError:
+                    continue
+
+            try:
+                self.client.sendall(HEARTBEAT)
+            except (OSError, AttributeError):
+                # Dropped meanwhile
+                pass
+
+            time.sleep(0.05)
+
+
+class TestReconnectingConnection:
+    """
+    Connecting waits for a heartbeat, reconnecting replaces the link and records the outage.
+    """
+
+    def test_reconnect(self) -> None:
+        """
+        A new link replaces the dropped one and stream rates are requested again.
+        """
+        # Setup
+        server = HeartbeatServer()
+        connection = reconnecting_connection.ReconnectingConnection(
+            f"tcp:127.0.0.1:{server.port}", initial_backoff=0.05
+        )
+        replayed = []
+        connection.rates = [types.SimpleNamespace(replay=lambda: replayed.append(True))]
+
+        # Run
+        connected = connection.connect(timeout=2)
+        first_link = connection.connection
+        server.drop_client()
+        reconnected = connection.reconnect()
+
+        # Test
+        assert connected
+        assert reconnected
+        assert connection.connection is not first_link
+        assert connection.fd == connection.connection.fd
+        assert replayed == [True]
+        assert connection.reconnect_count == 1
+        assert 0 < connection.last_outage == connection.max_outage == connection.total_outage
+        assert "reconnected 1 times" in connection.summary()
+
+        connection.close()
+        server.stop()
+
+    def test_timeout(self) -> None:
+        """
+        Attempts back off until the timeout when nothing answers.
+        """
+        # Setup
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+        # Not listening, connecting is refused
+        connection = reconnecting_connection.ReconnectingConnection(
+            f"tcp:127.0.0.1:{port}", initial_backoff=0.05, max_backoff=0.1
+        )
+
+        # Run
+        start = time.monotonic()
+        connected = connection.connect(timeout=0.5)
+        elapsed = time.monotonic() - start
+
+        # Test
+        assert not connected
+        assert elapsed < 1
+        # Backoff of 0.05, 0.1, 0.1, ...
+        assert 3 <= connection.failed_attempt_count <= 7
+        assert connection.connection is None
+        with pytest.raises(AttributeError):
+            _ = connection.mav
+
+        # Writes are dropped while not connected
+        connection.write(HEARTBEAT)
+
+        listener.close()
+
+    def test_invalid(self) -> None:
+        """
+        Backoff must be positive and not above its maximum.
+        """
+        # Test
+        with pytest.raises(ValueError):
+            reconnecting_connection.ReconnectingConnection("tcp:127.0.0.1:1", initial_backoff=0)
+
+        with pytest.raises(ValueError):
+            reconnecting_connection.ReconnectingConnection(
+                "tcp:127.0.0.1:1", initial_backoff=2, max_backoff=1
+            )
@@ -0,0 +1,138 @@
+"""
+Test the shared memory queue.
+"""
+
+import multiprocessing as mp
+import queue
+
+import pytest
+
+from utilities.workers import shared_memory_queue
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+QUEUE_SIZE = 3
+SLOT_SIZE = 256
+
+
+@pytest.fixture()
+def shared_queue() -> shared_memory_queue.SharedMemoryQueue:  # type: ignore
+    """
+    Creates an empty shared memory queue.
+    """
+    instance = shared_memory_queue.SharedMemoryQueue(QUEUE_SIZE, SLOT_SIZE)
+    yield instance  # type: ignore
+    instance.unlink()
+
+
+def echo(
+    input_queue: shared_memory_queue.SharedMemoryQueue,
+    output_queue: shared_memory_queue.SharedMemoryQueue,
+    count: int,
+) -> None:
+    """
+    Moves items from one queue to another in a separate process.
+    """
+    for _ in range(count):
+        output_queue.put(input_queue.get(timeout=5))
+
+
+class TestSharedMemoryQueue:
+    """
+    Shared memory queue behaves like `queue.Queue`.
+    """
+
+    def test_fifo_order(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Items come out in the order they were put in, wrapping around the ring.
+        """
+        # Setup
+        expected = list(range(QUEUE_SIZE * 2 + 1))
+
+        # Run
+        actual = []
+        for item in expected:
+            shared_queue.put(item)
+            actual.append(shared_queue.get())
+
+        # Test
+        assert actual == expected
+        assert shared_queue.empty()
+
+    def test_bytes_and_objects(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Raw bytes and arbitrary objects survive the round trip.
+        """
+        # Setup
+        expected_bytes = b"\x00\x01\x02"
+        expected_object = {"x": 1.0, "status": "Connected"}
+
+        # Run
+        shared_queue.put(expected_bytes)
+        shared_queue.put(expected_object)
+
+        # Test
+        assert shared_queue.get() == expected_bytes
+        assert shared_queue.get() == expected_object
+
+    def test_full_and_empty(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Non-blocking operations raise the `queue` module exceptions.
+        """
+        # Run
+        for i in range(QUEUE_SIZE):
+            shared_queue.put_nowait(i)
+
+        # Test
+        assert shared_queue.full()
+        with pytest.raises(queue.Full):
+            shared_queue.put(QUEUE_SIZE, timeout=0.01)
+
+        for _ in range(QUEUE_SIZE):
+            shared_queue.get_nowait()
+
+        with pytest.raises(queue.Empty):
+            shared_queue.get(timeout=0.01)
+
+    def test_item_too_large(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Items larger than a slot are rejected without taking a slot.
+        """
+        # Run
+        with pytest.raises(ValueError):
+            shared_queue.put(bytes(SLOT_SIZE + 1))
+
+        # Test
+        assert shared_queue.qsize() == 0
+
+    def test_invalid_size(self) -> None:
+        """
+        The ring buffer cannot be infinite.
+        """
+        with pytest.raises(ValueError):
+            shared_memory_queue.SharedMemoryQueue(0)
+
+    def test_across_processes(self, shared_queue: shared_memory_queue.SharedMemoryQueue) -> None:
+        """
+        Another process can consume and produce items.
+        """
+        # Setup
+        output_queue = shared_memory_queue.SharedMemoryQueue(QUEUE_SIZE, SLOT_SIZE)
+        expected = ["a", "b", "c", "d", "e"]
+        worker = mp.Process(target=echo, args=(shared_queue, output_queue, len(expected)))
+
+        # Run
+        worker.start()
+        actual = []
+        for item in expected:
+            shared_queue.put(item, timeout=5)
+            actual.append(output_queue.get(timeout=5))
+
+        worker.join()
+        output_queue.unlink()
+
+        # Test
+        assert actual == expected
@@ -0,0 +1,249 @@
+"""
+Test requesting and measuring message rates.
+"""
+
+import time
+
+import pytest
+from pymavlink import mavutil
+
+from modules.mavlink_router import stream_rates
+
+ENCODER = mavutil.mavlink.MAVLink(None, 1, 0)
+
+
+class ScriptedConnection:
+    """
+    Connection which receives prepared messages and records requests sent.
+    """
+
+    def __init__(self, messages: "list[mavutil.mavlink.MAVLink_message]") -> None:
+        self.mav = self
+        self.messages = messages
+        self.commands = []
+        self.data_streams = []
+
+    def command_long_send(self, *args: float) -> None:
+        """
+        Records the arguments.
+        """
+        self.commands.append(args)
+
+    def request_data_stream_send(self, *args: int) -> None:
+        """
+        Records the arguments.
+        """
+        self.data_streams.append(args)
+
+    def recv_match(
+        self, blocking: bool = False, timeout: "float | None" = None
+    ) -> "mavutil.mavlink.MAVLink_message | None":
+        """
+        Returns the next prepared message, waits out the timeout once there are none.
+        """
+        if len(self.messages) == 0:
+            if blocking and timeout is not None:
+                time.sleep(timeout)
+
+            return None
+
+        return self.messages.pop(0)
+
+
+def received(message: "mavutil.mavlink.MAVLink_message") -> "mavutil.mavlink.MAVLink_message":
+    """
+    Packs and decodes the message like the connection would, which sets its source system.
+    """
+    return mavutil.mavlink.MAVLink(None).decode(bytearray(message.pack(ENCODER)))
+
+
+def create_ack(result: int) -> "mavutil.mavlink.MAVLink_command_ack_message":
+    """
+    Acknowledgement of a message interval request.
+    """
+    return received(
+        ENCODER.command_ack_encode(mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL, result)
+    )
+
+
+class TestStreamRates:
+    """
+    Requests fall back to data streams, rates are measured from arrivals.
+    """
+
+    def test_request(self) -> None:
+        """
+        Each message is requested at its interval, 0 stops it.
+        """
+        # Setup
+        connection = ScriptedConnection([])
+        rates = stream_rates.StreamRates(
+            connection, {"LOCAL_POSITION_NED": 10, "ATTITUDE": 0}  # type: ignore
+        )
+
+        # Run
+        rates.request_all()
+
+        # Test
+        assert [command[2] for command in connection.commands] == [
+            mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL
+        ] * 2
+        assert connection.commands[0][4] == mavutil.mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED
+        assert connection.commands[0][5] == 100_000
+        assert connection.commands[1][4] == mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE
+        assert connection.commands[1][5] == -1
+
+    def test_acknowledgement(self) -> None:
+        """
+        Accepted requests are done, rejected ones fall back to data streams.
+        """
+        # Setup
+        connection = ScriptedConnection([])
+        rates = stream_rates.StreamRates(
+            connection, {"LOCAL_POSITION_NED": 10, "ATTITUDE": 4.4}  # type: ignore
+        )
+        rates.request_all()
+
+        # Run
+        accepted = rates.process_ack(create_ack(mavutil.mavlink.MAV_RESULT_ACCEPTED))
+        rejected = rates.process_ack(create_ack(mavutil.mavlink.MAV_RESULT_UNSUPPORTED))
+        extra = rates.process_ack(create_ack(mavutil.mavlink.MAV_RESULT_ACCEPTED))
+
+        # Test
+        assert accepted
+        assert rejected
+        assert not extra
+        assert rates.methods == {"LOCAL_POSITION_NED": "interval", "ATTITUDE": "data stream"}
+        assert connection.data_streams == [(1, 0, mavutil.mavlink.MAV_DATA_STREAM_EXTRA1, 4, 1)]
+
+    def test_replay(self) -> None:
+        """
+        Rates are requested again the way they were set, without waiting for acknowledgement.
+        """
+        # Setup
+        connection = ScriptedConnection([])
+        rates = stream_rates.StreamRates(
+            connection, {"LOCAL_POSITION_NED": 10, "ATTITUDE": 4}  # type: ignore
+        )
+        rates.request_all()
+        rates.process_ack(create_ack(mavutil.mavlink.MAV_RESULT_ACCEPTED))
+        rates.process_ack(create_ack(mavutil.mavlink.MAV_RESULT_UNSUPPORTED))
+
+        # Run
+        rates.replay()
+
+        # Test
+        assert len(connection.commands) == 3
+        assert connection.commands[2][4] == mavutil.mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED
+        assert len(connection.data_streams) == 2
+        assert not rates.process_ack(create_ack(mavutil.mavlink.MAV_RESULT_ACCEPTED))
+
+    def test_negotiate(self) -> None:
+        """
+        Unanswered requests fall back to data streams, arrivals are measured.
+        """
+        # Setup
+        attitude = received(ENCODER.attitude_encode(0, 0, 0, 0, 0, 0, 0))
+        connection = ScriptedConnection(
+            [create_ack(mavutil.mavlink.MAV_RESULT_ACCEPTED), attitude, attitude]
+        )
+        rates = stream_rates.StreamRates(
+            connection, {"ATTITUDE": 5, "LOCAL_POSITION_NED": 5}  # type: ignore
+        )
+
+        # Run
+        achieved = rates.negotiate(0.05)
+
+        # Test
+        assert rates.methods == {"ATTITUDE": "interval", "LOCAL_POSITION_NED": "data stream"}
+        assert achieved["ATTITUDE"] > 0
+        assert achieved["LOCAL_POSITION_NED"] == 0
+        assert "LOCAL_POSITION_NED" in rates.mismatches()
+
+    def test_negotiate_all(self) -> None:
+        """
+        Each vehicle gets its own acknowledgements and arrivals.
+        """
+        # Setup
+        second_encoder = mavutil.mavlink.MAVLink(None, 2, 0)
+        second_ack = mavutil.mavlink.MAVLink(None).decode(
+            bytearray(
+                second_encoder.command_ack_encode(
+                    mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL,
+                    mavutil.mavlink.MAV_RESULT_ACCEPTED,
+                ).pack(second_encoder)
+            )
+        )
+        attitude = received(ENCODER.attitude_encode(0, 0, 0, 0, 0, 0, 0))
+        connection = ScriptedConnection([second_ack, attitude, attitude])
+        first = stream_rates.StreamRates(connection, {"ATTITUDE": 5})  # type: ignore
+        second = stream_rates.StreamRates(connection, {"ATTITUDE": 5}, 2)  # type: ignore
+
+        # Run
+        stream_rates.StreamRates.negotiate_all([first, second], 0.05)
+
+        # Test
+        assert first.methods == {"ATTITUDE": "data stream"}
+        assert second.methods == {"ATTITUDE": "interval"}
+        assert first.achieved_rates()["ATTITUDE"] > 0
+        assert second.achieved_rates()["ATTITUDE"] == 0
+
+    def test_runtime_timeout(self) -> None:
+        """
+        Rate changes not acknowledged within the timeout fall back to data streams.
+        """
+        # Setup
+        connection = ScriptedConnection([])
+        rates = stream_rates.StreamRates(
+            connection, {"ATTITUDE": 5}, ack_timeout=0.05  # type: ignore
+        )
+        rates.set_rate("ATTITUDE", 10)
+
+        # Run
+        early = rates.fall_back_expired()
+        time.sleep(0.06)
+        late = rates.fall_back_expired()
+
+        # Test
+        assert early == 0
+        assert late == 1
+        assert rates.pending_count() == 0
+        assert rates.methods == {"ATTITUDE": "data stream"}
+        assert connection.data_streams[0][3] == 10
+
+    def test_measure(self) -> None:
+        """
+        Rate is the inverse of the mean arrival interval.
+        """
+        # Setup
+        connection = ScriptedConnection([])
+        rates = stream_rates.StreamRates(connection, {"ATTITUDE": 20})  # type: ignore
+        attitude = received(ENCODER.attitude_encode(0, 0, 0, 0, 0, 0, 0))
+        heartbeat = received(ENCODER.heartbeat_encode(2, 3, 0, 0, 0))
+
+        # Run
+        for _ in range(5):
+            rates.record(attitude)
+            rates.record(heartbeat)
+            time.sleep(0.05)
+
+        achieved = rates.achieved_rates()
+
+        # Test
+        assert list(achieved) == ["ATTITUDE"]
+        assert 10 < achieved["ATTITUDE"] <= 20
+        assert "ATTITUDE" in rates.summary()
+
+    def test_invalid(self) -> None:
+        """
+        Unknown message types and negative rates are rejected.
+        """
+        # Setup
+        connection = ScriptedConnection([])
+
+        # Test
+        with pytest.raises(ValueError):
+            stream_rates.StreamRates(connection, {"NOT_A_MESSAGE": 1})  # type: ignore
+
+        with pytest.raises(ValueError):
+            stream_rates.StreamRates(connection, {"ATTITUDE": -1})  # type: ignore
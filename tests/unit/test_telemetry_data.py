@@ -0,0 +1,58 @@
+"""
+Test the telemetry binary layout.
+"""
+
+import math
+
+from modules.telemetry import telemetry
+
+
+class TestWireFormat:
+    """
+    `to_bytes()` and `from_bytes()` round trip.
+    """
+
+    def test_round_trip(self) -> None:
+        """
+        Every field survives.
+        """
+        # Setup
+        expected = telemetry.TelemetryData(
+            123456, 1.0, 2.0, -30.0, 0.5, 0.25, -0.1, 0.01, -0.02, 1.57, 0.001, 0.002, 0.003
+        )
+
+        # Run
+        actual = telemetry.TelemetryData.from_bytes(expected.to_bytes())
+
+        # Test
+        assert actual.time_since_boot == expected.time_since_boot
+        for name in telemetry.TelemetryData.__slots__[1:]:
+            assert math.isclose(getattr(actual, name), getattr(expected, name))
+
+    def test_missing_fields(self) -> None:
+        """
+        Fields that were never set stay None.
+        """
+        # Setup
+        expected = telemetry.TelemetryData(x=0, y=0, z=29, yaw=0)
+
+        # Run
+        actual = telemetry.TelemetryData.from_bytes(expected.to_bytes())
+
+        # Test
+        assert actual.time_since_boot is None
+        assert actual.roll is None
+        assert actual.x == 0
+        assert actual.z == 29
+        assert actual.yaw == 0
+
+    def test_fixed_size(self) -> None:
+        """
+        Layout does not depend on the values.
+        """
+        # Setup
+        full = telemetry.TelemetryData(*range(13))
+        empty = telemetry.TelemetryData()
+
+        # Test
+        assert len(full.to_bytes()) == len(empty.to_bytes())
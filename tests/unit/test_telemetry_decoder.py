@@ -0,0 +1,192 @@
+"""
+Test decoding telemetry frames without pymavlink.
+"""
+
+import math
+import struct
+
+from pymavlink import mavutil
+from pymavlink.dialects.v20 import common as mavlink_v2
+
+from modules.telemetry import telemetry
+
+
+def truncate(frame: bytes, crc_extra: int) -> bytes:
+    """
+    Strips trailing zero payload bytes like other MAVLink 2 implementations do,
+    pymavlink does not.
+    """
+    header = bytearray(frame[:10])
+    payload = frame[10 : 10 + frame[1]].rstrip(b"\x00")
+    header[1] = len(payload)
+
+    crc = mavlink_v2.x25crc(header[1:] + payload)
+    crc.accumulate(bytes([crc_extra]))
+    return bytes(header) + payload + struct.pack("<H", crc.crc)
+
+
+def assert_fields_close(
+    actual: telemetry.TelemetryData, expected: "dict[str, float]", names: "list[str]"
+) -> None:
+    """
+    Float32 on the wire, so compare with a tolerance.
+    """
+    for name in names:
+        assert math.isclose(getattr(actual, name), expected[name], rel_tol=1e-6), name
+
+
+class TestTelemetryDecoder:
+    """
+    Position and attitude are decoded, other messages are left to pymavlink.
+    """
+
+    def test_position(self) -> None:
+        """
+        Every field matches pymavlink.
+        """
+        # Setup
+        encoder = mavlink_v2.MAVLink(None, 1, 1)
+        frame = encoder.local_position_ned_encode(1234, 1.5, -2.5, -30.0, 0.1, 0.2, -0.3).pack(
+            encoder
+        )
+        expected = mavlink_v2.MAVLink(None).decode(bytearray(frame))
+        record = telemetry.TelemetryData()
+
+        # Run
+        message_id = telemetry.TelemetryDecoder().decode_into(frame, record)
+
+        # Test
+        assert frame[0] == 0xFD
+        assert message_id == telemetry.TelemetryDecoder.POSITION_ID
+        assert record.time_since_boot == expected.time_boot_ms
+        assert record.x == expected.x
+        assert record.y == expected.y
+        assert record.z == expected.z
+        assert record.x_velocity == expected.vx
+        assert record.y_velocity == expected.vy
+        assert record.z_velocity == expected.vz
+        assert record.roll is None
+
+    def test_attitude_truncated(self) -> None:
+        """
+        Trailing zero fields dropped by MAVLink 2 decode as 0 .
+        """
+        # Setup
+        encoder = mavlink_v2.MAVLink(None, 1, 1)
+        message = encoder.attitude_encode(99, 0.1, -0.2, 1.5, 0.0, 0.0, 0.0)
+        frame = truncate(message.pack(encoder), message.crc_extra)
+        expected = mavlink_v2.MAVLink(None).decode(bytearray(frame))
+        record = telemetry.TelemetryData()
+
+        # Run
+        message_id = telemetry.TelemetryDecoder().decode_into(memoryview(frame), record)
+
+        # Test
+        assert frame[1] < 28
+        assert message_id == telemetry.TelemetryDecoder.ATTITUDE_ID
+        assert record.time_since_boot == 99
+        assert_fields_close(
+            record, {"roll": 0.1, "pitch": -0.2, "yaw": 1.5}, ["roll", "pitch", "yaw"]
+        )
+        assert record.roll_speed == expected.rollspeed == 0
+        assert record.pitch_speed == expected.pitchspeed == 0
+        assert record.yaw_speed == expected.yawspeed == 0
+        assert record.x is None
+
+    def test_mavlink_1(self) -> None:
+        """
+        MAVLink 1 frames have a shorter header.
+        """
+        # Setup
+        encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+        frame = encoder.attitude_encode(7, 0.5, 0.25, -1.0, 0.01, 0.02, 0.03).pack(encoder)
+        record = telemetry.TelemetryData()
+
+        # Run
+        message_id = telemetry.TelemetryDecoder().decode_into(frame, record)
+
+        # Test
+        assert frame[0] == 0xFE
+        assert message_id == telemetry.TelemetryDecoder.ATTITUDE_ID
+        assert record.time_since_boot == 7
+        assert_fields_close(
+            record,
+            {
+                "roll": 0.5,
+                "pitch": 0.25,
+                "yaw": -1.0,
+                "roll_speed": 0.01,
+                "pitch_speed": 0.02,
+                "yaw_speed": 0.03,
+            },
+            ["roll", "pitch", "yaw", "roll_speed", "pitch_speed", "yaw_speed"],
+        )
+
+    def test_other_message(self) -> None:
+        """
+        Other messages are not decoded and leave the record unchanged.
+        """
+        # Setup
+        encoder = mavlink_v2.MAVLink(None, 1, 1)
+        frame = encoder.heartbeat_encode(2, 3, 0, 0, 0).pack(encoder)
+        record = telemetry.TelemetryData()
+
+        # Run
+        message_id = telemetry.TelemetryDecoder().decode_into(frame, record)
+
+        # Test
+        assert message_id is None
+        assert record.time_since_boot is None
+
+
+class TestTelemetryFrames:
+    """
+    Telemetry combines decoded frames like messages.
+    """
+
+    def test_combine(self) -> None:
+        """
+        Nothing until both types arrive, then the newest values with the latest time.
+        """
+        # Setup
+        encoder = mavlink_v2.MAVLink(None, 1, 1)
+        position = encoder.local_position_ned_encode(200, 1.0, 2.0, -30.0, 0, 0, 0).pack(encoder)
+        attitude = encoder.attitude_encode(100, 0, 0, 1.5, 0, 0, 0).pack(encoder)
+        connection = mavutil.mavlink.MAVLink(None)
+        connection.mav = connection
+        result, telemetry_logic = telemetry.Telemetry.create(connection, None, None)  # type: ignore
+        assert result
+        assert telemetry_logic is not None
+
+        # Run
+        first = telemetry_logic.process_frame(position)
+        second = telemetry_logic.process_frame(attitude)
+
+        # Test
+        assert first is None
+        assert second is not None
+        assert second.time_since_boot == 200
+        assert second.x == 1.0
+        assert second.z == -30.0
+        assert math.isclose(second.yaw, 1.5, rel_tol=1e-6)
+
+    def test_fallback(self) -> None:
+        """
+        Frames pymavlink has to decode are combined the same way.
+        """
+        # Setup
+        encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+        heartbeat = encoder.heartbeat_encode(2, 3, 0, 0, 0).pack(encoder)
+        connection = mavutil.mavlink.MAVLink(None)
+        connection.mav = connection
+        result, telemetry_logic = telemetry.Telemetry.create(connection, None, None)  # type: ignore
+        assert result
+        assert telemetry_logic is not None
+
+        # Run
+        telemetry_data = telemetry_logic.process_frame(heartbeat)
+
+        # Test
+        assert telemetry_data is None
+        assert telemetry_logic.position_time is None
+        assert telemetry_logic.attitude_time is None
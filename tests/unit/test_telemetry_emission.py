@@ -0,0 +1,155 @@
+"""
+Test when pairings of the newest position and attitude are output.
+"""
+
+import types
+
+import pytest
+from pymavlink import mavutil
+
+from modules.telemetry import telemetry
+
+ENCODER = mavutil.mavlink.MAVLink(None, 1, 0)
+
+
+def position(time_since_boot: int, x: float = 1.0) -> bytes:
+    """
+    Position frame at the time.
+    """
+    return ENCODER.local_position_ned_encode(time_since_boot, x, 2.0, 3.0, 0.0, 0.0, 0.0).pack(
+        ENCODER
+    )
+
+
+def attitude(time_since_boot: int) -> bytes:
+    """
+    Attitude frame at the time.
+    """
+    return ENCODER.attitude_encode(time_since_boot, 0.1, 0.2, 0.3, 0.0, 0.0, 0.0).pack(ENCODER)
+
+
+# Position twice as often as attitude
+FRAMES = [
+    position(0),
+    attitude(0),
+    position(50),
+    position(100),
+    attitude(100),
+    position(150),
+    position(200),
+    attitude(200),
+]
+
+
+def emitted_times(
+    emission_policy: telemetry.EmissionPolicy, emission_period: int = 0
+) -> "tuple[list[int], telemetry.Telemetry]":
+    """
+    Times of the outputs over the frames.
+    """
+    _, telemetry_logic = telemetry.Telemetry.create(
+        ENCODER, None, None, None, emission_policy, emission_period  # type: ignore
+    )
+    assert telemetry_logic is not None
+
+    times = []
+    for frame in FRAMES:
+        telemetry_data = telemetry_logic.process_frame(frame)
+        if telemetry_data is not None:
+            times.append(telemetry_data.time_since_boot)
+
+    return times, telemetry_logic
+
+
+class TestTelemetryEmission:
+    """
+    Each policy outputs a subset of what every message would.
+    """
+
+    def test_on_any(self) -> None:
+        """
+        Every message after the first of each type is output.
+        """
+        # Run
+        times, telemetry_logic = emitted_times(telemetry.EmissionPolicy.ON_ANY)
+
+        # Test
+        assert times == [0, 50, 100, 100, 150, 200, 200]
+        assert telemetry_logic.emitted_count == 7
+        assert telemetry_logic.suppressed_count == 0
+
+    @pytest.mark.parametrize(
+        "emission_policy,expected",
+        [
+            (telemetry.EmissionPolicy.ON_POSITION, [50, 100, 150, 200]),
+            (telemetry.EmissionPolicy.ON_ATTITUDE, [0, 100, 200]),
+            (telemetry.EmissionPolicy.ON_BOTH_UPDATED, [0, 100, 200]),
+        ],
+    )
+    def test_on_message(
+        self, emission_policy: telemetry.EmissionPolicy, expected: "list[int]"
+    ) -> None:
+        """
+        Pairings are output on the chosen messages, the rest are counted as avoided.
+        """
+        # Run
+        times, telemetry_logic = emitted_times(emission_policy)
+
+        # Test
+        assert times == expected
+        assert telemetry_logic.emitted_count == len(expected)
+        assert telemetry_logic.suppressed_count == 7 - len(expected)
+
+    def test_fixed_rate(self) -> None:
+        """
+        At most one pairing per period of drone time.
+        """
+        # Run
+        times, telemetry_logic = emitted_times(telemetry.EmissionPolicy.FIXED_RATE, 80)
+
+        # Test
+        assert times == [0, 100, 200]
+        assert telemetry_logic.suppressed_count == 4
+
+    def test_run_batch(self) -> None:
+        """
+        Messages suppressed later in the same wakeup do not change the pairing output.
+        """
+        # Setup
+        frames = [position(100, 1.0), attitude(110), position(200, 2.0)]
+        connection = types.SimpleNamespace(
+            mav=ENCODER,
+            recv_frame=lambda blocking, timeout=None: frames.pop(0) if len(frames) > 0 else None,
+        )
+        _, telemetry_logic = telemetry.Telemetry.create(
+            connection, None, None, None, telemetry.EmissionPolicy.ON_BOTH_UPDATED  # type: ignore
+        )
+        assert telemetry_logic is not None
+
+        # Run
+        telemetry_data = telemetry_logic.run(None)  # type: ignore
+
+        # Test
+        assert telemetry_data is not None
+        assert telemetry_data.time_since_boot == 110
+        assert telemetry_data.x == 1.0
+        assert telemetry_logic.emitted_count == 1
+        assert telemetry_logic.suppressed_count == 1
+
+    def test_invalid(self) -> None:
+        """
+        Fixed rate needs a period.
+        """
+        # Setup
+        errors = []
+        local_logger = types.SimpleNamespace(error=lambda message, _: errors.append(message))
+
+        # Run
+        result, telemetry_logic = telemetry.Telemetry.create(
+            ENCODER, None, local_logger, None, telemetry.EmissionPolicy.FIXED_RATE  # type: ignore
+        )
+
+        # Test
+        assert not result
+        assert len(errors) == 1
+        assert telemetry_logic is None
@@ -0,0 +1,150 @@
+"""
+Test aligning position and attitude in time.
+"""
+
+import math
+
+import pytest
+from pymavlink import mavutil
+
+from modules.telemetry import telemetry
+
+STILL = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+def position(x: float) -> "tuple[float, ...]":
+    """
+    Position fields moving along x only.
+    """
+    return (x, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+def attitude(yaw: float) -> "tuple[float, ...]":
+    """
+    Attitude fields turning around yaw only.
+    """
+    return (0.0, 0.0, yaw, 0.0, 0.0, 0.0)
+
+
+class TestTelemetryFusion:
+    """
+    Both streams are interpolated to the output times.
+    """
+
+    def test_position_clock(self) -> None:
+        """
+        Attitude is interpolated to each position once it has passed it.
+        """
+        # Setup
+        fusion = telemetry.TelemetryFusion()
+        fusion.add_attitude(0, attitude(0.0))
+        fusion.add_position(50, position(5.0))
+
+        # Run
+        early = fusion.poll()
+        fusion.add_attitude(100, attitude(0.2))
+        fused = fusion.poll()
+
+        # Test
+        assert early is None
+        assert fused is not None
+        assert fused.time_since_boot == 50
+        assert fused.x == 5.0
+        assert math.isclose(fused.yaw, 0.1)
+        # Nothing new
+        assert fusion.poll() is None
+
+    def test_fixed_clock(self) -> None:
+        """
+        Outputs follow the period whatever the message times, only the newest is returned.
+        """
+        # Setup
+        fusion = telemetry.TelemetryFusion(output_period=40)
+        for time_since_boot in [10, 45, 80, 115]:
+            fusion.add_position(time_since_boot, position(time_since_boot / 10))
+
+        for time_since_boot in [0, 60, 120]:
+            fusion.add_attitude(time_since_boot, STILL)
+
+        # Run
+        fused = fusion.poll()
+
+        # Test
+        # Outputs at 40 and 80, 120 has not been reached by position yet
+        assert fused is not None
+        assert fusion.output_count == 2
+        assert fused.time_since_boot == 80
+        assert math.isclose(fused.x, 8.0)
+
+    def test_shorter_arc(self) -> None:
+        """
+        Yaw is interpolated across +-pi instead of the long way around.
+        """
+        # Setup
+        fusion = telemetry.TelemetryFusion()
+        fusion.add_attitude(0, attitude(3.1))
+        fusion.add_attitude(100, attitude(-3.1))
+        fusion.add_position(50, STILL)
+
+        # Run
+        fused = fusion.poll()
+
+        # Test
+        assert fused is not None
+        assert math.isclose(abs(fused.yaw), math.pi, abs_tol=1e-9)
+
+    def test_reboot(self) -> None:
+        """
+        History starts over when the drone clock goes back.
+        """
+        # Setup
+        fusion = telemetry.TelemetryFusion()
+        fusion.add_attitude(1000, attitude(1.0))
+        fusion.add_position(1500, STILL)
+
+        # Run
+        fusion.add_attitude(0, attitude(0.0))
+        fusion.add_position(10, STILL)
+        fusion.add_attitude(20, attitude(0.0))
+        fused = fusion.poll()
+
+        # Test
+        assert fused is not None
+        assert fused.time_since_boot == 10
+        assert fused.yaw == 0.0
+
+    def test_telemetry(self) -> None:
+        """
+        Telemetry with a fusion period outputs aligned samples.
+        """
+        # Setup
+        encoder = mavutil.mavlink.MAVLink(None, 1, 0)
+        frames = [
+            encoder.attitude_encode(0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0).pack(encoder),
+            encoder.local_position_ned_encode(50, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0).pack(encoder),
+            encoder.attitude_encode(100, 0.0, 0.0, 0.5, 0.0, 0.0, 0.0).pack(encoder),
+        ]
+        _, telemetry_logic = telemetry.Telemetry.create(
+            encoder, None, None, fusion_period=0  # type: ignore
+        )
+        assert telemetry_logic is not None
+
+        # Run
+        outputs = [telemetry_logic.process_frame(frame) for frame in frames]
+
+        # Test
+        assert outputs[:2] == [None, None]
+        assert outputs[2] is not None
+        assert outputs[2].time_since_boot == 50
+        assert math.isclose(outputs[2].yaw, 0.25, rel_tol=1e-6)
+
+    def test_invalid(self) -> None:
+        """
+        Negative periods and histories too short to interpolate are rejected.
+        """
+        # Test
+        with pytest.raises(ValueError):
+            telemetry.TelemetryFusion(output_period=-1)
+
+        with pytest.raises(ValueError):
+            telemetry.TelemetryFusion(history_size=1)
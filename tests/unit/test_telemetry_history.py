@@ -0,0 +1,114 @@
+"""
+Test the columnar telemetry history.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from modules.telemetry import telemetry
+from modules.telemetry import telemetry_history
+
+
+def sample(time_since_boot: int) -> telemetry.TelemetryData:
+    """
+    Telemetry moving along x at 1 m/s.
+    """
+    return telemetry.TelemetryData(
+        time_since_boot, time_since_boot / 1000, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0
+    )
+
+
+class TestTelemetryHistory:
+    """
+    Samples are kept in order up to the capacity and queried as views.
+    """
+
+    def test_wrap(self) -> None:
+        """
+        The newest samples stay contiguous after the buffer wraps.
+        """
+        # Setup
+        history = telemetry_history.TelemetryHistory(4)
+
+        # Run
+        for time_since_boot in range(0, 700, 100):
+            history.append(sample(time_since_boot))
+
+        columns = history.last(10)
+
+        # Test
+        assert len(history) == 4
+        assert columns["time_since_boot"].tolist() == [300, 400, 500, 600]
+        assert np.allclose(columns["x"], [0.3, 0.4, 0.5, 0.6])
+        # Fields not given are missing
+        assert np.isnan(columns["roll_speed"]).all()
+
+    def test_window(self) -> None:
+        """
+        Windows end at the newest sample, the boundary sample is included.
+        """
+        # Setup
+        history = telemetry_history.TelemetryHistory(8)
+        for time_since_boot in range(0, 1100, 100):
+            history.append(sample(time_since_boot))
+
+        # Run
+        columns = history.window(300)
+        everything = history.window(10000)
+
+        # Test
+        assert columns["time_since_boot"].tolist() == [700, 800, 900, 1000]
+        assert math.isclose(float(columns["x_velocity"].mean()), 1.0)
+        assert len(everything["x"]) == 8
+
+    def test_views(self) -> None:
+        """
+        Queries share memory with the history and can not be written.
+        """
+        # Setup
+        history = telemetry_history.TelemetryHistory(4)
+        for time_since_boot in range(0, 500, 100):
+            history.append(sample(time_since_boot))
+
+        # Run
+        columns = history.last(4)
+
+        # Test
+        assert columns["x"].base is not None
+        assert not columns["x"].flags.writeable
+        with pytest.raises(ValueError):
+            columns["x"][0] = 1.0
+
+    def test_reboot(self) -> None:
+        """
+        History starts over when the drone clock goes back.
+        """
+        # Setup
+        history = telemetry_history.TelemetryHistory(4)
+        history.append(sample(5000))
+        history.append(sample(6000))
+
+        # Run
+        history.append(sample(10))
+
+        # Test
+        assert len(history) == 1
+        assert history.window(10000)["time_since_boot"].tolist() == [10]
+
+    def test_empty(self) -> None:
+        """
+        Queries of an empty history are empty, invalid arguments are rejected.
+        """
+        # Setup
+        history = telemetry_history.TelemetryHistory(4)
+
+        # Test
+        assert len(history.window(1000)["x"]) == 0
+        assert len(history.last(2)["x"]) == 0
+        with pytest.raises(ValueError):
+            telemetry_history.TelemetryHistory(0)
+
+        with pytest.raises(ValueError):
+            history.append(telemetry.TelemetryData())
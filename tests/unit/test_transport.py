@@ -0,0 +1,89 @@
+"""
+Test connection strings, socket buffers and kernel drop counts.
+"""
+
+import socket
+import time
+
+import pytest
+from pymavlink import mavutil
+
+from modules.mavlink_router import transport
+
+
+def free_udp_port() -> int:
+    """
+    Port nothing listens on right now.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class TestTransport:
+    """
+    UDP links are set up from the same connection string as TCP ones.
+    """
+
+    def test_connection_string(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Environment overrides the default, the peer listens where the GCS connects.
+        """
+        # Setup
+        monkeypatch.delenv(transport.CONNECTION_STRING_VARIABLE, raising=False)
+        default = transport.connection_string()
+        monkeypatch.setenv(transport.CONNECTION_STRING_VARIABLE, "udpout:localhost:14550")
+
+        # Test
+        assert default == transport.DEFAULT_CONNECTION_STRING
+        assert transport.connection_string() == "udpout:localhost:14550"
+        assert transport.peer_connection_string("udpout:localhost:14550") == "udpin:localhost:14550"
+        assert transport.peer_connection_string("tcp:localhost:12345") == "tcpin:localhost:12345"
+        with pytest.raises(ValueError):
+            transport.peer_connection_string("/dev/ttyACM0")
+
+    def test_udp_link(self) -> None:
+        """
+        The listening drone hears the announcement, overflowing its buffer counts as drops.
+        """
+        # Setup
+        port = free_udp_port()
+        drone = mavutil.mavlink_connection(f"udpin:127.0.0.1:{port}", source_system=1)
+        gcs = mavutil.mavlink_connection(f"udpout:127.0.0.1:{port}")
+        sizes = transport.set_socket_buffers(drone, 4096, 0)
+
+        # Run
+        transport.announce(gcs)
+        announcement = drone.recv_match(type="HEARTBEAT", blocking=True, timeout=1)
+
+        for _ in range(1000):
+            gcs.mav.heartbeat_send(
+                mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0
+            )
+
+        time.sleep(0.05)
+        drops = transport.kernel_drop_count(drone)
+
+        # Test
+        assert announcement is not None
+        assert sizes is not None
+        # Linux doubles the size requested for bookkeeping
+        assert 4096 <= sizes[0] < 65536
+        assert transport.is_datagram(drone)
+        if drops is not None:
+            assert drops > 0
+
+        drone.close()
+        gcs.close()
+
+    def test_not_socket(self) -> None:
+        """
+        Connections without a socket are left alone.
+        """
+        # Setup
+        connection = object()
+
+        # Test
+        assert transport.set_socket_buffers(connection, 4096, 4096) is None  # type: ignore
+        assert transport.kernel_drop_count(connection) is None  # type: ignore
+        assert not transport.is_datagram(connection)  # type: ignore
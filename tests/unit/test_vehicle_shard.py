@@ -0,0 +1,181 @@
+"""
+Test running the pipelines of several vehicles in one shard.
+"""
+
+import pytest
+from pymavlink import mavutil
+
+from modules.command import command
+from modules.mavlink_router import routed_connection
+from modules.vehicle import vehicle_shard
+from utilities.workers import queue_proxy_wrapper
+
+QUEUE_SIZE = 16
+
+# Test functions use test fixture signature names
+# No enable
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture()
+def outbound_queue() -> queue_proxy_wrapper.QueueProxyWrapper:  # type: ignore
+    """
+    Shared memory queue, no manager required.
+    """
+    wrapper = queue_proxy_wrapper.QueueProxyWrapper(
+        None, QUEUE_SIZE, queue_proxy_wrapper.QueueBackend.SHARED_MEMORY  # type: ignore
+    )
+    yield wrapper  # type: ignore
+    wrapper.release()
+
+
+def telemetry_frames(system_id: int, z: float) -> "list[bytes]":
+    """
+    Position and attitude frames sent by a vehicle.
+    """
+    encoder = mavutil.mavlink.MAVLink(None, system_id, 1)
+    return [
+        encoder.local_position_ned_encode(1000, 0.0, 0.0, z, 0.0, 0.0, 0.0).pack(encoder),
+        encoder.attitude_encode(1000, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0).pack(encoder),
+    ]
+
+
+def sent_commands(
+    outbound_queue: queue_proxy_wrapper.QueueProxyWrapper,
+) -> "list[mavutil.mavlink.MAVLink_command_long_message]":
+    """
+    Decodes every command the shard sent.
+    """
+    decoder = mavutil.mavlink.MAVLink(None)
+    return [decoder.decode(bytearray(frame)) for _, frame in outbound_queue.get_many(0)]
+
+
+class TestVehicleShard:
+    """
+    Frames are demultiplexed by system ID, each vehicle is commanded separately.
+    """
+
+    def test_shard_vehicles(self) -> None:
+        """
+        Vehicles are split evenly, without empty shards.
+        """
+        # Test
+        assert vehicle_shard.shard_vehicles([1, 2, 3, 4, 5], 2) == [[1, 3, 5], [2, 4]]
+        assert vehicle_shard.shard_vehicles([1, 2], 4) == [[1], [2]]
+        with pytest.raises(ValueError):
+            vehicle_shard.shard_vehicles([1], 0)
+
+    def test_demultiplex(self, outbound_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Each vehicle is commanded from its own telemetry, unknown vehicles are counted.
+        """
+        # Setup
+        connection = routed_connection.RoutedConnection(None, outbound_queue)
+        result, shard = vehicle_shard.VehicleShard.create(
+            connection,
+            {1: command.Position(10, 20, 30), 2: command.Position(10, 20, -5)},
+            None,  # type: ignore
+        )
+        assert result
+        assert shard is not None
+
+        # Run
+        for frame in telemetry_frames(1, 0.0) + telemetry_frames(2, 0.0) + telemetry_frames(3, 0.0):
+            shard.process_frame(frame)
+
+        results = shard.decide()
+        commands = sent_commands(outbound_queue)
+
+        # Test
+        assert results == ["Vehicle 1: CHANGE_ALTITUDE: 1", "Vehicle 2: CHANGE_ALTITUDE: -1"]
+        assert [(msg.target_system, msg.param7) for msg in commands] == [(1, 30), (2, -5)]
+        assert shard.unknown_count == 2
+        # Nothing new to decide on
+        assert len(shard.decide()) == 0
+
+    def test_history(self, outbound_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Every telemetry output is kept, not only the newest decided on.
+        """
+        # Setup
+        connection = routed_connection.RoutedConnection(None, outbound_queue)
+        _, shard = vehicle_shard.VehicleShard.create(
+            connection, {1: command.Position(10, 20, 30)}, None, history_capacity=4  # type: ignore
+        )
+        assert shard is not None
+
+        # Run
+        for frame in telemetry_frames(1, 5.0) + telemetry_frames(1, 6.0):
+            shard.process_frame(frame)
+
+        history = shard.vehicles[1].history
+
+        # Test
+        assert history is not None
+        assert history.last(4)["z"].tolist() == [5.0, 6.0, 6.0]
+
+    def test_set_rate(self, outbound_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Acknowledgements of runtime rate changes go to the vehicle's rates, not its commands.
+        """
+        # Setup
+        connection = routed_connection.RoutedConnection(None, outbound_queue)
+        _, shard = vehicle_shard.VehicleShard.create(
+            connection,
+            {1: command.Position(10, 20, 30)},
+            None,  # type: ignore
+            ack_timeout=10,
+            target_rates={"ATTITUDE": 5},
+        )
+        assert shard is not None
+        shard.set_rate(1, "ATTITUDE", 10)
+
+        encoder = mavutil.mavlink.MAVLink(None, 1, 1)
+        ack = encoder.command_ack_encode(
+            mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL, mavutil.mavlink.MAV_RESULT_DENIED
+        ).pack(encoder)
+
+        # Run
+        shard.process_frame(ack)
+        requests = [msg.get_type() for msg in sent_commands(outbound_queue)]
+
+        # Test
+        rates = shard.vehicles[1].rates
+        assert rates is not None
+        assert rates.pending_count() == 0
+        assert rates.methods == {"ATTITUDE": "data stream"}
+        assert requests == ["COMMAND_LONG", "REQUEST_DATA_STREAM"]
+        assert shard.vehicles[1].command.command_manager.ignored_ack_count == 0
+        with pytest.raises(ValueError):
+            shard.set_rate(2, "ATTITUDE", 10)
+
+    def test_acknowledgement(self, outbound_queue: queue_proxy_wrapper.QueueProxyWrapper) -> None:
+        """
+        Acknowledgements complete the command of the vehicle that sent them.
+        """
+        # Setup
+        connection = routed_connection.RoutedConnection(None, outbound_queue)
+        _, shard = vehicle_shard.VehicleShard.create(
+            connection,
+            {1: command.Position(10, 20, 30), 2: command.Position(10, 20, 30)},
+            None,  # type: ignore
+            ack_timeout=10,
+        )
+        assert shard is not None
+        for frame in telemetry_frames(1, 0.0) + telemetry_frames(2, 0.0):
+            shard.process_frame(frame)
+
+        shard.decide()
+
+        encoder = mavutil.mavlink.MAVLink(None, 2, 1)
+        ack = encoder.command_ack_encode(
+            mavutil.mavlink.MAV_CMD_CONDITION_CHANGE_ALT, mavutil.mavlink.MAV_RESULT_ACCEPTED
+        ).pack(encoder)
+
+        # Run
+        shard.process_frame(ack)
+
+        # Test
+        assert shard.vehicles[1].command.command_manager.in_flight_count() == 1
+        assert shard.vehicles[2].command.command_manager.in_flight_count() == 0
+        assert shard.vehicles[2].command.command_manager.acknowledged_count == 1
@@ -0,0 +1,157 @@
+"""
+Test the worker controller flags.
+"""
+
+import multiprocessing as mp
+import socket
+import threading
+import time
+
+from utilities.workers import worker_controller
+
+
+def pause_then_count(
+    controller: worker_controller.WorkerController, output_queue: mp.Queue
+) -> None:
+    """
+    Reports the time spent in `check_pause()`.
+    """
+    start = time.monotonic()
+    controller.check_pause()
+    output_queue.put(time.monotonic() - start)
+
+
+class TestWorkerController:
+    """
+    Exit and pause requests seen from a worker process.
+    """
+
+    def test_exit(self) -> None:
+        """
+        Exit request is visible and can be cleared.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+
+        # Run
+        before = controller.is_exit_requested()
+        controller.request_exit()
+        requested = controller.is_exit_requested()
+        waited = controller.wait_for_exit(0.0)
+        controller.clear_exit()
+
+        # Test
+        assert not before
+        assert requested
+        assert waited
+        assert not controller.is_exit_requested()
+
+    def test_pause_blocks_worker(self) -> None:
+        """
+        Worker waits in `check_pause()` until resumed.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        output_queue = mp.Queue()
+        controller.request_pause()
+        worker = mp.Process(target=pause_then_count, args=(controller, output_queue))
+
+        # Run
+        worker.start()
+        time.sleep(0.2)
+        controller.request_resume()
+        paused_time = output_queue.get(timeout=5)
+        worker.join()
+
+        # Test
+        assert paused_time >= 0.1
+
+    def test_not_paused(self) -> None:
+        """
+        `check_pause()` returns immediately when not paused.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        controller.request_pause()
+        controller.request_resume()
+
+        # Run
+        start = time.monotonic()
+        controller.check_pause()
+        elapsed = time.monotonic() - start
+
+        # Test
+        assert elapsed < 0.1
+
+
+class TestWaitForReadable:
+    """
+    Waiting on a file descriptor together with the controller.
+    """
+
+    def test_data(self) -> None:
+        """
+        Wakes when data arrives.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        reader, writer = socket.socketpair()
+        threading.Timer(0.05, writer.send, (b"x",)).start()
+
+        # Run
+        readable = controller.wait_for_readable(reader.fileno(), 5)
+
+        # Test
+        assert readable
+
+        reader.close()
+        writer.close()
+
+    def test_exit(self) -> None:
+        """
+        Wakes on exit request, and keeps waking until cleared.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        reader, writer = socket.socketpair()
+        threading.Timer(0.05, controller.request_exit).start()
+
+        # Run
+        start = time.monotonic()
+        readable = controller.wait_for_readable(reader.fileno(), 5)
+        elapsed = time.monotonic() - start
+        still_awake = controller.wait_for_readable(reader.fileno(), 5)
+        controller.clear_exit()
+        start = time.monotonic()
+        controller.wait_for_readable(reader.fileno(), 0.05)
+        elapsed_after_clear = time.monotonic() - start
+
+        # Test
+        assert not readable
+        assert elapsed < 1
+        assert not still_awake
+        assert elapsed_after_clear >= 0.04
+
+        reader.close()
+        writer.close()
+
+    def test_pause(self) -> None:
+        """
+        Wakes on pause request.
+        """
+        # Setup
+        controller = worker_controller.WorkerController()
+        reader, writer = socket.socketpair()
+        controller.request_pause()
+
+        # Run
+        start = time.monotonic()
+        controller.wait_for_readable(reader.fileno(), 5)
+        elapsed = time.monotonic() - start
+        controller.request_resume()
+
+        # Test
+        assert elapsed < 1
+
+        reader.close()
+        writer.close()
@@ -0,0 +1,275 @@
+"""
+Publish/subscribe channel backed by a shared memory ring buffer.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import ctypes
+import multiprocessing as mp
+import multiprocessing.shared_memory
+import struct
+
+from . import queue_closed
+from . import shared_memory_queue
+
+
+class PubSubChannel:
+    """
+    Single ring buffer read by several subscribers, each with its own cursor.
+
+    A publish serializes the item once into the next slot and wakes every subscriber,
+    so adding subscribers adds no work for the publisher.
+    The publisher never waits: once the ring wraps, the oldest item is overwritten
+    and subscribers which had not read it skip ahead and count it as missed.
+
+    Subscriptions must be created with `subscribe()` and passed to worker processes
+    as an argument at creation, like the channel itself.
+    """
+
+    # Number of items ever published
+    __HEADER = struct.Struct("=Q")
+    # Per subscriber: sequence number of the next item to read, number of missed items
+    __CURSOR = struct.Struct("=QQ")
+    # Payload length, payload kind
+    __SLOT_HEADER = struct.Struct("=IB")
+
+    def __init__(
+        self,
+        capacity: int,
+        max_subscribers: int,
+        slot_size: int = shared_memory_queue.DEFAULT_SLOT_SIZE,
+    ) -> None:
+        """
+        capacity: Number of slots, how far a subscriber can fall behind without missing items.
+        max_subscribers: Maximum number of calls to `subscribe()`.
+        slot_size: Maximum serialized size of an item in bytes.
+        """
+        if capacity <= 0:
+            raise ValueError(f"Channel requires capacity > 0, got {capacity}")
+
+        if max_subscribers <= 0:
+            raise ValueError(f"Channel requires max_subscribers > 0, got {max_subscribers}")
+
+        if slot_size <= 0:
+            raise ValueError(f"Channel requires slot_size > 0, got {slot_size}")
+
+        self.capacity = capacity
+        self.max_subscribers = max_subscribers
+        self.__slot_size = slot_size
+        self.__slot_stride = self.__SLOT_HEADER.size + slot_size
+
+        # Header, then cursors, then slots
+        self.__slots_offset = self.__HEADER.size + max_subscribers * self.__CURSOR.size
+
+        self.__shared_memory = multiprocessing.shared_memory.SharedMemory(
+            create=True,
+            size=self.__slots_offset + capacity * self.__slot_stride,
+        )
+        self.__HEADER.pack_into(self.__shared_memory.buf, 0, 0)
+
+        self.__condition = mp.Condition(mp.Lock())
+        self.__num_subscribers = mp.RawValue(ctypes.c_uint32, 0)
+        self.__is_closed = mp.RawValue(ctypes.c_bool, False)
+
+    def subscribe(self) -> "PubSubSubscription":
+        """
+        Creates a subscription which receives every item published from now on.
+        Raises `ValueError` if there are already `max_subscribers` subscriptions.
+        """
+        with self.__condition:
+            index = self.__num_subscribers.value
+            if index >= self.max_subscribers:
+                raise ValueError(f"Channel already has {self.max_subscribers} subscribers")
+
+            buffer = self.__shared_memory.buf
+            (sequence,) = self.__HEADER.unpack_from(buffer, 0)
+            self.__CURSOR.pack_into(buffer, self.__cursor_offset(index), sequence, 0)
+            self.__num_subscribers.value = index + 1
+
+        return PubSubSubscription(self, index)
+
+    def publish(self, item: object) -> None:
+        """
+        Copies the item into the ring and wakes every subscriber, never waits for them.
+        Raises `QueueClosed` if closed.
+        """
+        kind, payload = shared_memory_queue.encode_payload(item)
+        if len(payload) > self.__slot_size:
+            raise ValueError(
+                f"Item is {len(payload)} bytes serialized, slot size is {self.__slot_size}"
+            )
+
+        if self.__is_closed.value:
+            raise queue_closed.QueueClosed
+
+        with self.__condition:
+            buffer = self.__shared_memory.buf
+            (sequence,) = self.__HEADER.unpack_from(buffer, 0)
+
+            offset = self.__slot_offset(sequence)
+            self.__SLOT_HEADER.pack_into(buffer, offset, len(payload), kind)
+            data_offset = offset + self.__SLOT_HEADER.size
+            buffer[data_offset : data_offset + len(payload)] = payload
+
+            self.__HEADER.pack_into(buffer, 0, sequence + 1)
+            self.__condition.notify_all()
+
+    def receive_many(
+        self,
+        index: int,
+        max_items: int,
+        block: bool = True,
+        timeout: "float | None" = None,
+        latest_only: bool = False,
+    ) -> "list[object]":
+        """
+        Use `PubSubSubscription.receive_many()` or `receive_latest()` instead.
+        """
+        with self.__condition:
+            if block:
+                self.__condition.wait_for(
+                    lambda: self.__is_closed.value or self.__pending(index) > 0, timeout
+                )
+
+            payloads = self.__read_slots(index, max_items, latest_only)
+
+        if len(payloads) == 0 and self.__is_closed.value:
+            raise queue_closed.QueueClosed
+
+        # Deserialize outside of the lock
+        return [shared_memory_queue.decode_payload(kind, payload) for kind, payload in payloads]
+
+    def missed_count(self, index: int) -> int:
+        """
+        Use `PubSubSubscription.missed_count()` instead.
+        """
+        with self.__condition:
+            _, missed = self.__CURSOR.unpack_from(
+                self.__shared_memory.buf, self.__cursor_offset(index)
+            )
+
+        return missed
+
+    def close(self) -> None:
+        """
+        Closes the channel and wakes every subscriber.
+        Subscribers can read the remaining items before `QueueClosed` is raised.
+        """
+        with self.__condition:
+            self.__is_closed.value = True
+            self.__condition.notify_all()
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory, only call from the process that created the channel
+        once no other process uses it.
+        """
+        self.__shared_memory.close()
+        self.__shared_memory.unlink()
+
+    def __cursor_offset(self, index: int) -> int:
+        """
+        Offset of the cursor of a subscriber.
+        """
+        return self.__HEADER.size + index * self.__CURSOR.size
+
+    def __slot_offset(self, sequence: int) -> int:
+        """
+        Offset of the slot that holds the item with the given sequence number.
+        """
+        return self.__slots_offset + (sequence % self.capacity) * self.__slot_stride
+
+    def __pending(self, index: int) -> int:
+        """
+        Called with the lock held, returns the number of items published since the cursor.
+        """
+        buffer = self.__shared_memory.buf
+        (sequence,) = self.__HEADER.unpack_from(buffer, 0)
+        cursor, _ = self.__CURSOR.unpack_from(buffer, self.__cursor_offset(index))
+        return sequence - cursor
+
+    def __read_slots(
+        self, index: int, max_items: int, latest_only: bool
+    ) -> "list[tuple[int, bytes]]":
+        """
+        Called with the lock held, copies out up to `max_items` unread payloads
+        and advances the cursor, skipping overwritten items.
+
+        max_items: Maximum number of items, `max_items <= 0` means no limit.
+        latest_only: Whether to skip to the newest item without counting the rest as missed.
+        """
+        buffer = self.__shared_memory.buf
+        (sequence,) = self.__HEADER.unpack_from(buffer, 0)
+        cursor_offset = self.__cursor_offset(index)
+        cursor, missed = self.__CURSOR.unpack_from(buffer, cursor_offset)
+
+        oldest = max(sequence - self.capacity, 0)
+        if cursor < oldest:
+            missed += oldest - cursor
+            cursor = oldest
+
+        if latest_only:
+            cursor = max(cursor, sequence - 1)
+
+        end = sequence
+        if max_items > 0:
+            end = min(end, cursor + max_items)
+
+        payloads = []
+        for current in range(cursor, end):
+            offset = self.__slot_offset(current)
+            length, kind = self.__SLOT_HEADER.unpack_from(buffer, offset)
+            data_offset = offset + self.__SLOT_HEADER.size
+            payloads.append((kind, bytes(buffer[data_offset : data_offset + length])))
+
+        self.__CURSOR.pack_into(buffer, cursor_offset, end, missed)
+        return payloads
+
+
+class PubSubSubscription:
+    """
+    Read side of a `PubSubChannel` for 1 subscriber, create with `PubSubChannel.subscribe()`.
+    """
+
+    def __init__(self, channel: PubSubChannel, index: int) -> None:
+        """
+        channel: Channel subscribed to.
+        index: Cursor of this subscriber.
+        """
+        self.channel = channel
+        self.index = index
+
+    def receive_many(self, max_items: int, timeout: "float | None" = 0.0) -> "list[object]":
+        """
+        Waits for at least 1 item and then returns every unread item in order.
+        Raises `QueueClosed` if the channel is closed and every item has been read.
+
+        max_items: Maximum number of items, `max_items <= 0` means no limit.
+        timeout: Time waiting in seconds before giving up, 0 does not wait and None waits forever.
+
+        Returns the items, empty if none were published in time.
+        """
+        block = timeout is None or timeout > 0.0
+        return self.channel.receive_many(self.index, max_items, block, timeout)
+
+    def receive_latest(self, timeout: "float | None" = 0.0) -> "object | None":
+        """
+        Waits for at least 1 item and then returns the newest, skipping the rest.
+        Skipped items are not counted as missed.
+
+        timeout: Time waiting in seconds before giving up, 0 does not wait and None waits forever.
+
+        Returns None if nothing was published in time.
+        """
+        block = timeout is None or timeout > 0.0
+        items = self.channel.receive_many(self.index, 0, block, timeout, True)
+        if len(items) == 0:
+            return None
+
+        return items[-1]
+
+    def missed_count(self) -> int:
+        """
+        Returns the number of items overwritten before this subscriber read them.
+        """
+        return self.channel.missed_count(self.index)
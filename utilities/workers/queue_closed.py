@@ -0,0 +1,10 @@
+"""
+Queue closed exception.
+"""
+
+
+class QueueClosed(Exception):
+    """
+    Raised by queue operations after the queue has been closed.
+    Items still in the queue can be read until it is empty.
+    """
@@ -0,0 +1,317 @@
+"""
+Manager with queues that support batched operations.
+"""
+
+import collections
+import multiprocessing.managers
+import queue
+import threading
+import time
+from typing import Callable
+
+from . import queue_closed
+from . import queue_statistics
+
+
+class BatchQueue(queue.Queue):
+    """
+    Queue with bulk operations, so that a proxy moves many items in a single round trip.
+
+    Closing the queue wakes every blocked producer and consumer at once.
+    """
+
+    def __init__(self, maxsize: int = 0, instrument: bool = False) -> None:
+        """
+        maxsize: Maximum number of items, `maxsize <= 0` means infinite size.
+        instrument: Whether to count items and time spent waiting.
+        """
+        super().__init__(maxsize)
+        self.__is_closed = False
+
+        self.__statistics = None
+        self.__statistics_buffer = None
+        if instrument:
+            self.__statistics = queue_statistics.QueueStatistics()
+            self.__statistics_buffer = memoryview(bytearray(queue_statistics.QueueStatistics.SIZE))
+
+    def put(self, item: object, block: bool = True, timeout: "float | None" = None) -> None:
+        """
+        Same as `queue.Queue.put()`, raises `QueueClosed` if closed.
+        """
+        with self.not_full:
+            start = self.__start_timer()
+            if not self.__wait_until(self.not_full, self.__has_space, block, timeout):
+                raise queue.Full
+
+            self.__put_open(item)
+            self.__record_put(1, start)
+
+    def get(self, block: bool = True, timeout: "float | None" = None) -> object:
+        """
+        Same as `queue.Queue.get()`, raises `QueueClosed` if closed and empty.
+        """
+        with self.not_empty:
+            start = self.__start_timer()
+            if not self.__wait_until(self.not_empty, self._qsize, block, timeout):
+                raise queue.Empty
+
+            item = self._get()
+            self.not_full.notify()
+            self.__record_get(1, start)
+
+        return item
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: "float | None" = None
+    ) -> int:
+        """
+        Puts the items in order, stopping early if the queue stays full.
+        Raises `QueueClosed` if closed.
+
+        block: Whether to wait for free space.
+        timeout: Time waiting in seconds across all items before giving up, None waits forever.
+
+        Returns the number of items put.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        count = 0
+        with self.not_full:
+            start = self.__start_timer()
+            for item in items:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+                if not self.__wait_until(self.not_full, self.__has_space, block, remaining):
+                    break
+
+                self.__put_open(item)
+                count += 1
+
+            self.__record_put(count, start)
+
+        return count
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: "float | None" = None
+    ) -> "list[object]":
+        """
+        Waits for at least 1 item and then removes every available item, up to `max_items`.
+        Raises `QueueClosed` if closed and empty.
+
+        max_items: Maximum number of items, `max_items <= 0` means no limit.
+        block: Whether to wait for an item.
+        timeout: Time waiting in seconds before giving up, None waits forever.
+
+        Returns the items, empty if none were available in time.
+        """
+        with self.not_empty:
+            start = self.__start_timer()
+            if not self.__wait_until(self.not_empty, self._qsize, block, timeout):
+                return []
+
+            count = self._qsize()
+            if max_items > 0:
+                count = min(count, max_items)
+
+            items = [self._get() for _ in range(count)]
+            self.not_full.notify(count)
+            self.__record_get(count, start)
+
+        return items
+
+    def discard_oldest(self) -> bool:
+        """
+        Removes the oldest item, to make space for a new one.
+
+        Returns whether there was an item.
+        """
+        with self.mutex:
+            if self._qsize() == 0:
+                return False
+
+            self._discard()
+            self.not_full.notify()
+
+        return True
+
+    def close(self) -> None:
+        """
+        Closes the queue and wakes every waiting producer and consumer.
+        """
+        with self.mutex:
+            self.__is_closed = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+
+    def statistics(self) -> "queue_statistics.QueueStatisticsSnapshot | None":
+        """
+        Returns a copy of the counters, None if not instrumented.
+        """
+        if self.__statistics is None:
+            return None
+
+        with self.mutex:
+            return self.__statistics.read(self.__statistics_buffer, self._qsize())
+
+    # Storage hook like those of queue.Queue, called with the mutex held
+    def _discard(self) -> None:
+        self._get()
+
+    def __start_timer(self) -> int:
+        """
+        Returns the current time in nanoseconds if instrumented.
+        """
+        if self.__statistics is None:
+            return 0
+
+        return time.perf_counter_ns()
+
+    def __record_put(self, count: int, start: int) -> None:
+        """
+        Called with the mutex held.
+        """
+        if self.__statistics is None:
+            return
+
+        wait_ns = time.perf_counter_ns() - start
+        self.__statistics.record_put(self.__statistics_buffer, count, wait_ns, self._qsize())
+
+    def __record_get(self, count: int, start: int) -> None:
+        """
+        Called with the mutex held.
+        """
+        if self.__statistics is None:
+            return
+
+        wait_ns = time.perf_counter_ns() - start
+        self.__statistics.record_get(self.__statistics_buffer, count, wait_ns)
+
+    def __has_space(self) -> bool:
+        """
+        Called with the mutex held.
+        """
+        return self.maxsize <= 0 or self._qsize() < self.maxsize
+
+    def __put_open(self, item: object) -> None:
+        """
+        Called with the mutex held, once there is space.
+        """
+        if self.__is_closed:
+            raise queue_closed.QueueClosed
+
+        self._put(item)
+        self.unfinished_tasks += 1
+        self.not_empty.notify()
+
+    def __wait_until(
+        self,
+        condition: threading.Condition,
+        is_ready: Callable[[], object],
+        block: bool,
+        timeout: "float | None",
+    ) -> bool:
+        """
+        Called with the mutex held, waits until ready or closed.
+
+        Returns whether ready, raises `QueueClosed` if closed and not ready.
+        """
+        if block:
+            condition.wait_for(lambda: self.__is_closed or is_ready(), timeout)
+
+        if is_ready():
+            return True
+
+        if self.__is_closed:
+            raise queue_closed.QueueClosed
+
+        return False
+
+
+class ConflatingQueue(BatchQueue):
+    """
+    Single slot mailbox: a put overwrites the unread item and never blocks,
+    and a get returns the newest item.
+    """
+
+    def __init__(self, instrument: bool = False) -> None:
+        """
+        instrument: Whether to count items and time spent waiting.
+        """
+        # Infinite size so that puts never wait, the slot itself holds at most 1 item
+        super().__init__(0, instrument)
+        self.__overwritten_count = 0
+
+    def overwritten_count(self) -> int:
+        """
+        Returns the number of items that were overwritten before being read.
+        """
+        with self.mutex:
+            return self.__overwritten_count
+
+    # Overriding the storage hooks of queue.Queue, called with the mutex held
+    def _init(self, maxsize: int) -> None:
+        self.queue = collections.deque(maxlen=1)
+
+    def _put(self, item: object) -> None:
+        if len(self.queue) > 0:
+            self.__overwritten_count += 1
+
+        self.queue.append(item)
+
+
+class PriorityLaneQueue(BatchQueue):
+    """
+    Queue of `(high_priority, item)` pairs: gets return the items,
+    high priority ones before normal ones and otherwise in order.
+    Discarding to make space removes normal priority items first.
+    """
+
+    # Overriding the storage hooks of queue.Queue, called with the mutex held
+    def _init(self, maxsize: int) -> None:
+        self.queue = collections.deque()
+        self.high_priority_queue = collections.deque()
+
+    def _qsize(self) -> int:
+        return len(self.queue) + len(self.high_priority_queue)
+
+    def _put(self, item: "tuple[bool, object]") -> None:
+        high_priority, item = item
+        if high_priority:
+            self.high_priority_queue.append(item)
+        else:
+            self.queue.append(item)
+
+    def _get(self) -> object:
+        if len(self.high_priority_queue) > 0:
+            return self.high_priority_queue.popleft()
+
+        return self.queue.popleft()
+
+    def _discard(self) -> None:
+        if len(self.queue) > 0:
+            self.queue.popleft()
+        else:
+            self.high_priority_queue.popleft()
+
+
+class QueueManager(multiprocessing.managers.SyncManager):
+    """
+    SyncManager which can also create `BatchQueue`, `ConflatingQueue`,
+    and `PriorityLaneQueue` proxies.
+    Use `create_queue_manager()` to get a started instance.
+    """
+
+
+QueueManager.register("BatchQueue", BatchQueue)
+QueueManager.register("ConflatingQueue", ConflatingQueue)
+QueueManager.register("PriorityLaneQueue", PriorityLaneQueue)
+
+
+def create_queue_manager() -> QueueManager:
+    """
+    Creates and starts a queue manager, like `multiprocessing.Manager()`.
+    """
+    manager = QueueManager()
+    # Caller owns the manager, it shuts down with the process like `multiprocessing.Manager()`
+    # pylint: disable-next=consider-using-with
+    manager.start()
+    return manager
@@ -2,24 +2,230 @@
 Queue.
 """
 
-import multiprocessing.managers
+# pylint: disable=too-many-instance-attributes
+
+import ctypes
+import enum
+import multiprocessing as mp
 import queue
 import time
 
+from . import queue_manager
+from . import queue_statistics
+from . import shared_memory_queue
+
+
+class QueueBackend(enum.Enum):
+    """
+    Underlying queue implementation.
+    """
+
+    # Queue proxy to the manager server process, requires a `queue_manager.QueueManager`
+    MANAGER = 0
+    # Ring buffer in shared memory, requires `maxsize > 0`
+    SHARED_MEMORY = 1
+
+
+class QueueMode(enum.Enum):
+    """
+    Queueing discipline.
+    """
+
+    # First in first out, bounded by `maxsize`
+    FIFO = 0
+    # Single slot, a put overwrites the unread item and a get returns the newest item
+    CONFLATING = 1
+    # First in first out within 2 priorities, high priority items are returned first
+    PRIORITY = 2
+
+
+class BackpressurePolicy(enum.Enum):
+    """
+    What `QueueProxyWrapper.put()` does when the queue is full.
+    """
+
+    # Wait for space
+    BLOCK = 0
+    # Wait for space up to `put_timeout`, then drop the new item
+    BLOCK_TIMEOUT = 1
+    # Drop the new item without waiting
+    DROP_NEWEST = 2
+    # Discard the oldest unread item to make space
+    DROP_OLDEST = 3
+    # Only forward every `sample_period`th item, dropping it if there is no space
+    SAMPLE = 4
+
 
 class QueueProxyWrapper:
     """
     Wrapper for an underlying queue proxy which also stores `maxsize`.
 
     `maxsize <= 0` means infinite size.
+
+    In priority mode the underlying queue takes `(high_priority, item)` pairs,
+    `put()` creates them.
     """
 
     __QUEUE_TIMEOUT = 0.1  # seconds
     __QUEUE_DELAY = 0.1  # seconds
 
-    def __init__(self, mp_manager: multiprocessing.managers.SyncManager, maxsize: int = 0) -> None:
-        self.queue = mp_manager.Queue(maxsize)
+    def __init__(
+        self,
+        mp_manager: queue_manager.QueueManager,
+        maxsize: int = 0,
+        backend: QueueBackend = QueueBackend.MANAGER,
+        mode: QueueMode = QueueMode.FIFO,
+        slot_size: int = shared_memory_queue.DEFAULT_SLOT_SIZE,
+        instrument: bool = False,
+        backpressure: BackpressurePolicy = BackpressurePolicy.BLOCK,
+        put_timeout: float = __QUEUE_TIMEOUT,
+        sample_period: int = 1,
+    ) -> None:
+        """
+        mp_manager: Manager that owns the queue, unused by the shared memory backend.
+        maxsize: Maximum number of items, ignored in conflating mode.
+        backend: Underlying queue implementation.
+        mode: Queueing discipline.
+        slot_size: Maximum serialized item size in bytes, only used by the shared memory backend.
+        instrument: Whether to count items and time spent waiting, see `statistics()`.
+        backpressure: What `put()` does when the queue is full.
+        put_timeout: Time waiting in seconds for space, only used by `BLOCK_TIMEOUT`.
+        sample_period: Number of items per forwarded item, only used by `SAMPLE`.
+        """
+        if sample_period < 1:
+            raise ValueError(f"Sample period must be at least 1, got {sample_period}")
+
+        is_conflating = mode == QueueMode.CONFLATING
+        if is_conflating:
+            maxsize = 1
+
+        is_priority = mode == QueueMode.PRIORITY
+
+        if backend == QueueBackend.SHARED_MEMORY:
+            self.queue = shared_memory_queue.SharedMemoryQueue(
+                maxsize,
+                slot_size,
+                is_conflating,
+                instrument,
+                is_priority,
+            )
+        elif is_conflating:
+            self.queue = mp_manager.ConflatingQueue(instrument)
+        elif is_priority:
+            self.queue = mp_manager.PriorityLaneQueue(maxsize, instrument)
+        else:
+            self.queue = mp_manager.BatchQueue(maxsize, instrument)
+
         self.maxsize = maxsize
+        self.backend = backend
+        self.mode = mode
+        self.backpressure = backpressure
+        self.put_timeout = put_timeout
+        self.sample_period = sample_period
+
+        # Shared so that main can read how much the producers shed
+        self.__dropped_count = mp.Value(ctypes.c_uint64, 0)
+        # Per producer process, each forwards every Nth of its own items
+        self.__sample_index = 0
+
+    def put(self, item: object, high_priority: bool = False) -> bool:
+        """
+        Puts the item according to the backpressure policy, so that a producer with
+        a dropping policy never stalls behind a slow consumer.
+        Raises `QueueClosed` if closed.
+
+        high_priority: Whether the item is returned before normal ones, only used in priority mode.
+
+        Returns whether the item was put, False if it was dropped.
+        """
+        if self.mode == QueueMode.PRIORITY:
+            item = (high_priority, item)
+
+        if self.backpressure == BackpressurePolicy.BLOCK:
+            self.queue.put(item)
+            return True
+
+        if self.backpressure == BackpressurePolicy.DROP_OLDEST:
+            return self.__put_drop_oldest(item)
+
+        if self.backpressure == BackpressurePolicy.SAMPLE:
+            is_sampled = self.__sample_index == 0
+            self.__sample_index = (self.__sample_index + 1) % self.sample_period
+            if not is_sampled:
+                self.__record_drop()
+                return False
+
+        try:
+            if self.backpressure == BackpressurePolicy.BLOCK_TIMEOUT:
+                self.queue.put(item, timeout=self.put_timeout)
+            else:
+                self.queue.put_nowait(item)
+        except queue.Full:
+            self.__record_drop()
+            return False
+
+        return True
+
+    def dropped_count(self) -> int:
+        """
+        Returns the number of items shed by the backpressure policy across all producers,
+        always 0 for `BLOCK`.
+        """
+        return self.__dropped_count.value
+
+    def put_many(self, items: "list[object]", timeout: "float | None" = None) -> int:
+        """
+        Puts the items in order with a single round trip when there is space.
+        In priority mode the items are `(high_priority, item)` pairs.
+
+        timeout: Time waiting in seconds across all items before giving up,
+        0 does not wait and None waits forever.
+
+        Returns the number of items put, less than the number of items if the queue stayed full.
+        """
+        if len(items) == 0:
+            return 0
+
+        block = timeout is None or timeout > 0.0
+        return self.queue.put_many(items, block, timeout)
+
+    def get_many(self, max_items: int, timeout: "float | None" = 0.0) -> "list[object]":
+        """
+        Waits for at least 1 item and then removes every available item with a single round trip.
+
+        max_items: Maximum number of items, `max_items <= 0` means no limit.
+        timeout: Time waiting in seconds before giving up, 0 does not wait and None waits forever.
+
+        Returns the items in order, empty if none were available in time.
+        """
+        block = timeout is None or timeout > 0.0
+        return self.queue.get_many(max_items, block, timeout)
+
+    def overwritten_count(self) -> int:
+        """
+        Returns the number of items overwritten before being read, always 0 for FIFO.
+        """
+        if self.mode != QueueMode.CONFLATING:
+            return 0
+
+        return self.queue.overwritten_count()
+
+    def statistics(self) -> queue_statistics.QueueStatisticsSnapshot | None:
+        """
+        Returns a copy of the counters, readable from any process. None if not instrumented.
+        """
+        return self.queue.statistics()
+
+    def close(self) -> float:
+        """
+        Closes the queue, waking every blocked producer and consumer at once.
+        Afterwards, puts raise `QueueClosed` and gets raise it once the queue is empty.
+
+        Returns the time taken in seconds.
+        """
+        start = time.perf_counter()
+        self.queue.close()
+        return time.perf_counter() - start
 
     def fill_queue_with_sentinel(self, timeout: float = 0.0) -> None:
         """
@@ -30,9 +236,13 @@ class QueueProxyWrapper:
         if timeout <= 0.0:
             timeout = self.__QUEUE_TIMEOUT
 
+        sentinel = None
+        if self.mode == QueueMode.PRIORITY:
+            sentinel = (False, None)
+
         try:
             for _ in range(self.maxsize):
-                self.queue.put(None, timeout=timeout)
+                self.queue.put(sentinel, timeout=timeout)
         except queue.Full:
             return
 
@@ -54,7 +264,38 @@ class QueueProxyWrapper:
     def fill_and_drain_queue(self) -> None:
         """
         Fill with sentinel and then drain.
+        Prefer `close()`, which does not depend on the queue size.
         """
         self.fill_queue_with_sentinel()
         time.sleep(self.__QUEUE_DELAY)
         self.drain_queue()
+
+    def release(self) -> None:
+        """
+        Frees resources owned by the queue, call once all workers have been joined.
+        Does nothing for the manager backend, the manager owns the queue.
+        """
+        if self.backend == QueueBackend.SHARED_MEMORY:
+            self.queue.unlink()
+
+    def __put_drop_oldest(self, item: object) -> bool:
+        """
+        Discards unread items until the new item fits, normal priority first in priority mode.
+        """
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+
+            # The consumer may have made space in the meantime
+            if self.queue.discard_oldest():
+                self.__record_drop()
+
+    def __record_drop(self) -> None:
+        """
+        Counts a shed item.
+        """
+        with self.__dropped_count.get_lock():
+            self.__dropped_count.value += 1
@@ -0,0 +1,178 @@
+"""
+Queue counters and wait time histograms.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import time
+
+
+# Wait time histogram buckets, bucket 0 is under 1 us and bucket i is [2^(i-1), 2^i) us
+NUM_BUCKETS = 24
+
+
+def bucket_upper_bound(index: int) -> float:
+    """
+    Returns the exclusive upper bound of a histogram bucket in seconds,
+    infinity for the last bucket.
+    """
+    if index >= NUM_BUCKETS - 1:
+        return float("inf")
+
+    return (1 << index) / 1_000_000
+
+
+def bucket_index(duration_ns: int) -> int:
+    """
+    Returns the histogram bucket of a duration in nanoseconds.
+    """
+    return min((duration_ns // 1000).bit_length(), NUM_BUCKETS - 1)
+
+
+def histogram_percentile(buckets: "list[int]", fraction: float) -> float:
+    """
+    Returns the upper bound in seconds of the bucket containing the percentile,
+    0 if the histogram is empty.
+
+    fraction: Percentile between 0 and 1 .
+    """
+    total = sum(buckets)
+    if total == 0:
+        return 0.0
+
+    threshold = fraction * total
+    cumulative = 0
+    for i, count in enumerate(buckets):
+        cumulative += count
+        if cumulative >= threshold:
+            return bucket_upper_bound(i)
+
+    return bucket_upper_bound(NUM_BUCKETS - 1)
+
+
+class QueueStatisticsSnapshot:
+    """
+    Counters read at one point in time.
+    """
+
+    def __init__(
+        self,
+        timestamp: float,
+        depth: int,
+        counters: "tuple[int, ...]",
+    ) -> None:
+        """
+        timestamp: Time of reading in seconds since epoch.
+        depth: Number of items in the queue.
+        counters: Raw counters in `QueueStatistics` layout.
+        """
+        self.timestamp = timestamp
+        self.depth = depth
+        self.puts = counters[QueueStatistics.PUTS]
+        self.gets = counters[QueueStatistics.GETS]
+        self.max_depth = counters[QueueStatistics.MAX_DEPTH]
+        self.put_wait_total = counters[QueueStatistics.PUT_WAIT_NS] / 1e9
+        self.get_wait_total = counters[QueueStatistics.GET_WAIT_NS] / 1e9
+
+        put_start = QueueStatistics.PUT_HISTOGRAM
+        get_start = QueueStatistics.GET_HISTOGRAM
+        self.put_wait_histogram = list(counters[put_start : put_start + NUM_BUCKETS])
+        self.get_wait_histogram = list(counters[get_start : get_start + NUM_BUCKETS])
+
+    def summary(self, previous: "QueueStatisticsSnapshot | None" = None) -> str:
+        """
+        Formats depth, rates and wait time percentiles for logging.
+
+        previous: Earlier snapshot of the same queue to compute rates over,
+        None computes nothing.
+        """
+        rates = ""
+        if previous is not None and self.timestamp > previous.timestamp:
+            period = self.timestamp - previous.timestamp
+            rates = (
+                f", put {(self.puts - previous.puts) / period:.1f}/s"
+                f", get {(self.gets - previous.gets) / period:.1f}/s"
+            )
+
+        put_p50 = histogram_percentile(self.put_wait_histogram, 0.5) * 1e6
+        put_p99 = histogram_percentile(self.put_wait_histogram, 0.99) * 1e6
+        get_p50 = histogram_percentile(self.get_wait_histogram, 0.5) * 1e6
+        get_p99 = histogram_percentile(self.get_wait_histogram, 0.99) * 1e6
+
+        return (
+            f"depth {self.depth} (max {self.max_depth}){rates}"
+            f", put wait p50 < {put_p50:.0f} us p99 < {put_p99:.0f} us"
+            f", get wait p50 < {get_p50:.0f} us p99 < {get_p99:.0f} us"
+        )
+
+
+class QueueStatistics:
+    """
+    Counters of a queue stored as unsigned 64 bit integers in a buffer,
+    so that they can live in shared memory.
+    The caller provides the buffer on every call and is responsible for locking.
+    """
+
+    # Counter indices
+    PUTS = 0
+    GETS = 1
+    MAX_DEPTH = 2
+    PUT_WAIT_NS = 3
+    GET_WAIT_NS = 4
+    PUT_HISTOGRAM = 5
+    GET_HISTOGRAM = PUT_HISTOGRAM + NUM_BUCKETS
+    NUM_COUNTERS = GET_HISTOGRAM + NUM_BUCKETS
+
+    SIZE = NUM_COUNTERS * 8  # bytes
+
+    def __init__(self, offset: int = 0) -> None:
+        """
+        offset: Start of the counters in the buffer in bytes, must be a multiple of 8 .
+        """
+        self.__offset = offset
+
+    def record_put(self, buffer: memoryview, count: int, wait_ns: int, depth: int) -> None:
+        """
+        Records items put after waiting.
+
+        buffer: Bytes view containing the counters.
+        count: Number of items.
+        wait_ns: Time spent waiting for space in nanoseconds.
+        depth: Number of items in the queue afterwards.
+        """
+        with self.__counters(buffer) as counters:
+            counters[self.PUTS] += count
+            counters[self.PUT_WAIT_NS] += wait_ns
+            counters[self.PUT_HISTOGRAM + bucket_index(wait_ns)] += 1
+
+            if depth > counters[self.MAX_DEPTH]:
+                counters[self.MAX_DEPTH] = depth
+
+    def record_get(self, buffer: memoryview, count: int, wait_ns: int) -> None:
+        """
+        Records items removed after waiting.
+
+        buffer: Bytes view containing the counters.
+        count: Number of items.
+        wait_ns: Time spent waiting for an item in nanoseconds.
+        """
+        with self.__counters(buffer) as counters:
+            counters[self.GETS] += count
+            counters[self.GET_WAIT_NS] += wait_ns
+            counters[self.GET_HISTOGRAM + bucket_index(wait_ns)] += 1
+
+    def read(self, buffer: memoryview, depth: int) -> QueueStatisticsSnapshot:
+        """
+        Copies the counters.
+
+        buffer: Bytes view containing the counters.
+        depth: Current number of items in the queue.
+        """
+        with self.__counters(buffer) as counters:
+            return QueueStatisticsSnapshot(time.time(), depth, tuple(counters))
+
+    def __counters(self, buffer: memoryview) -> memoryview:
+        """
+        Unsigned 64 bit view of the counters, release it so that shared memory can be closed.
+        """
+        return buffer[self.__offset : self.__offset + self.SIZE].cast("Q")
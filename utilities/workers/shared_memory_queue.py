@@ -0,0 +1,522 @@
+"""
+Queue backed by a shared memory ring buffer.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import ctypes
+import multiprocessing as mp
+import multiprocessing.shared_memory
+import multiprocessing.synchronize
+import pickle
+import queue
+import struct
+import time
+
+from . import queue_closed
+from . import queue_statistics
+
+
+DEFAULT_SLOT_SIZE = 4096  # bytes
+
+# Payload kinds stored in each slot header
+PAYLOAD_PICKLE = 0
+PAYLOAD_BYTES = 1
+
+
+def encode_payload(item: object) -> "tuple[int, bytes]":
+    """
+    Serializes an item for storage in a shared memory slot.
+    `bytes` are stored as is, everything else is pickled.
+
+    Returns the payload kind and the payload.
+    """
+    if isinstance(item, bytes):
+        return PAYLOAD_BYTES, item
+
+    return PAYLOAD_PICKLE, pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+
+
+def decode_payload(kind: int, payload: bytes) -> object:
+    """
+    Deserializes a payload created by `encode_payload()`.
+    """
+    if kind == PAYLOAD_BYTES:
+        return payload
+
+    return pickle.loads(payload)
+
+
+class SharedMemoryQueue:
+    """
+    Bounded multi-producer multi-consumer FIFO queue.
+
+    Items are copied into fixed size slots of a ring buffer in shared memory,
+    and producers and consumers wake each other with semaphores,
+    so no manager server process is involved in a transfer.
+
+    In conflating mode there is a single slot: a put overwrites the unread item
+    and never blocks, and a get returns the newest item.
+
+    In priority mode items are put as `(high_priority, item)` pairs into one of 2 rings,
+    and gets return high priority items before normal ones. Both rings share `maxsize`.
+
+    Closing the queue wakes every blocked producer and consumer: each woken process
+    passes the wakeup on to the next one before raising `QueueClosed`.
+
+    Has the same interface as `queue.Queue` and raises `queue.Full` and `queue.Empty`.
+    Must be passed to worker processes as an argument at creation.
+    """
+
+    # Number of overwritten items
+    __HEADER = struct.Struct("=Q")
+    # Per ring: next index to read, next index to write
+    __LANE_HEADER = struct.Struct("=QQ")
+    # Payload length, payload kind
+    __SLOT_HEADER = struct.Struct("=IB")
+
+    def __init__(
+        self,
+        maxsize: int,
+        slot_size: int = DEFAULT_SLOT_SIZE,
+        conflate: bool = False,
+        instrument: bool = False,
+        priority: bool = False,
+    ) -> None:
+        """
+        maxsize: Number of slots, must be greater than 0 . Ignored in conflating mode.
+        slot_size: Maximum serialized size of an item in bytes, must be greater than 0 .
+        conflate: Whether to overwrite the unread item instead of queueing.
+        instrument: Whether to count items and time spent waiting, in shared memory.
+        priority: Whether items are `(high_priority, item)` pairs, cannot be conflating.
+        """
+        if conflate and priority:
+            raise ValueError("Shared memory queue cannot be both conflating and priority")
+
+        if conflate:
+            maxsize = 1
+
+        if maxsize <= 0:
+            raise ValueError(f"Shared memory queue requires maxsize > 0, got {maxsize}")
+
+        if slot_size <= 0:
+            raise ValueError(f"Shared memory queue requires slot_size > 0, got {slot_size}")
+
+        self.maxsize = maxsize
+        self.__conflate = conflate
+        self.__priority = priority
+        self.__slot_size = slot_size
+        self.__slot_stride = self.__SLOT_HEADER.size + slot_size
+
+        # Normal ring, then high priority ring, each can hold every item
+        self.__num_lanes = 2 if priority else 1
+        self.__lane_stride = maxsize * self.__slot_stride
+
+        # Header, then ring headers, then optional statistics, then rings
+        self.__statistics = None
+        self.__slots_offset = self.__HEADER.size + self.__num_lanes * self.__LANE_HEADER.size
+        if instrument:
+            self.__statistics = queue_statistics.QueueStatistics(self.__slots_offset)
+            self.__slots_offset += queue_statistics.QueueStatistics.SIZE
+
+        self.__shared_memory = multiprocessing.shared_memory.SharedMemory(
+            create=True,
+            size=self.__slots_offset + self.__num_lanes * self.__lane_stride,
+        )
+        self.__HEADER.pack_into(self.__shared_memory.buf, 0, 0)
+        for lane in range(self.__num_lanes):
+            self.__LANE_HEADER.pack_into(self.__shared_memory.buf, self.__lane_offset(lane), 0, 0)
+
+        self.__lock = mp.Lock()
+        self.__free_slots = mp.Semaphore(maxsize)
+        self.__used_slots = mp.Semaphore(0)
+        self.__is_closed = mp.RawValue(ctypes.c_bool, False)
+
+    def put(self, item: object, block: bool = True, timeout: "float | None" = None) -> None:
+        """
+        Copies the item into the next free slot.
+
+        block: Whether to wait for a free slot.
+        timeout: Time waiting in seconds before giving up, None waits forever.
+        """
+        entry = self.__encode(item)
+        self.__check_open()
+
+        if self.__conflate:
+            self.__overwrite_slot(entry[1], 0)
+            return
+
+        start = self.__start_timer()
+        if not self.__free_slots.acquire(block, timeout):
+            self.__check_open()
+            raise queue.Full
+
+        self.__check_open_after_acquire(self.__free_slots)
+
+        self.__write_slots([entry], start)
+        self.__used_slots.release()
+
+    def get(self, block: bool = True, timeout: "float | None" = None) -> object:
+        """
+        Removes and returns the oldest item, high priority first in priority mode.
+
+        block: Whether to wait for an item.
+        timeout: Time waiting in seconds before giving up, None waits forever.
+        """
+        start = self.__start_timer()
+        if not self.__used_slots.acquire(block, timeout):
+            self.__check_open()
+            raise queue.Empty
+
+        payloads = self.__read_slots(1, start)
+        if len(payloads) == 0:
+            # Woken by close
+            self.__used_slots.release()
+            raise queue_closed.QueueClosed
+
+        if not self.__conflate:
+            self.__free_slots.release()
+
+        # Deserialize outside of the lock
+        return decode_payload(*payloads[0])
+
+    def put_many(
+        self, items: "list[object]", block: bool = True, timeout: "float | None" = None
+    ) -> int:
+        """
+        Puts the items in order, stopping early if the queue stays full.
+        Items are written in chunks of whatever slots are free under a single lock.
+
+        block: Whether to wait for free slots.
+        timeout: Time waiting in seconds across all items before giving up, None waits forever.
+
+        Returns the number of items put.
+        """
+        entries = [self.__encode(item) for item in items]
+        self.__check_open()
+
+        if self.__conflate:
+            if len(entries) > 0:
+                self.__overwrite_slot(entries[-1][1], len(entries) - 1)
+
+            return len(entries)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        count = 0
+        while count < len(entries):
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            start = self.__start_timer()
+            if not self.__free_slots.acquire(block, remaining):
+                break
+
+            self.__check_open_after_acquire(self.__free_slots)
+
+            # Take any other free slots without waiting
+            chunk = 1
+            while count + chunk < len(entries) and self.__free_slots.acquire(False):
+                chunk += 1
+
+            self.__write_slots(entries[count : count + chunk], start)
+            for _ in range(chunk):
+                self.__used_slots.release()
+
+            count += chunk
+
+        return count
+
+    def get_many(
+        self, max_items: int, block: bool = True, timeout: "float | None" = None
+    ) -> "list[object]":
+        """
+        Waits for at least 1 item and then removes every available item, up to `max_items`.
+
+        max_items: Maximum number of items, `max_items <= 0` means no limit.
+        block: Whether to wait for an item.
+        timeout: Time waiting in seconds before giving up, None waits forever.
+
+        Returns the items, empty if none were available in time.
+        """
+        if max_items <= 0:
+            max_items = self.maxsize
+
+        start = self.__start_timer()
+        if not self.__used_slots.acquire(block, timeout):
+            self.__check_open()
+            return []
+
+        # Take any other used slots without waiting
+        count = 1
+        while count < max_items and self.__used_slots.acquire(False):
+            count += 1
+
+        payloads = self.__read_slots(count, start)
+
+        # Fewer items than wakeups only after close, pass the extra wakeups on
+        for _ in range(count - len(payloads)):
+            self.__used_slots.release()
+
+        if len(payloads) == 0:
+            raise queue_closed.QueueClosed
+
+        if not self.__conflate:
+            for _ in range(len(payloads)):
+                self.__free_slots.release()
+
+        return [decode_payload(kind, payload) for kind, payload in payloads]
+
+    def put_nowait(self, item: object) -> None:
+        """
+        Equivalent to `put(item, False)`.
+        """
+        self.put(item, False)
+
+    def get_nowait(self) -> object:
+        """
+        Equivalent to `get(False)`.
+        """
+        return self.get(False)
+
+    def discard_oldest(self) -> bool:
+        """
+        Removes the oldest item without deserializing it, normal priority first in priority mode.
+
+        Returns whether there was an item.
+        """
+        if not self.__used_slots.acquire(False):
+            return False
+
+        if len(self.__read_slots(1, 0, False)) == 0:
+            # Woken by close
+            self.__used_slots.release()
+            return False
+
+        if not self.__conflate:
+            self.__free_slots.release()
+
+        return True
+
+    def qsize(self) -> int:
+        """
+        Returns the approximate number of items in the queue.
+        """
+        with self.__lock:
+            return self.__depth(self.__shared_memory.buf)
+
+    def empty(self) -> bool:
+        """
+        Returns whether the queue is approximately empty.
+        """
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        """
+        Returns whether the queue is approximately full.
+        """
+        return self.qsize() >= self.maxsize
+
+    def close(self) -> None:
+        """
+        Closes the queue and wakes every waiting producer and consumer.
+        Items still in the queue can be read until it is empty.
+        """
+        self.__is_closed.value = True
+        self.__used_slots.release()
+        self.__free_slots.release()
+
+    def overwritten_count(self) -> int:
+        """
+        Returns the number of items that were overwritten before being read.
+        """
+        with self.__lock:
+            (overwritten,) = self.__HEADER.unpack_from(self.__shared_memory.buf, 0)
+
+        return overwritten
+
+    def statistics(self) -> "queue_statistics.QueueStatisticsSnapshot | None":
+        """
+        Returns a copy of the counters, None if not instrumented.
+        """
+        if self.__statistics is None:
+            return None
+
+        with self.__lock:
+            buffer = self.__shared_memory.buf
+            return self.__statistics.read(buffer, self.__depth(buffer))
+
+    def unlink(self) -> None:
+        """
+        Frees the shared memory, only call from the process that created the queue
+        once no other process uses it.
+        """
+        self.__shared_memory.close()
+        self.__shared_memory.unlink()
+
+    def __check_open(self) -> None:
+        """
+        Raises `QueueClosed` if closed.
+        """
+        if self.__is_closed.value:
+            raise queue_closed.QueueClosed
+
+    def __check_open_after_acquire(self, semaphore: multiprocessing.synchronize.Semaphore) -> None:
+        """
+        Raises `QueueClosed` if closed, passing the acquired wakeup on to the next waiter.
+        """
+        if self.__is_closed.value:
+            semaphore.release()
+            raise queue_closed.QueueClosed
+
+    def __start_timer(self) -> int:
+        """
+        Returns the current time in nanoseconds if instrumented.
+        """
+        if self.__statistics is None:
+            return 0
+
+        return time.perf_counter_ns()
+
+    def __encode(self, item: object) -> "tuple[int, tuple[int, bytes]]":
+        """
+        Serializes the item and checks that it fits in a slot.
+
+        Returns the ring index and the payload.
+        """
+        lane = 0
+        if self.__priority:
+            high_priority, item = item
+            lane = int(high_priority)
+
+        kind, payload = encode_payload(item)
+        if len(payload) > self.__slot_size:
+            raise ValueError(
+                f"Item is {len(payload)} bytes serialized, slot size is {self.__slot_size}"
+            )
+
+        return lane, (kind, payload)
+
+    def __lane_offset(self, lane: int) -> int:
+        """
+        Offset of the ring header.
+        """
+        return self.__HEADER.size + lane * self.__LANE_HEADER.size
+
+    def __slot_offset(self, lane: int, index: int) -> int:
+        """
+        Offset of the slot that holds the item with the given running index.
+        """
+        return (
+            self.__slots_offset
+            + lane * self.__lane_stride
+            + (index % self.maxsize) * self.__slot_stride
+        )
+
+    def __depth(self, buffer: memoryview) -> int:
+        """
+        Called with the lock held, returns the number of items across rings.
+        """
+        depth = 0
+        for lane in range(self.__num_lanes):
+            head, tail = self.__LANE_HEADER.unpack_from(buffer, self.__lane_offset(lane))
+            depth += tail - head
+
+        return depth
+
+    def __write_slots(self, entries: "list[tuple[int, tuple[int, bytes]]]", start: int) -> None:
+        """
+        Copies the payloads into slots at the tail of their ring,
+        the slots must already be reserved.
+
+        entries: Ring index and payload of each item, from `__encode()`.
+        start: Time the wait for the slots started, from `__start_timer()`.
+        """
+        with self.__lock:
+            buffer = self.__shared_memory.buf
+
+            for lane, (kind, payload) in entries:
+                lane_offset = self.__lane_offset(lane)
+                head, tail = self.__LANE_HEADER.unpack_from(buffer, lane_offset)
+
+                offset = self.__slot_offset(lane, tail)
+                self.__SLOT_HEADER.pack_into(buffer, offset, len(payload), kind)
+                data_offset = offset + self.__SLOT_HEADER.size
+                buffer[data_offset : data_offset + len(payload)] = payload
+
+                self.__LANE_HEADER.pack_into(buffer, lane_offset, head, tail + 1)
+
+            if self.__statistics is not None:
+                wait_ns = time.perf_counter_ns() - start
+                self.__statistics.record_put(buffer, len(entries), wait_ns, self.__depth(buffer))
+
+    def __read_slots(
+        self, count: int, start: int, high_priority_first: bool = True
+    ) -> "list[tuple[int, bytes]]":
+        """
+        Copies up to `count` payloads out of slots at the head of the rings,
+        the slots must already be reserved.
+        Returns fewer payloads only if the queue was closed.
+
+        start: Time the wait for the slots started, from `__start_timer()`, 0 to not record.
+        high_priority_first: Order in which the rings are emptied.
+        """
+        lanes = range(self.__num_lanes)
+        if high_priority_first:
+            lanes = reversed(lanes)
+
+        payloads = []
+        with self.__lock:
+            buffer = self.__shared_memory.buf
+
+            for lane in lanes:
+                lane_offset = self.__lane_offset(lane)
+                head, tail = self.__LANE_HEADER.unpack_from(buffer, lane_offset)
+
+                while len(payloads) < count and head < tail:
+                    offset = self.__slot_offset(lane, head)
+                    length, kind = self.__SLOT_HEADER.unpack_from(buffer, offset)
+                    data_offset = offset + self.__SLOT_HEADER.size
+                    payloads.append((kind, bytes(buffer[data_offset : data_offset + length])))
+                    head += 1
+
+                self.__LANE_HEADER.pack_into(buffer, lane_offset, head, tail)
+
+            if self.__statistics is not None and start > 0 and len(payloads) > 0:
+                wait_ns = time.perf_counter_ns() - start
+                self.__statistics.record_get(buffer, len(payloads), wait_ns)
+
+        return payloads
+
+    def __overwrite_slot(self, payload: "tuple[int, bytes]", discarded: int) -> None:
+        """
+        Conflating put, replaces the unread item if there is one.
+
+        discarded: Number of items already dropped by the caller.
+        """
+        kind, data = payload
+        with self.__lock:
+            buffer = self.__shared_memory.buf
+            (overwritten,) = self.__HEADER.unpack_from(buffer, 0)
+            lane_offset = self.__lane_offset(0)
+            head, tail = self.__LANE_HEADER.unpack_from(buffer, lane_offset)
+
+            is_unread = tail > head
+            if is_unread:
+                overwritten += 1
+            else:
+                tail += 1
+
+            offset = self.__slot_offset(0, 0)
+            self.__SLOT_HEADER.pack_into(buffer, offset, len(data), kind)
+            data_offset = offset + self.__SLOT_HEADER.size
+            buffer[data_offset : data_offset + len(data)] = data
+
+            self.__HEADER.pack_into(buffer, 0, overwritten + discarded)
+            self.__LANE_HEADER.pack_into(buffer, lane_offset, head, tail)
+
+            # Conflating puts never wait
+            if self.__statistics is not None:
+                self.__statistics.record_put(buffer, discarded + 1, 0, tail - head)
+
+        # Only wake a consumer when the slot goes from empty to full
+        if not is_unread:
+            self.__used_slots.release()
@@ -2,46 +2,61 @@
 For controlling workers.
 """
 
+import ctypes
 import multiprocessing as mp
-import time
+import multiprocessing.connection
 
 
 class WorkerController:
     """
     For interprocess communication from main to worker.
     Contains exit and pause requests.
-    """
 
-    __QUEUE_DELAY = 0.1  # seconds
+    Both requests are mirrored in shared memory flags which workers read without locking,
+    so that checking them every loop is nearly free when not paused and not exiting.
+
+    A wakeup pipe is readable while either request is active, so that a worker waiting
+    for input with `wait_for_readable()` reacts to them immediately.
+    """
 
     def __init__(self) -> None:
         """
-        Constructor creates internal queue and semaphore.
+        Constructor creates internal flags, event, and semaphore.
         """
         self.__pause = mp.BoundedSemaphore(1)
-        self.__is_paused = False
-        self.__exit_queue = mp.Queue(1)
+        self.__is_paused = mp.RawValue(ctypes.c_bool, False)
+        self.__is_exit_requested = mp.RawValue(ctypes.c_bool, False)
+        self.__exit_event = mp.Event()
+
+        # Holds 1 byte per active request, workers never read from it
+        self.__wakeup_reader, self.__wakeup_writer = mp.Pipe(duplex=False)
 
     def request_pause(self) -> None:
         """
         Requests worker processes to pause.
         """
-        if not self.__is_paused:
+        if not self.__is_paused.value:
             self.__pause.acquire()
-            self.__is_paused = True
+            self.__is_paused.value = True
+            self.__wakeup_writer.send_bytes(b"\x00")
 
     def request_resume(self) -> None:
         """
         Requests worker processes to resume.
         """
-        if self.__is_paused:
+        if self.__is_paused.value:
+            self.__is_paused.value = False
+            self.__wakeup_reader.recv_bytes()
             self.__pause.release()
-            self.__is_paused = False
 
     def check_pause(self) -> None:
         """
         Blocks worker if main has requested it to pause, otherwise continues.
         """
+        # Fast path, the semaphore is only touched while paused
+        if not self.__is_paused.value:
+            return
+
         self.__pause.acquire()
         self.__pause.release()
 
@@ -50,18 +65,21 @@ class WorkerController:
         Requests worker processes to exit.
         Does nothing if already requested.
         """
-        time.sleep(self.__QUEUE_DELAY)
-        if self.__exit_queue.empty():
-            self.__exit_queue.put(None)
+        if not self.__is_exit_requested.value:
+            self.__is_exit_requested.value = True
+            self.__wakeup_writer.send_bytes(b"\x00")
+
+        self.__exit_event.set()
 
     def clear_exit(self) -> None:
         """
         Clears the exit request condition.
         Does nothing if already cleared.
         """
-        time.sleep(self.__QUEUE_DELAY)
-        if not self.__exit_queue.empty():
-            _ = self.__exit_queue.get()
+        self.__exit_event.clear()
+        if self.__is_exit_requested.value:
+            self.__is_exit_requested.value = False
+            self.__wakeup_reader.recv_bytes()
 
     def is_exit_requested(self) -> bool:
         """
@@ -69,4 +87,26 @@ class WorkerController:
         There is a race condition, but it's fine because the worker process
         will do at most 1 additional loop.
         """
-        return not self.__exit_queue.empty()
+        return self.__is_exit_requested.value
+
+    def wait_for_exit(self, timeout: float) -> bool:
+        """
+        Sleeps until main requests exit or the timeout in seconds passes,
+        use instead of `time.sleep()` so that exit is not delayed.
+
+        Returns whether main has requested the worker process to exit.
+        """
+        return self.__exit_event.wait(timeout)
+
+    def wait_for_readable(self, fd: int, timeout: "float | None") -> bool:
+        """
+        Sleeps until the file descriptor has data, main requests exit or pause,
+        or the timeout in seconds passes.
+
+        fd: File descriptor of a socket, pipe or serial port.
+        timeout: None waits forever.
+
+        Returns whether the file descriptor is readable.
+        """
+        ready = multiprocessing.connection.wait([fd, self.__wakeup_reader], timeout)
+        return fd in ready